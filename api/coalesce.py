@@ -0,0 +1,129 @@
+"""
+Single-flight request coalescing for hot keys.
+
+Concurrent identical lookups share one in-flight call: the first caller for
+a key (the leader) runs the query, everyone else arriving before it finishes
+waits for and receives the same result or exception. Sync handlers running
+in the threadpool and async handlers on the event loop share one table of
+in-flight calls, so they coalesce with each other too.
+"""
+
+import asyncio
+import inspect
+import os
+import threading
+
+from starlette.concurrency import run_in_threadpool
+
+COALESCE_TIMEOUT = float(os.getenv("COALESCE_TIMEOUT", "5"))
+
+
+class CallInterrupted(RuntimeError):
+    """The leader was cancelled (e.g. client disconnect) before finishing."""
+
+
+class _Call:
+    __slots__ = ("done", "result", "error", "waiters")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = []
+
+
+class SingleFlight:
+    def __init__(self, timeout=COALESCE_TIMEOUT):
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def _join(self, key):
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                return call, False
+            call = self._calls[key] = _Call()
+            return call, True
+
+    def _finish(self, key, call, result=None, error=None):
+        with self._lock:
+            self._calls.pop(key, None)
+            call.result, call.error = result, error
+            call.done.set()
+            waiters = call.waiters
+        for loop, future in waiters:
+            loop.call_soon_threadsafe(_resolve, future)
+
+    def _settle(self, key, call, result, error):
+        """``_finish`` for a leader; cancellation is passed on to followers
+        as ``CallInterrupted`` rather than cancelling them too."""
+        if error is not None and not isinstance(error, Exception):
+            error = CallInterrupted(f"In-flight call {key!r} was interrupted")
+        self._finish(key, call, result=result, error=error)
+
+    @staticmethod
+    def _outcome(call):
+        if call.error is not None:
+            raise call.error
+        return call.result
+
+    def do(self, key, fn, timeout=None):
+        """Run ``fn()`` once for all concurrent callers with the same ``key``.
+
+        Followers wait at most ``timeout`` seconds and then raise
+        ``TimeoutError``; the leader's exception is re-raised in every caller
+        (``CallInterrupted`` if the leader was cancelled). The key is released
+        however the leader exits.
+        """
+        call, leader = self._join(key)
+        if leader:
+            result = error = None
+            try:
+                result = fn()
+                return result
+            except BaseException as e:
+                error = e
+                raise
+            finally:
+                self._settle(key, call, result, error)
+        if not call.done.wait(self.timeout if timeout is None else timeout):
+            raise TimeoutError(f"Timed out waiting for in-flight call {key!r}")
+        return self._outcome(call)
+
+    async def do_async(self, key, fn, timeout=None):
+        """Async variant of ``do``; sync ``fn`` runs in the threadpool."""
+        call, leader = self._join(key)
+        if leader:
+            result = error = None
+            try:
+                if inspect.iscoroutinefunction(fn):
+                    result = await fn()
+                else:
+                    result = await run_in_threadpool(fn)
+                return result
+            except BaseException as e:
+                error = e
+                raise
+            finally:
+                self._settle(key, call, result, error)
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        with self._lock:
+            if call.done.is_set():
+                return self._outcome(call)
+            call.waiters.append((loop, future))
+        try:
+            await asyncio.wait_for(future, self.timeout if timeout is None else timeout)
+        except asyncio.TimeoutError:
+            raise TimeoutError(f"Timed out waiting for in-flight call {key!r}")
+        return self._outcome(call)
+
+
+def _resolve(future):
+    if not future.done():
+        future.set_result(None)
+
+
+single_flight = SingleFlight()
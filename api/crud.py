@@ -1,10 +1,241 @@
-from .models import Attraction
+import base64
+import datetime
+
+from .hours import covers_minute, minute_of_week
+from .images import variant_urls
+from .models import (
+    Attraction,
+    AttractionHours,
+    AttractionTag,
+    Favorite,
+    Image,
+    Review,
+    User,
+)
+from .tag_index import tag_index
+from sqlalchemy import and_, bindparam, exists, func, or_, select
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 
+# Output fields computed from columns rather than stored in one.
+DERIVED_FIELDS = {"main_image_variants": ("main_image_url", "main_image_has_variants")}
+
+
+def sparse_columns(fields):
+    """Columns to SELECT for a sparse fieldset (``id`` is always included)."""
+    names = {"id"}
+    for f in fields:
+        names.update(DERIVED_FIELDS.get(f, (f,)))
+    return [getattr(Attraction, name) for name in sorted(names)]
+
+
+def sparse_row(row, fields):
+    out = {}
+    for field in fields:
+        if field == "main_image_variants":
+            out[field] = variant_urls(row.main_image_url, row.main_image_has_variants)
+        else:
+            out[field] = getattr(row, field)
+    return out
+
+
+def tag_filter(tag_ids, tag_count, mode="all"):
+    """Attractions having all (``mode="all"``) or any of ``tag_ids``, as SQL.
+
+    ``tag_ids`` are distinct ids (or an expanding bound parameter) and
+    ``tag_count`` how many there are. Used when other filters decide the page,
+    so tags are intersected in the database rather than shipping every tag
+    match as ``IN (...)``.
+    """
+    tagged = AttractionTag.tag_id.in_(tag_ids)
+    if mode == "any":
+        return exists().where(AttractionTag.attraction_id == Attraction.id, tagged)
+    return Attraction.id.in_(
+        select(AttractionTag.attraction_id)
+        .where(tagged)
+        .group_by(AttractionTag.attraction_id)
+        .having(func.count() == tag_count)
+    )
+
 
-def get_attractions(db: Session, skip=0, limit=20):
-    return db.query(Attraction).offset(skip).limit(limit).all()
+def list_statement(columns, open_at=False, max_fee=False, tag_mode=None):
+    """The ``get_attractions`` page query selecting ``columns`` for one
+    combination of filters, with every value a bound parameter (see
+    ``list_params``). ``tag_mode`` ("all" or "any") adds the tag match.
+
+    ``fastread`` builds its row statements here too, so both read paths
+    filter the same way.
+    """
+    attractions = Attraction.__table__
+    statement = select(*columns)
+    if open_at:
+        statement = statement.where(
+            exists().where(
+                AttractionHours.__table__.c.attraction_id == attractions.c.id,
+                covers_minute(bindparam("minute")),
+            )
+        )
+    if max_fee:
+        statement = statement.where(attractions.c.fee_min <= bindparam("max_fee"))
+    if tag_mode:
+        # Page after filtering, so the tags are matched in the database too.
+        statement = statement.where(
+            tag_filter(
+                bindparam("tag_ids", expanding=True), bindparam("tag_count"), tag_mode
+            )
+        )
+    # Ordered so a page is the same whichever columns (and index) are read.
+    statement = statement.order_by(attractions.c.id)
+    return statement.offset(bindparam("skip")).limit(bindparam("limit"))
+
+
+def list_params(
+    skip=0, limit=20, tag_ids=None, tag_mode="all", open_at=None, max_fee=None
+):
+    """``(filters, params)``: the ``list_statement`` flags after ``columns``
+    and the bound values for one page of ``get_attractions``."""
+    params = {"skip": skip, "limit": limit}
+    if open_at is not None:
+        params["minute"] = minute_of_week(open_at)
+    if max_fee is not None:
+        params["max_fee"] = max_fee
+    if tag_ids:
+        params["tag_ids"] = sorted(set(tag_ids))
+        params["tag_count"] = len(params["tag_ids"])
+    filters = (open_at is not None, max_fee is not None, tag_mode if tag_ids else None)
+    return filters, params
+
+
+def tag_index_page(db, filters, params):
+    """Ids of the page when tags are the only filter, matched in ``tag_index``
+    instead of SQL; ``None`` when the page needs ``list_statement``."""
+    open_at, max_fee, tag_mode = filters
+    if not tag_mode or open_at or max_fee:
+        return None
+    ids = tag_index.ensure_loaded(db).match(params["tag_ids"], mode=tag_mode)
+    return ids[params["skip"] : params["skip"] + params["limit"]]
+
+
+def get_attractions(
+    db: Session,
+    skip=0,
+    limit=20,
+    tag_ids=None,
+    tag_mode="all",
+    fields=None,
+    open_at=None,
+    max_fee=None,
+):
+    """List attractions; with ``fields`` only those columns are loaded and
+    plain dicts holding exactly ``fields`` are returned instead of ORM rows.
+
+    ``open_at`` keeps attractions open at that time and ``max_fee`` those
+    whose cheapest ticket costs at most that much; attractions whose hours
+    or fee could not be parsed never match these filters.
+    """
+    columns = sparse_columns(fields) if fields else [Attraction]
+    filters, params = list_params(skip, limit, tag_ids, tag_mode, open_at, max_fee)
+    ids = tag_index_page(db, filters, params)
+    if ids is not None:
+        rows = get_attractions_by_ids(db, ids, query=db.query(*columns))
+    elif fields:
+        rows = db.execute(list_statement(columns, *filters), params).all()
+    else:
+        rows = db.scalars(list_statement(columns, *filters), params).all()
+    if fields:
+        return [sparse_row(row, fields) for row in rows]
+    return rows
 
 
 def get_attraction(db: Session, attraction_id: int):
     return db.query(Attraction).filter(Attraction.id == attraction_id).first()
+
+
+def get_attractions_by_ids(db: Session, ids, query=None):
+    """Fetch attractions for ``ids``, preserving the order of ``ids``."""
+    if not ids:
+        return []
+    query = db.query(Attraction) if query is None else query
+    by_id = {a.id: a for a in query.filter(Attraction.id.in_(ids))}
+    return [by_id[i] for i in ids if i in by_id]
+
+
+def get_similar_attractions(db: Session, attraction_id: int, limit=10):
+    scored = tag_index.ensure_loaded(db).similar(attraction_id, limit=limit)
+    attractions = get_attractions_by_ids(db, [i for i, _ in scored])
+    scores = dict(scored)
+    for attraction in attractions:
+        attraction.similarity = scores[attraction.id]
+    return attractions
+
+
+def get_user_by_username(db: Session, username: str):
+    return db.query(User).filter(User.username == username).first()
+
+
+def get_images(db: Session, attraction_id: int):
+    return (
+        db.query(Image)
+        .filter(Image.attraction_id == attraction_id)
+        .order_by(Image.id)
+        .all()
+    )
+
+
+def encode_review_cursor(review):
+    raw = f"{review.created_at.isoformat()}|{review.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_review_cursor(cursor):
+    """Return ``(created_at, id)`` from a cursor; raises ``ValueError``."""
+    padded = cursor + "=" * (-len(cursor) % 4)
+    created_at, review_id = base64.urlsafe_b64decode(padded).decode().split("|")
+    return datetime.datetime.fromisoformat(created_at), int(review_id)
+
+
+def get_reviews(db: Session, attraction_id: int, limit=20, before=None, since=None):
+    """Newest-first reviews using keyset pagination on ``(created_at, id)``.
+
+    Bounding ``created_at`` lets PostgreSQL prune partitions: the cursor cuts
+    off newer months and ``since`` cuts off older ones.
+    """
+    query = db.query(Review).filter(Review.attraction_id == attraction_id)
+    if before is not None:
+        created_at, review_id = before
+        query = query.filter(
+            or_(
+                Review.created_at < created_at,
+                and_(Review.created_at == created_at, Review.id < review_id),
+            )
+        )
+    if since is not None:
+        query = query.filter(Review.created_at >= since)
+    return query.order_by(Review.created_at.desc(), Review.id.desc()).limit(limit).all()
+
+
+def create_review(db: Session, attraction_id: int, user_id: int, rating, comment=None):
+    review = Review(
+        attraction_id=attraction_id,
+        user_id=user_id,
+        rating=rating,
+        comment=comment,
+        created_at=datetime.datetime.now(),
+    )
+    db.add(review)
+    db.commit()
+    db.refresh(review)
+    return review
+
+
+def create_favorite(db: Session, user_id: int, attraction_id: int):
+    """Add a favourite; returns ``None`` if the user already has it."""
+    favorite = Favorite(user_id=user_id, attraction_id=attraction_id)
+    db.add(favorite)
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        return None
+    db.refresh(favorite)
+    return favorite
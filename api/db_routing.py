@@ -0,0 +1,186 @@
+"""
+Read/write splitting between the primary database and read replicas.
+
+``RoutingSession`` sends flushes, ``INSERT``/``UPDATE``/``DELETE`` and
+anything after the session's first write to the primary, and plain reads
+to a healthy replica picked by ``ReplicaSet``. Clients that wrote recently
+are pinned to the primary for a read-your-writes window.
+"""
+
+import itertools
+import logging
+import threading
+import time
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+from sqlalchemy.sql.dml import UpdateBase
+
+logger = logging.getLogger(__name__)
+
+REPLICA_LAG_SQL = text(
+    "SELECT CASE WHEN pg_is_in_recovery() "
+    "THEN COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) "
+    "ELSE 0 END"
+)
+
+
+def replica_lag(conn):
+    """Seconds the replica behind ``conn`` trails its primary (PostgreSQL
+    standbys; 0 elsewhere). Raises if the replica is unreachable."""
+    if conn.dialect.name == "postgresql":
+        return float(conn.execute(REPLICA_LAG_SQL).scalar())
+    conn.execute(text("SELECT 1"))
+    return 0.0
+
+
+class Replica:
+    def __init__(self, engine):
+        self.engine = engine
+        self.healthy = True
+        self.lag = 0.0
+        self.in_flight = 0
+
+    def __repr__(self):
+        return (
+            f"<Replica {self.engine.url!r} healthy={self.healthy} lag={self.lag:.1f}s>"
+        )
+
+
+class ReplicaSet:
+    """Pool of replica engines with health checking and lag-based ejection."""
+
+    def __init__(
+        self,
+        engines,
+        strategy="round_robin",
+        max_lag=5.0,
+        check_interval=10.0,
+        read_your_writes=5.0,
+    ):
+        if strategy not in ("round_robin", "least_loaded"):
+            raise ValueError(f"Unknown replica strategy: {strategy}")
+        self.replicas = [Replica(e) for e in engines]
+        self.strategy = strategy
+        self.max_lag = max_lag
+        self.check_interval = check_interval
+        self.read_your_writes = read_your_writes
+        self._rr = itertools.count()
+        self._lock = threading.Lock()
+        self._check_lock = threading.Lock()
+        self._last_check = time.monotonic()
+        self._recent_writes = {}
+
+    def __bool__(self):
+        return bool(self.replicas)
+
+    def check(self):
+        """Probe every replica, ejecting unreachable or lagging ones."""
+        for replica in self.replicas:
+            try:
+                with replica.engine.connect() as conn:
+                    replica.lag = replica_lag(conn)
+                healthy = replica.lag <= self.max_lag
+            except Exception as e:
+                logger.warning(
+                    "Replica %s failed health check: %s", replica.engine.url, e
+                )
+                healthy = False
+            if healthy != replica.healthy:
+                logger.warning(
+                    "Replica %s %s",
+                    replica.engine.url,
+                    "restored" if healthy else "ejected",
+                )
+            replica.healthy = healthy
+        self._last_check = time.monotonic()
+
+    def _maybe_check(self):
+        if time.monotonic() - self._last_check < self.check_interval:
+            return
+        # Only one request pays for the probe; the others keep the last result.
+        if self._check_lock.acquire(blocking=False):
+            try:
+                self.check()
+            finally:
+                self._check_lock.release()
+
+    def acquire(self):
+        """Pick a healthy replica and count it as in use, or return ``None``."""
+        self._maybe_check()
+        with self._lock:
+            healthy = [r for r in self.replicas if r.healthy]
+            if not healthy:
+                return None
+            if self.strategy == "least_loaded":
+                replica = min(healthy, key=lambda r: r.in_flight)
+            else:
+                replica = healthy[next(self._rr) % len(healthy)]
+            replica.in_flight += 1
+            return replica
+
+    def release(self, replica):
+        with self._lock:
+            replica.in_flight -= 1
+
+    def record_write(self, key):
+        if key is None or self.read_your_writes <= 0:
+            return
+        now = time.monotonic()
+        if len(self._recent_writes) > 10000:
+            self._recent_writes = {
+                k: until for k, until in self._recent_writes.items() if until > now
+            }
+        self._recent_writes[key] = now + self.read_your_writes
+
+    def wrote_recently(self, key):
+        until = self._recent_writes.get(key)
+        if until is None:
+            return False
+        if until < time.monotonic():
+            self._recent_writes.pop(key, None)
+            return False
+        return True
+
+
+class RoutingSession(Session):
+    """Session that routes reads to replicas and writes to the primary.
+
+    ``bind`` is the primary engine. Pass ``use_primary=True`` to force every
+    statement to the primary (e.g. for routes that read right after writing),
+    and ``client_key`` to enable the read-your-writes window for that client.
+    """
+
+    def __init__(self, replicas=None, use_primary=False, client_key=None, **kw):
+        super().__init__(**kw)
+        self.replicas = replicas
+        self.client_key = client_key
+        self._replica = None
+        self._wrote = False
+        self._use_primary = (
+            use_primary or not replicas or replicas.wrote_recently(client_key)
+        )
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        if self._flushing or isinstance(clause, UpdateBase):
+            self._wrote = True
+        if self._wrote or self._use_primary:
+            return super().get_bind(mapper, clause=clause, **kw)
+        if self._replica is None:
+            self._replica = self.replicas.acquire()
+            if self._replica is None:
+                return super().get_bind(mapper, clause=clause, **kw)
+        return self._replica.engine
+
+    def commit(self):
+        super().commit()
+        if self._wrote and self.replicas:
+            self.replicas.record_write(self.client_key)
+
+    def close(self):
+        try:
+            super().close()
+        finally:
+            if self._replica is not None:
+                self.replicas.release(self._replica)
+                self._replica = None
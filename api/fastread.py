@@ -0,0 +1,102 @@
+"""
+Core read path for attraction rows.
+
+The list, detail and recommend routes only serialize columns, so they skip
+ORM hydration (identity map, instance state, relationship loaders) and read
+plain rows into ``AttractionRow``, a named tuple with the derived
+``main_image_variants`` property that ``schemas.AttractionOut`` expects.
+
+Statements are built once, with every value a bound parameter, so each
+request reuses the same statement object and SQLAlchemy's compiled form from
+its statement cache. They run on ``db.connection()``, which keeps replica
+routing but bypasses the ORM execution layer.
+
+``python -m scripts.bench_fastread`` compares this with ORM loading.
+"""
+
+import functools
+from collections import namedtuple
+
+from sqlalchemy import bindparam, exists, select
+
+from . import crud
+from .images import variant_urls
+from .models import Attraction, Review
+from .schemas import ATTRACTION_FIELDS
+
+ATTRACTION_COLUMNS = tuple(
+    dict.fromkeys(
+        column
+        for field in ATTRACTION_FIELDS
+        for column in crud.DERIVED_FIELDS.get(field, (field,))
+    )
+)
+
+_attractions = Attraction.__table__
+_reviews = Review.__table__
+_columns = [_attractions.c[name] for name in ATTRACTION_COLUMNS]
+
+
+class AttractionRow(namedtuple("AttractionRow", ATTRACTION_COLUMNS)):
+    __slots__ = ()
+
+    @property
+    def main_image_variants(self):
+        return variant_urls(self.main_image_url, self.main_image_has_variants)
+
+
+def rows(db, statement, **params):
+    """Run ``statement`` and return ``AttractionRow`` tuples."""
+    make = AttractionRow._make
+    return [make(row) for row in db.connection().execute(statement, params)]
+
+
+BY_ID = select(*_columns).where(_attractions.c.id == bindparam("id"))
+
+BY_IDS = select(*_columns).where(
+    _attractions.c.id.in_(bindparam("ids", expanding=True))
+)
+
+# Correlated NOT EXISTS lets PostgreSQL anti-join each Review partition
+# through its (attraction_id, created_at, id) index.
+RECOMMEND = (
+    select(*_columns)
+    .where(
+        ~exists().where(
+            _reviews.c.attraction_id == _attractions.c.id,
+            _reviews.c.user_id == bindparam("user_id"),
+        )
+    )
+    .limit(5)
+)
+
+
+@functools.lru_cache(maxsize=None)
+def list_statement(open_at=False, max_fee=False, tag_mode=None):
+    """``crud.list_statement`` over ``ATTRACTION_COLUMNS``, built once per
+    combination of filters."""
+    return crud.list_statement(_columns, open_at, max_fee, tag_mode)
+
+
+def get_attraction(db, attraction_id):
+    found = rows(db, BY_ID, id=attraction_id)
+    return found[0] if found else None
+
+
+def get_attractions_by_ids(db, ids):
+    """Rows for ``ids``, preserving the order of ``ids``."""
+    if not ids:
+        return []
+    by_id = {row.id: row for row in rows(db, BY_IDS, ids=list(ids))}
+    return [by_id[i] for i in ids if i in by_id]
+
+
+def get_attractions(
+    db, skip=0, limit=20, tag_ids=None, tag_mode="all", open_at=None, max_fee=None
+):
+    """``crud.get_attractions`` without ``fields``, returning rows."""
+    filters, params = crud.list_params(skip, limit, tag_ids, tag_mode, open_at, max_fee)
+    ids = crud.tag_index_page(db, filters, params)
+    if ids is not None:
+        return get_attractions_by_ids(db, ids)
+    return rows(db, list_statement(*filters), **params)
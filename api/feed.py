@@ -0,0 +1,329 @@
+"""
+Precomputed per-user feeds.
+
+A feed is a ranked candidate list stored as two NumPy arrays (attraction ids
+and float32 scores), so serving a page is one dict lookup and a slice. Scores
+combine tag affinity, learned from the user's favourites and review ratings
+through the ``tag_index`` bitsets, with overall popularity; attractions the
+user already reviewed or favourited are left out.
+
+Feeds are built on first request and kept for recently active users
+(``FEED_MAX_USERS``, least recently used evicted). A Review or Favorite
+committed through this process drops that attraction from the writer's feed
+at once and marks the feed for a rebuild. Every process also scans the
+Review and Favorite rows added since its last pass, so writes handled by
+another worker reach its feeds within ``FEED_REFRESH_INTERVAL`` seconds.
+That pass, rebuilds of marked or expired (``FEED_TTL``) feeds, and warming
+for users who reviewed in the last ``FEED_ACTIVE_DAYS`` run in the
+background.
+"""
+
+import asyncio
+import base64
+import datetime
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict, defaultdict
+
+import numpy as np
+from sqlalchemy import event, func
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from .models import Attraction, Favorite, Review
+from .tag_index import tag_index
+
+logger = logging.getLogger(__name__)
+
+FEED_SIZE = int(os.getenv("FEED_SIZE", "200"))
+FEED_MAX_USERS = int(os.getenv("FEED_MAX_USERS", "10000"))
+FEED_TTL = float(os.getenv("FEED_TTL", "3600"))
+FEED_STATS_TTL = float(os.getenv("FEED_STATS_TTL", "300"))
+FEED_REFRESH_INTERVAL = float(os.getenv("FEED_REFRESH_INTERVAL", "30"))
+FEED_ACTIVE_DAYS = int(os.getenv("FEED_ACTIVE_DAYS", "7"))
+# Ids below the newest one seen that each pass scans again, for rows whose
+# transaction committed after a later id's did.
+FEED_WRITE_LOOKBACK = int(os.getenv("FEED_WRITE_LOOKBACK", "1000"))
+# Weight of popularity (0..1) against tag affinity (0..1) in the score.
+FEED_POPULARITY_WEIGHT = float(os.getenv("FEED_POPULARITY_WEIGHT", "0.2"))
+
+# A favourite counts like a five-star review; ratings below three push away.
+FAVORITE_WEIGHT = 1.0
+
+
+def rating_weight(rating):
+    return (rating - 3) / 2
+
+
+def _locate(sorted_ids, values):
+    """Positions of ``values`` in ``sorted_ids`` and a mask of those found."""
+    pos = np.searchsorted(sorted_ids, values)
+    if not len(sorted_ids):
+        return pos, np.zeros(len(pos), dtype=bool)
+    found = sorted_ids[np.minimum(pos, len(sorted_ids) - 1)] == values
+    return pos, found
+
+
+class Feed:
+    __slots__ = ("ids", "scores", "built_at", "dirty")
+
+    def __init__(self, ids, scores):
+        self.ids = ids
+        self.scores = scores
+        self.built_at = time.monotonic()
+        self.dirty = False
+
+    def without(self, attraction_id):
+        keep = self.ids != attraction_id
+        feed = Feed(self.ids[keep], self.scores[keep])
+        feed.built_at, feed.dirty = self.built_at, True
+        return feed
+
+
+class FeedStore:
+    def __init__(
+        self,
+        size=FEED_SIZE,
+        max_users=FEED_MAX_USERS,
+        ttl=FEED_TTL,
+        stats_ttl=FEED_STATS_TTL,
+        write_lookback=FEED_WRITE_LOOKBACK,
+    ):
+        self.size = size
+        self.max_users = max_users
+        self.ttl = ttl
+        self.stats_ttl = stats_ttl
+        self.write_lookback = write_lookback
+        self._lock = threading.Lock()
+        self._feeds = OrderedDict()
+        self._stats = None
+        self._stats_at = 0.0
+        self._write_marks = None
+
+    def clear(self):
+        with self._lock:
+            self._feeds.clear()
+            self._stats = None
+            self._write_marks = None
+
+    def _put(self, user_id, feed):
+        with self._lock:
+            self._feeds[user_id] = feed
+            self._feeds.move_to_end(user_id)
+            while len(self._feeds) > self.max_users:
+                self._feeds.popitem(last=False)
+
+    def get(self, db, user_id):
+        """The user's feed, building it if this user has none yet."""
+        with self._lock:
+            feed = self._feeds.get(user_id)
+            if feed is not None:
+                self._feeds.move_to_end(user_id)
+                return feed
+        if self._write_marks is None:
+            # Writes older than the first feed are in its history already.
+            self._write_marks = _newest_write_ids(db)
+        feed = self.build(db, user_id)
+        self._put(user_id, feed)
+        return feed
+
+    def record_write(self, user_id, attraction_id):
+        """Apply a committed review or favourite without waiting for a
+        rebuild: the attraction leaves the feed and the feed is marked.
+        A write the feed already excludes changes nothing."""
+        with self._lock:
+            feed = self._feeds.get(user_id)
+            if feed is not None and (feed.ids == attraction_id).any():
+                self._feeds[user_id] = feed.without(attraction_id)
+
+    def sync_writes(self, db):
+        """Apply the reviews and favourites added since the last call,
+        whichever process committed them. Returns the number of rows read."""
+        marks = self._write_marks
+        if marks is None:
+            self._write_marks = _newest_write_ids(db)
+            return 0
+        seen = 0
+        for model, mark in marks.items():
+            rows = (
+                db.query(model.id, model.user_id, model.attraction_id)
+                .filter(model.id > mark - self.write_lookback)
+                .all()
+            )
+            for _, user_id, attraction_id in rows:
+                self.record_write(user_id, attraction_id)
+            marks[model] = max([mark] + [row.id for row in rows])
+            seen += len(rows)
+        return seen
+
+    def due(self):
+        now = time.monotonic()
+        with self._lock:
+            return [
+                user_id
+                for user_id, feed in self._feeds.items()
+                if feed.dirty or now - feed.built_at > self.ttl
+            ]
+
+    def refresh(self, db, user_ids=()):
+        """Rebuild marked and expired feeds, plus ``user_ids`` not yet held
+        (as room allows). Returns the number of feeds built."""
+        self.sync_writes(db)
+        with self._lock:
+            room = max(0, self.max_users - len(self._feeds))
+            missing = [u for u in user_ids if u not in self._feeds][:room]
+        todo = self.due() + missing
+        for user_id in todo:
+            before = self._feeds.get(user_id)
+            feed = self.build(db, user_id)
+            with self._lock:
+                current = self._feeds.get(user_id)
+                if current is None and user_id not in missing:
+                    continue  # evicted meanwhile
+                # A write committed during the build may not be reflected.
+                feed.dirty = current is not before
+                # Assigning keeps the LRU position: a refresh is not an access.
+                self._feeds[user_id] = feed
+        return len(todo)
+
+    def _global_stats(self, db):
+        """All attraction ids (sorted) and their popularity in [0, 1], reloaded
+        every ``stats_ttl`` seconds."""
+        stats = self._stats
+        if stats is not None and time.monotonic() - self._stats_at <= self.stats_ttl:
+            return stats
+        ids = np.fromiter(
+            (i for (i,) in db.query(Attraction.id).order_by(Attraction.id)),
+            dtype=np.int64,
+        )
+        counts = np.zeros(len(ids))
+        for model in (Favorite, Review):
+            rows = (
+                db.query(model.attraction_id, func.count())
+                .group_by(model.attraction_id)
+                .all()
+            )
+            if rows:
+                hit, n = np.array(rows, dtype=np.int64).T
+                pos, found = _locate(ids, hit)
+                np.add.at(counts, pos[found], n[found])
+        popularity = np.log1p(counts)
+        if popularity.max(initial=0) > 0:
+            popularity /= popularity.max()
+        self._stats, self._stats_at = (ids, popularity), time.monotonic()
+        return self._stats
+
+    def history(self, db, user_id):
+        """``{attraction_id: weight}`` from the user's favourites and reviews."""
+        weights = defaultdict(float)
+        reviews = db.query(Review.attraction_id, Review.rating).filter(
+            Review.user_id == user_id
+        )
+        for attraction_id, rating in reviews:
+            weights[attraction_id] += rating_weight(rating)
+        favorites = db.query(Favorite.attraction_id).filter(Favorite.user_id == user_id)
+        for (attraction_id,) in favorites:
+            weights[attraction_id] += FAVORITE_WEIGHT
+        return dict(weights)
+
+    def build(self, db, user_id):
+        ids, popularity = self._global_stats(db)
+        weights = self.history(db, user_id)
+        scores = FEED_POPULARITY_WEIGHT * popularity
+        index = tag_index.ensure_loaded(db)
+        pos, found = _locate(ids, index.attraction_ids)
+        scores[pos[found]] += index.affinity(weights)[found]
+
+        candidates = np.flatnonzero(~np.isin(ids, list(weights)))
+        if len(candidates) > self.size:
+            top = np.argpartition(-scores[candidates], self.size - 1)[: self.size]
+            candidates = candidates[top]
+        order = candidates[np.lexsort((ids[candidates], -scores[candidates]))]
+        return Feed(ids[order], scores[order].astype(np.float32))
+
+
+def _newest_write_ids(db):
+    return {
+        model: db.query(func.max(model.id)).scalar() or 0
+        for model in (Review, Favorite)
+    }
+
+
+feed_store = FeedStore()
+
+
+def encode_cursor(offset, attraction_id):
+    raw = f"{offset}|{attraction_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    """Return ``(offset, last_attraction_id)``; raises ``ValueError``."""
+    padded = cursor + "=" * (-len(cursor) % 4)
+    offset, attraction_id = base64.urlsafe_b64decode(padded).decode().split("|")
+    return int(offset), int(attraction_id)
+
+
+def page(feed, limit, cursor=None):
+    """``(ids, scores, next_cursor)`` for one page of ``feed``.
+
+    The cursor remembers the last id served, so a page after a rebuild
+    continues after that id if it is still in the feed.
+    """
+    start = 0
+    if cursor is not None:
+        offset, last = decode_cursor(cursor)
+        if 0 < offset <= len(feed.ids) and feed.ids[offset - 1] == last:
+            start = offset
+        else:
+            hit = np.flatnonzero(feed.ids == last)
+            start = int(hit[0]) + 1 if len(hit) else min(offset, len(feed.ids))
+    end = min(start + limit, len(feed.ids))
+    ids = feed.ids[start:end].tolist()
+    next_cursor = encode_cursor(end, ids[-1]) if end < len(feed.ids) else None
+    return ids, feed.scores[start:end].tolist(), next_cursor
+
+
+def active_users(db, days=FEED_ACTIVE_DAYS):
+    since = datetime.datetime.now() - datetime.timedelta(days=days)
+    return [
+        user_id
+        for (user_id,) in db.query(Review.user_id)
+        .filter(Review.created_at >= since)
+        .distinct()
+    ]
+
+
+def refresh_once(session_factory):
+    with session_factory() as db:
+        return feed_store.refresh(db, active_users(db))
+
+
+async def refresh_forever(session_factory, interval=FEED_REFRESH_INTERVAL):
+    while True:
+        try:
+            await run_in_threadpool(refresh_once, session_factory)
+        except Exception as e:
+            logger.warning("Feed refresh failed: %s", e)
+        await asyncio.sleep(interval)
+
+
+@event.listens_for(Session, "after_flush")
+def _track_feed_writes(session, flush_context):
+    writes = session.info.setdefault("feed_writes", set())
+    for obj in session.new:
+        if isinstance(obj, (Review, Favorite)):
+            writes.add((obj.user_id, obj.attraction_id))
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_feed_writes(session):
+    for user_id, attraction_id in session.info.pop("feed_writes", ()):
+        feed_store.record_write(user_id, attraction_id)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_feed_writes(session):
+    session.info.pop("feed_writes", None)
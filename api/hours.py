@@ -0,0 +1,206 @@
+"""
+Structured opening hours and entrance fees.
+
+``opening_hours`` and ``entrance_fee`` stay as the free text shown to users;
+alongside them each attraction gets numeric ``fee_min``/``fee_max`` columns
+and rows in ``attraction_hours``: half-open ``[start_minute, end_minute)``
+intervals in minutes since Monday 00:00 local time (``ATTRACTION_TIMEZONE``,
+Asia/Bangkok by default). "Open at" is then an indexed interval lookup.
+Hours that run past Sunday midnight are split in two.
+
+The text is parsed with ``api.cleaning``. Mapper events keep the structured
+data in sync whenever an attraction is written through the ORM; rows loaded
+some other way (``db_script.py``, bulk imports) are filled in with
+
+    python -m api.hours
+
+``covers_minute(minute)`` is the "interval covers minute" condition. On PostgreSQL
+it compiles to ``int4range(start_minute, end_minute) @> minute`` so the GiST
+index on that range answers it directly; a B-tree on ``(start_minute,
+end_minute)`` could only use the ``start_minute <= minute`` half and would
+scan everything opening earlier in the week.
+"""
+
+import os
+from zoneinfo import ZoneInfo
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import (
+    bindparam,
+    delete,
+    event,
+    func,
+    insert,
+    inspect,
+    select,
+    update,
+)
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.functions import FunctionElement
+
+from .cleaning import parse_fees, parse_opening_hours
+from .models import Attraction, AttractionHours
+
+ATTRACTION_TIMEZONE = ZoneInfo(os.getenv("ATTRACTION_TIMEZONE", "Asia/Bangkok"))
+
+MINUTES_PER_DAY = 24 * 60
+MINUTES_PER_WEEK = 7 * MINUTES_PER_DAY
+
+_attractions = Attraction.__table__
+_hours = AttractionHours.__table__
+
+
+def minute_of_week(when):
+    """Minutes since Monday 00:00 in ``ATTRACTION_TIMEZONE``; naive datetimes
+    are taken to be local already."""
+    if when.tzinfo is not None:
+        when = when.astimezone(ATTRACTION_TIMEZONE)
+    return when.weekday() * MINUTES_PER_DAY + when.hour * 60 + when.minute
+
+
+class _covers(FunctionElement):
+    """``start <= minute < end``, as a range containment on PostgreSQL."""
+
+    # Untyped on purpose: a Boolean type makes dialects without a native
+    # boolean render ``(...) = 1``, which hides the comparisons from indexes.
+    inherit_cache = True
+    name = "covers"
+
+
+@compiles(_covers)
+def _compile_covers(element, compiler, **kw):
+    start, end, minute = (compiler.process(c, **kw) for c in element.clauses)
+    return f"({start} <= {minute} AND {end} > {minute})"
+
+
+@compiles(_covers, "postgresql")
+def _compile_covers_postgresql(element, compiler, **kw):
+    start, end, minute = (compiler.process(c, **kw) for c in element.clauses)
+    return f"int4range({start}, {end}) @> {minute}"
+
+
+def covers_minute(minute):
+    """``attraction_hours`` rows whose interval covers ``minute`` (an int or
+    bound parameter, see ``minute_of_week``)."""
+    return _covers(_hours.c.start_minute, _hours.c.end_minute, minute)
+
+
+def week_intervals(ids, hours):
+    """Expand parsed hours (``api.cleaning.parse_opening_hours``) into
+    ``attraction_id``/``start_minute``/``end_minute`` rows.
+
+    Rows without both days and times produce no intervals: "closed on
+    Tuesdays" alone does not say when the place is open.
+    """
+    ids = np.asarray(ids)
+    known = (hours["open_days"].notna() & hours["open_minute"].notna()).to_numpy()
+    days = hours["open_days"].fillna(0).to_numpy(dtype=np.int64)
+    open_days = ((days[:, None] >> np.arange(7)) & 1).astype(bool) & known[:, None]
+    rows, day = np.nonzero(open_days)
+    start = day * MINUTES_PER_DAY + hours["open_minute"].to_numpy()[rows]
+    end = day * MINUTES_PER_DAY + hours["close_minute"].to_numpy()[rows]
+    wraps = end > MINUTES_PER_WEEK
+    return pd.DataFrame(
+        {
+            "attraction_id": np.concatenate([ids[rows], ids[rows][wraps]]),
+            "start_minute": np.concatenate([start, np.zeros(wraps.sum())]),
+            "end_minute": np.concatenate(
+                [np.minimum(end, MINUTES_PER_WEEK), end[wraps] - MINUTES_PER_WEEK]
+            ),
+        }
+    ).astype(int)
+
+
+def structured(ids, opening_hours, entrance_fee):
+    """Return ``(fees, intervals)`` frames for parallel sequences of
+    attraction ids and their free-text hours and fees."""
+    fees = parse_fees(pd.Series(entrance_fee, dtype="string"))
+    fees.insert(0, "id", np.asarray(ids))
+    hours = parse_opening_hours(pd.Series(opening_hours, dtype="string"))
+    return fees, week_intervals(ids, hours)
+
+
+def _records(frame):
+    frame = frame.astype(object)
+    return frame.where(frame.notna(), None).to_dict("records")
+
+
+def rebuild(connection, lo=None, hi=None):
+    """Recompute fees and intervals for attractions with ``lo < id <= hi``
+    (all when unbounded); safe to repeat. Returns the number of attractions."""
+
+    def in_range(column):
+        bounds = []
+        if lo is not None:
+            bounds.append(column > lo)
+        if hi is not None:
+            bounds.append(column <= hi)
+        return bounds
+
+    rows = connection.execute(
+        select(
+            _attractions.c.id,
+            _attractions.c.opening_hours,
+            _attractions.c.entrance_fee,
+        ).where(*in_range(_attractions.c.id))
+    ).all()
+    if not rows:
+        return 0
+    ids, opening_hours, entrance_fee = zip(*rows)
+    fees, intervals = structured(ids, opening_hours, entrance_fee)
+
+    connection.execute(
+        update(_attractions)
+        .where(_attractions.c.id == bindparam("b_id"))
+        .values(fee_min=bindparam("b_min"), fee_max=bindparam("b_max")),
+        _records(fees.set_axis(["b_id", "b_min", "b_max"], axis=1)),
+    )
+    connection.execute(delete(_hours).where(*in_range(_hours.c.attraction_id)))
+    if len(intervals):
+        connection.execute(insert(_hours), intervals.to_dict("records"))
+    return len(ids)
+
+
+def rebuild_all(engine, batch_size=5000):
+    """``rebuild`` every attraction, one committed id range at a time."""
+    with engine.connect() as conn:
+        last = conn.execute(select(func.max(_attractions.c.id))).scalar() or 0
+    total = 0
+    for lo in range(0, last, batch_size):
+        with engine.begin() as conn:
+            total += rebuild(conn, lo, lo + batch_size)
+    return total
+
+
+def _changed(target, attribute):
+    return inspect(target).attrs[attribute].history.has_changes()
+
+
+@event.listens_for(Attraction, "before_insert")
+@event.listens_for(Attraction, "before_update")
+def _sync_fees(mapper, connection, target):
+    if not _changed(target, "entrance_fee") and inspect(target).has_identity:
+        return
+    if _changed(target, "fee_min") or _changed(target, "fee_max"):
+        return  # set explicitly by the caller
+    fees, _ = structured([0], [None], [target.entrance_fee])
+    row = _records(fees)[0]
+    target.fee_min, target.fee_max = row["fee_min"], row["fee_max"]
+
+
+@event.listens_for(Attraction, "after_insert")
+@event.listens_for(Attraction, "after_update")
+def _sync_hours(mapper, connection, target):
+    if not _changed(target, "opening_hours"):
+        return
+    connection.execute(delete(_hours).where(_hours.c.attraction_id == target.id))
+    _, intervals = structured([target.id], [target.opening_hours], [None])
+    if len(intervals):
+        connection.execute(insert(_hours), intervals.to_dict("records"))
+
+
+if __name__ == "__main__":
+    from .deps import engine
+
+    print(f"rebuilt opening hours and fees for {rebuild_all(engine)} attractions")
@@ -0,0 +1,177 @@
+"""
+Image variants and metadata.
+
+List views should not download 1200x800 originals for a thumbnail, so every
+image URL is paired with smaller variant URLs:
+
+* picsum.photos URLs are rewritten to the requested size directly;
+* other URLs map onto ``IMAGE_VARIANT_BASE_URL`` when it is set, where the
+  metadata pipeline (``scripts/extract_image_metadata.py``) writes resized
+  JPEG copies as ``<base>/<width>/<host>/<path minus extension>.jpg``. Those
+  are only advertised once the pipeline has recorded them as generated
+  (``Image.has_variants`` / ``Attraction.main_image_has_variants``).
+
+``extract_metadata`` runs in worker processes and needs Pillow.
+"""
+
+import math
+import os
+import re
+from urllib.parse import urlparse
+
+import numpy as np
+
+VARIANT_WIDTHS = {"thumb": 320, "small": 640, "medium": 1024}
+IMAGE_VARIANT_BASE_URL = os.getenv("IMAGE_VARIANT_BASE_URL", "").rstrip("/")
+IMAGE_ROOT = os.getenv("IMAGE_ROOT", "images")
+
+_PICSUM = re.compile(
+    r"^(https?://picsum\.photos/(?:seed/[^/]+/|id/\d+/)?)(\d+)/(\d+)(.*)$"
+)
+
+
+def variant_urls(url, generated=False, base_url=None):
+    """Map variant name to URL for ``url``; ``{}`` when none are available.
+
+    Non-picsum variants exist only after the metadata pipeline has written
+    them, so callers pass the recorded ``generated`` flag.
+    """
+    if not url:
+        return {}
+    picsum = _PICSUM.match(url)
+    if picsum:
+        prefix, width, height, suffix = picsum.groups()
+        width, height = int(width), int(height)
+        return {
+            name: f"{prefix}{w}/{round(height * w / width)}{suffix}"
+            for name, w in VARIANT_WIDTHS.items()
+            if w < width
+        }
+    base_url = IMAGE_VARIANT_BASE_URL if base_url is None else base_url
+    if not (generated and base_url):
+        return {}
+    rel = variant_path(relative_path(url))
+    return {name: f"{base_url}/{w}/{rel}" for name, w in VARIANT_WIDTHS.items()}
+
+
+def relative_path(url):
+    """Storage path of ``url`` below the image root: ``<host>/<path>``."""
+    parsed = urlparse(url)
+    return f"{parsed.netloc}{parsed.path}".strip("/")
+
+
+def variant_path(rel):
+    """Path of the resized copies of ``rel``; variants are always JPEG."""
+    return f"{os.path.splitext(rel)[0]}.jpg"
+
+
+# --- Metadata extraction (runs in worker processes) ---
+
+_BASE83 = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz#$%*+,-.:;=?@[]^_{|}~"
+
+
+def _encode83(value, length):
+    return "".join(
+        _BASE83[(value // 83 ** (length - i - 1)) % 83] for i in range(length)
+    )
+
+
+def _srgb_to_linear(values):
+    v = values / 255.0
+    return np.where(v <= 0.04045, v / 12.92, ((v + 0.055) / 1.055) ** 2.4)
+
+
+def _linear_to_srgb(value):
+    v = min(max(value, 0.0), 1.0)
+    if v <= 0.0031308:
+        return int(v * 12.92 * 255 + 0.5)
+    return int((1.055 * v ** (1 / 2.4) - 0.055) * 255 + 0.5)
+
+
+def blurhash(pixels, x_components=4, y_components=3):
+    """BlurHash of an ``(h, w, 3)`` uint8 RGB array.
+
+    Callers should downscale first (32x32 is plenty); the cost is
+    proportional to the pixel count.
+    """
+    height, width = pixels.shape[:2]
+    linear = _srgb_to_linear(pixels[..., :3].astype(np.float64))
+    xs = np.pi * np.arange(width) / width
+    ys = np.pi * np.arange(height) / height
+
+    factors = []
+    for j in range(y_components):
+        for i in range(x_components):
+            basis = np.outer(np.cos(j * ys), np.cos(i * xs))
+            norm = 1.0 if i == 0 and j == 0 else 2.0
+            factors.append(
+                norm
+                * np.tensordot(basis, linear, axes=([0, 1], [0, 1]))
+                / (width * height)
+            )
+
+    dc, ac = factors[0], factors[1:]
+    result = _encode83((x_components - 1) + (y_components - 1) * 9, 1)
+    if ac:
+        actual_max = max(float(np.abs(f).max()) for f in ac)
+        quantised_max = int(max(0, min(82, math.floor(actual_max * 166 - 0.5))))
+        max_value = (quantised_max + 1) / 166
+        result += _encode83(quantised_max, 1)
+    else:
+        max_value = 1.0
+        result += _encode83(0, 1)
+
+    r, g, b = (_linear_to_srgb(c) for c in dc)
+    result += _encode83((r << 16) + (g << 8) + b, 4)
+
+    def quantise(value):
+        scaled = math.copysign(abs(value / max_value) ** 0.5, value)
+        return int(max(0, min(18, math.floor(scaled * 9 + 9.5))))
+
+    for factor in ac:
+        r, g, b = (quantise(c) for c in factor)
+        result += _encode83(r * 19 * 19 + g * 19 + b, 2)
+    return result
+
+
+def extract_metadata(rel, root=IMAGE_ROOT, variants_root=None):
+    """Width, height, byte size and blurhash of the image at ``root/rel``.
+
+    With ``variants_root`` set, also writes a resized JPEG for every
+    ``VARIANT_WIDTHS`` entry to ``<variants_root>/<width>/<variant_path(rel)>``
+    and reports ``has_variants``. Returns ``None`` when the file is missing or
+    unreadable.
+    """
+    from PIL import Image as PILImage
+
+    path = os.path.join(root, rel)
+    try:
+        with PILImage.open(path) as img:
+            img = img.convert("RGB")
+            if variants_root:
+                _write_variants(img, rel, variants_root)
+            small = img.copy()
+            small.thumbnail((32, 32))
+            meta = {
+                "width": img.width,
+                "height": img.height,
+                "size_bytes": os.path.getsize(path),
+                "blurhash": blurhash(np.asarray(small)),
+            }
+            if variants_root:
+                meta["has_variants"] = True
+            return meta
+    except (OSError, ValueError):
+        return None
+
+
+def _write_variants(img, rel, variants_root):
+    for w in VARIANT_WIDTHS.values():
+        target = os.path.join(variants_root, str(w), variant_path(rel))
+        if os.path.exists(target):
+            continue
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        variant = img.copy()
+        # Never upscale: narrow originals are stored as-is under every width.
+        variant.thumbnail((w, max(1, img.height * w // img.width)))
+        variant.save(target, format="JPEG", quality=80, optimize=True)
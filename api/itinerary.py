@@ -0,0 +1,334 @@
+"""
+Visiting order for a day trip over a set of attractions.
+
+Distances are great-circle (haversine) kilometres computed as one NumPy
+matrix; the order comes from a nearest-neighbour tour improved by 2-opt,
+where every candidate reversal at a given position is scored in a single
+vectorized step. Given a start time, stops are also scheduled against their
+``attraction_hours`` intervals (see ``api.hours``): the tour waits for a stop
+to open, never arrives after it closes, and stops that cannot fit are
+returned separately. Attractions without parsed hours are treated as always
+open.
+
+Matrices are kept in a small LRU keyed by the stops' ids and coordinates, so
+repeating a set (a user's favourites, say) skips the O(n^2) distance work.
+"""
+
+import os
+import threading
+from collections import OrderedDict
+from datetime import timedelta
+
+import numpy as np
+
+from .hours import MINUTES_PER_WEEK, minute_of_week
+from .models import Attraction, AttractionHours, Favorite
+
+ITINERARY_CACHE_SIZE = int(os.getenv("ITINERARY_CACHE_SIZE", "256"))
+ITINERARY_MAX_STOPS = int(os.getenv("ITINERARY_MAX_STOPS", "100"))
+
+EARTH_RADIUS_KM = 6371.0088
+
+
+def haversine_matrix(lat, lon, lat2=None, lon2=None):
+    """Great-circle distances in km between two sets of points (between all
+    pairs of the first set when the second is omitted)."""
+    lat1, lon1 = np.radians(lat)[:, None], np.radians(lon)[:, None]
+    if lat2 is None:
+        lat2, lon2 = lat1.T, lon1.T
+    else:
+        lat2, lon2 = np.radians(lat2)[None, :], np.radians(lon2)[None, :]
+    a = (
+        np.sin((lat2 - lat1) / 2) ** 2
+        + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+class DistanceCache:
+    """Thread-safe LRU of distance matrices keyed by ``(id, lat, lon)``
+    triples, so moving an attraction simply misses the cache."""
+
+    def __init__(self, maxsize=ITINERARY_CACHE_SIZE):
+        self.maxsize = maxsize
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def matrix(self, ids, lat, lon):
+        """Distances between the points, in the order given."""
+        order = np.argsort(ids, kind="stable")
+        key = tuple(zip(ids[order].tolist(), lat[order].tolist(), lon[order].tolist()))
+        with self._lock:
+            matrix = self._entries.get(key)
+            if matrix is not None:
+                self._entries.move_to_end(key)
+        if matrix is None:
+            matrix = haversine_matrix(lat[order], lon[order])
+            matrix.setflags(write=False)
+            with self._lock:
+                self._entries[key] = matrix
+                while len(self._entries) > self.maxsize:
+                    self._entries.popitem(last=False)
+        rank = np.empty_like(order)
+        rank[order] = np.arange(len(order))
+        return matrix[np.ix_(rank, rank)]
+
+
+distance_cache = DistanceCache()
+
+
+class Schedule:
+    """Visit times along a route, in minutes after the trip starts.
+
+    ``windows[i]`` is a sorted ``(k, 2)`` array of ``[open, close)`` minutes
+    relative to the start, or ``None`` when stop ``i`` is always open;
+    ``travel`` holds minutes between stops and ``first`` from the origin. A
+    visit must fit ``dwell`` minutes before its window closes.
+    """
+
+    def __init__(self, windows, travel, first, dwell):
+        self.windows = windows
+        self.travel = travel
+        self.first = first
+        self.dwell = dwell
+
+    def window(self, stop, arrive):
+        """``(start, close)`` of the first visit possible when arriving at
+        ``arrive``, or ``None`` if the stop cannot be visited."""
+        spans = self.windows[stop]
+        if spans is None:
+            return arrive, np.inf
+        for opens, closes in spans:
+            start = max(arrive, opens)
+            if start + self.dwell <= closes:
+                return start, closes
+        return None
+
+    def begin(self, stop, arrive):
+        """When a visit arriving at ``arrive`` can start, or ``None``."""
+        found = self.window(stop, arrive)
+        return None if found is None else found[0]
+
+    def arrival(self, previous, clock, stop):
+        if previous is None:
+            return self.first[stop]
+        return clock + self.dwell + self.travel[previous, stop]
+
+    def times(self, route):
+        """Visit start times for ``route``, or ``None`` if a stop is missed."""
+        times, previous, clock = [], None, 0.0
+        for stop in route:
+            clock = self.begin(stop, self.arrival(previous, clock, stop))
+            if clock is None:
+                return None
+            times.append(clock)
+            previous = stop
+        return times
+
+
+def nearest_neighbour(dist, first_leg, schedule=None):
+    """Greedy route. Returns ``(route, unreachable)``.
+
+    With a ``schedule`` each step goes to the stop whose visit can start
+    soonest, unless that would make another stop miss its current opening
+    window; then the most urgent such stop (earliest closing) goes first.
+    """
+    remaining = np.ones(len(dist), dtype=bool)
+    route, legs, clock = [], first_leg, 0.0
+    while remaining.any():
+        if schedule is None:
+            stop = int(np.argmin(np.where(remaining, legs, np.inf)))
+        else:
+            previous = route[-1] if route else None
+            options = []
+            for candidate in np.flatnonzero(remaining):
+                arrive = schedule.arrival(previous, clock, candidate)
+                found = schedule.window(candidate, arrive)
+                if found is not None:
+                    options.append((found[0], found[1], int(candidate)))
+            if not options:
+                break
+            start, _, stop = min(options)
+
+            def slips(candidate, closes):
+                arrive = schedule.arrival(stop, start, candidate)
+                later = schedule.begin(candidate, arrive)
+                return later is None or later >= closes
+
+            urgent = [
+                (closes, begin, candidate)
+                for begin, closes, candidate in options
+                if candidate != stop and slips(candidate, closes)
+            ]
+            if urgent:
+                _, start, stop = min(urgent)
+            clock = start
+        route.append(stop)
+        remaining[stop] = False
+        legs = dist[stop]
+    return route, np.flatnonzero(remaining).tolist()
+
+
+def two_opt(route, dist, first_leg, schedule=None, max_passes=50):
+    """Improve an open ``route`` by segment reversals (2-opt).
+
+    The cost is ``first_leg[route[0]]`` plus the legs between stops, so with
+    a zero ``first_leg`` the route may start anywhere. For each position all
+    reversal end points are scored at once; with a ``schedule`` a shorter
+    route is only taken if every stop is still visited while open and the
+    last visit starts no later.
+    """
+    route = np.asarray(route)
+    n = len(route)
+    if n < 3:
+        return route.tolist()
+    # An extra node is the origin, whose leg to each stop is first_leg, so a
+    # reversal including the first stop is scored like any other.
+    origin = len(dist)
+    full = np.zeros((origin + 1, origin + 1))
+    full[:origin, :origin] = dist
+    full[origin, :origin] = first_leg
+    path = np.concatenate([[origin], route])
+    finish = schedule.times(route)[-1] if schedule else None
+    for _ in range(max_passes):
+        improved = False
+        for i in range(1, n):
+            a, b = path[i - 1], path[i]
+            c = path[i + 1 :]
+            d = np.append(path[i + 2 :], -1)
+            gain = full[a, b] + full[c, np.maximum(d, 0)] * (d >= 0)
+            gain -= full[a, c] + full[b, np.maximum(d, 0)] * (d >= 0)
+            for j in np.argsort(-gain):
+                if gain[j] <= 1e-9:
+                    break
+                candidate = path.copy()
+                candidate[i : i + j + 2] = candidate[i : i + j + 2][::-1]
+                if schedule is not None:
+                    times = schedule.times(candidate[1:])
+                    if times is None or times[-1] > finish:
+                        continue
+                    finish = times[-1]
+                path, improved = candidate, True
+                break
+        if not improved:
+            break
+    return path[1:].tolist()
+
+
+def opening_windows(db, ids, start):
+    """Per-stop ``[open, close)`` minute windows relative to ``start`` over
+    the following week, ``None`` for stops without parsed hours."""
+    offset = minute_of_week(start)
+    rows = (
+        db.query(
+            AttractionHours.attraction_id,
+            AttractionHours.start_minute,
+            AttractionHours.end_minute,
+        )
+        .filter(AttractionHours.attraction_id.in_(ids))
+        .all()
+    )
+    spans = {}
+    for attraction_id, opens, closes in rows:
+        for week in (0, MINUTES_PER_WEEK):
+            spans.setdefault(attraction_id, []).append(
+                (opens + week - offset, closes + week - offset)
+            )
+    windows = []
+    for attraction_id in ids:
+        found = spans.get(attraction_id)
+        windows.append(None if found is None else np.array(sorted(found)))
+    return windows
+
+
+def plan(
+    db,
+    ids,
+    start=None,
+    origin=None,
+    dwell_minutes=60,
+    speed_kmh=30.0,
+):
+    """Order ``ids`` into a short route.
+
+    ``origin`` is an optional ``(lat, lon)`` the trip leaves from; otherwise
+    the route starts wherever is best. With ``start`` (a datetime) visits are
+    scheduled against opening hours, travelling in a straight line at
+    ``speed_kmh`` and staying ``dwell_minutes`` at each stop.
+    """
+    ids = list(dict.fromkeys(ids))
+    rows = (
+        db.query(
+            Attraction.id, Attraction.name, Attraction.latitude, Attraction.longitude
+        )
+        .filter(Attraction.id.in_(ids))
+        .all()
+    )
+    located = {
+        row.id: row
+        for row in rows
+        if row.latitude is not None and row.longitude is not None
+    }
+    stops = [located[i] for i in ids if i in located]
+    skipped = [i for i in ids if i not in located]
+    result = {"stops": [], "total_km": 0.0, "distance_matrix": [], "skipped": skipped}
+    if not stops:
+        return result
+
+    stop_ids = np.array([s.id for s in stops], dtype=np.int64)
+    lat = np.array([s.latitude for s in stops], dtype=np.float64)
+    lon = np.array([s.longitude for s in stops], dtype=np.float64)
+    dist = distance_cache.matrix(stop_ids, lat, lon)
+    if origin is None:
+        first_leg = np.zeros(len(stops))
+    else:
+        first_leg = haversine_matrix(
+            np.array([origin[0]]), np.array([origin[1]]), lat, lon
+        )[0]
+
+    schedule = None
+    if start is not None:
+        minutes_per_km = 60.0 / speed_kmh
+        schedule = Schedule(
+            opening_windows(db, stop_ids.tolist(), start),
+            dist * minutes_per_km,
+            first_leg * minutes_per_km,
+            dwell_minutes,
+        )
+    route, unreachable = nearest_neighbour(dist, first_leg, schedule)
+    skipped += stop_ids[unreachable].tolist()
+    if not route:
+        return result
+    route = two_opt(route, dist, first_leg, schedule)
+    times = schedule.times(route) if schedule else None
+
+    legs = first_leg[route[:1]].tolist() + dist[route[:-1], route[1:]].tolist()
+    for k, stop in enumerate(route):
+        result["stops"].append(
+            {
+                "attraction_id": stops[stop].id,
+                "name": stops[stop].name,
+                "distance_km": round(legs[k], 3),
+                "visit_at": (
+                    None
+                    if times is None
+                    else start + timedelta(minutes=round(times[k]))
+                ),
+            }
+        )
+    result["total_km"] = round(sum(legs), 3)
+    result["distance_matrix"] = np.round(dist[np.ix_(route, route)], 3).tolist()
+    return result
+
+
+def favorite_ids(db, user_id):
+    return [
+        attraction_id
+        for (attraction_id,) in db.query(Favorite.attraction_id)
+        .filter(Favorite.user_id == user_id)
+        .order_by(Favorite.id)
+    ]
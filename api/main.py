@@ -1,19 +1,101 @@
-from fastapi import FastAPI, Depends, HTTPException
+import asyncio
+from contextlib import asynccontextmanager
+from datetime import datetime
+from typing import Literal, Optional
+
+from fastapi import FastAPI, Depends, HTTPException, Query
+from fastapi.responses import JSONResponse, PlainTextResponse
+from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.orm import Session
-from . import models, schemas, crud, recommender
-from .deps import get_db
+from starlette.concurrency import run_in_threadpool
+from . import models, schemas, crud, recommender, auth, passwords, itinerary, feed
+from . import fastread, profiling, stats
+from .deps import get_db, get_primary_db, engine, SessionLocal
+from .auth import get_current_user, require_admin
+from .partitions import ensure_partitions_for_engine
+from .coalesce import CallInterrupted, single_flight
+from .compression import CompressionMiddleware
+from .ratelimit import RateLimitMiddleware
+
+
+@asynccontextmanager
+async def lifespan(app):
+    if engine.dialect.name == "postgresql":
+        ensure_partitions_for_engine(engine)
+    refresher = None
+    if feed.FEED_REFRESH_INTERVAL > 0:
+        refresher = asyncio.create_task(feed.refresh_forever(SessionLocal))
+    yield
+    if refresher is not None:
+        refresher.cancel()
+
 
-app = FastAPI(title="PaiNaiDee API")
+app = FastAPI(title="PaiNaiDee API", lifespan=lifespan)
+app.add_middleware(CompressionMiddleware)
+if profiling.PROFILING_ENABLED:
+    profiling.install(app)
+# Added last so it runs first and rejects before any other work is done.
+app.add_middleware(RateLimitMiddleware)
+
+
+def coalesced(key, fn):
+    """Share one in-flight lookup between concurrent identical requests."""
+    try:
+        return single_flight.do(key, fn)
+    except TimeoutError:
+        raise HTTPException(status_code=504, detail="Upstream lookup timed out")
+    except CallInterrupted:
+        return fn()  # the leader went away; do the lookup ourselves
 
 
 @app.get("/attractions", response_model=list[schemas.AttractionOut])
-def read_attractions(skip: int = 0, limit: int = 20, db: Session = Depends(get_db)):
-    return crud.get_attractions(db, skip=skip, limit=limit)
+def read_attractions(
+    skip: int = 0,
+    limit: int = 20,
+    tags: list[int] = Query(default=[]),
+    tag_mode: Literal["all", "any"] = "all",
+    fields: Optional[str] = Query(
+        None, description="Comma-separated subset of fields, e.g. id,name,province"
+    ),
+    open_at: Optional[datetime] = Query(
+        None, description="Only attractions open at this time (Asia/Bangkok if naive)"
+    ),
+    max_fee: Optional[float] = Query(
+        None, ge=0, description="Only attractions whose cheapest ticket is <= this"
+    ),
+    db: Session = Depends(get_db),
+):
+    filters = {"open_at": open_at, "max_fee": max_fee}
+    if fields is None:
+        return fastread.get_attractions(
+            db, skip=skip, limit=limit, tag_ids=tags, tag_mode=tag_mode, **filters
+        )
+    selected = list(dict.fromkeys(f.strip() for f in fields.split(",") if f.strip()))
+    unknown = set(selected) - set(schemas.ATTRACTION_FIELDS)
+    if not selected or unknown:
+        raise HTTPException(
+            status_code=400, detail=f"Unknown fields: {', '.join(sorted(unknown))}"
+        )
+    # Rows are already plain column values, so skip response_model validation.
+    return JSONResponse(
+        crud.get_attractions(
+            db,
+            skip=skip,
+            limit=limit,
+            tag_ids=tags,
+            tag_mode=tag_mode,
+            fields=selected,
+            **filters,
+        )
+    )
 
 
 @app.get("/attractions/{attraction_id}", response_model=schemas.AttractionOut)
 def read_attraction(attraction_id: int, db: Session = Depends(get_db)):
-    db_attr = crud.get_attraction(db, attraction_id)
+    db_attr = coalesced(
+        ("attraction", attraction_id),
+        lambda: fastread.get_attraction(db, attraction_id),
+    )
     if not db_attr:
         raise HTTPException(status_code=404, detail="Not found")
     return db_attr
@@ -21,4 +103,208 @@ def read_attraction(attraction_id: int, db: Session = Depends(get_db)):
 
 @app.get("/recommend", response_model=list[schemas.AttractionOut])
 def recommend(user_id: int, db: Session = Depends(get_db)):
-    return recommender.recommend_for_user(db, user_id)
+    return coalesced(
+        ("recommend", user_id), lambda: recommender.recommend_for_user(db, user_id)
+    )
+
+
+@app.get(
+    "/stats",
+    response_model=list[schemas.StatsRow],
+    response_model_exclude_unset=True,
+)
+def read_stats(
+    group_by: list[Literal["province", "district", "category", "tag"]] = Query(
+        default=[]
+    ),
+    province: Optional[str] = None,
+    district: Optional[str] = None,
+    category: Optional[str] = None,
+    tag: Optional[str] = None,
+    db: Session = Depends(get_db),
+):
+    filters = {
+        "province": province,
+        "district": district,
+        "category": category,
+        "tag": tag,
+    }
+    return stats.stats_store.ensure_loaded(db).query(group_by, filters)
+
+
+@app.get("/feed", response_model=schemas.FeedPage)
+def read_feed(
+    user_id: int,
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_db),
+):
+    user_feed = feed.feed_store.get(db, user_id)
+    try:
+        ids, scores, next_cursor = feed.page(user_feed, limit, cursor)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    # Deleted attractions drop out of the lookup, so match scores by id.
+    score_of = dict(zip(ids, scores))
+    attractions = crud.get_attractions_by_ids(db, ids)
+    for attraction in attractions:
+        attraction.score = score_of[attraction.id]
+    return {"items": attractions, "next_cursor": next_cursor}
+
+
+@app.get("/itinerary", response_model=schemas.ItineraryOut)
+def plan_itinerary(
+    ids: list[int] = Query(default=[]),
+    user_id: Optional[int] = Query(None, description="Plan this user's favorites"),
+    start: Optional[datetime] = Query(
+        None, description="Schedule visits against opening hours from this time"
+    ),
+    lat: Optional[float] = Query(None, ge=-90, le=90),
+    lon: Optional[float] = Query(None, ge=-180, le=180),
+    dwell: int = Query(60, ge=0, le=24 * 60, description="Minutes at each stop"),
+    speed: float = Query(30.0, gt=0, le=200, description="Travel speed in km/h"),
+    db: Session = Depends(get_db),
+):
+    if user_id is not None:
+        ids = ids + itinerary.favorite_ids(db, user_id)
+    if not ids:
+        raise HTTPException(status_code=400, detail="Give ids or a user_id")
+    if len(set(ids)) > itinerary.ITINERARY_MAX_STOPS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {itinerary.ITINERARY_MAX_STOPS} stops per itinerary",
+        )
+    if (lat is None) != (lon is None):
+        raise HTTPException(status_code=400, detail="Give both lat and lon")
+    return itinerary.plan(
+        db,
+        ids,
+        start=start,
+        origin=None if lat is None else (lat, lon),
+        dwell_minutes=dwell,
+        speed_kmh=speed,
+    )
+
+
+@app.get(
+    "/attractions/{attraction_id}/similar",
+    response_model=list[schemas.SimilarAttractionOut],
+)
+def read_similar_attractions(
+    attraction_id: int,
+    limit: int = Query(10, ge=1, le=100),
+    db: Session = Depends(get_db),
+):
+    if not crud.get_attraction(db, attraction_id):
+        raise HTTPException(status_code=404, detail="Not found")
+    return crud.get_similar_attractions(db, attraction_id, limit=limit)
+
+
+@app.get("/attractions/{attraction_id}/images", response_model=list[schemas.ImageOut])
+def read_attraction_images(attraction_id: int, db: Session = Depends(get_db)):
+    return crud.get_images(db, attraction_id)
+
+
+@app.get("/attractions/{attraction_id}/reviews", response_model=schemas.ReviewPage)
+def read_attraction_reviews(
+    attraction_id: int,
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
+    since: Optional[datetime] = None,
+    db: Session = Depends(get_db),
+):
+    before = None
+    if cursor:
+        try:
+            before = crud.decode_review_cursor(cursor)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+    reviews = crud.get_reviews(
+        db, attraction_id, limit=limit + 1, before=before, since=since
+    )
+    next_cursor = None
+    if len(reviews) > limit:
+        reviews = reviews[:limit]
+        next_cursor = crud.encode_review_cursor(reviews[-1])
+    return {"items": reviews, "next_cursor": next_cursor}
+
+
+@app.post(
+    "/attractions/{attraction_id}/reviews",
+    response_model=schemas.ReviewOut,
+    status_code=201,
+)
+def create_attraction_review(
+    attraction_id: int,
+    review: schemas.ReviewCreate,
+    db: Session = Depends(get_primary_db),
+    current_user: models.User = Depends(get_current_user),
+):
+    if not crud.get_attraction(db, attraction_id):
+        raise HTTPException(status_code=404, detail="Not found")
+    return crud.create_review(
+        db, attraction_id, current_user.user_id, review.rating, review.comment
+    )
+
+
+@app.post("/favorites", response_model=schemas.FavoriteOut, status_code=201)
+def create_favorite(
+    favorite: schemas.FavoriteCreate,
+    db: Session = Depends(get_primary_db),
+    current_user: models.User = Depends(get_current_user),
+):
+    if not crud.get_attraction(db, favorite.attraction_id):
+        raise HTTPException(status_code=404, detail="Not found")
+    db_favorite = crud.create_favorite(db, current_user.user_id, favorite.attraction_id)
+    if db_favorite is None:
+        raise HTTPException(status_code=409, detail="Already a favorite")
+    return db_favorite
+
+
+@app.post("/token", response_model=schemas.Token)
+async def login(
+    form: OAuth2PasswordRequestForm = Depends(),
+    db: Session = Depends(get_primary_db),
+):
+    user = await run_in_threadpool(crud.get_user_by_username, db, form.username)
+    stored = user.password_hash if user else passwords.dummy_hash()
+    try:
+        ok, new_hash = await passwords.verify_and_update_async(form.password, stored)
+    except passwords.HasherBusy:
+        raise HTTPException(
+            status_code=503,
+            detail="Too many logins in progress",
+            headers={"Retry-After": "1"},
+        )
+    if user is None or not ok:
+        raise HTTPException(
+            status_code=401,
+            detail="Incorrect username or password",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    if new_hash:
+        user.password_hash = new_hash
+        await run_in_threadpool(db.commit)
+    return {
+        "access_token": auth.create_access_token(user.user_id),
+        "token_type": "bearer",
+    }
+
+
+@app.get("/admin/profile", response_class=PlainTextResponse)
+async def profile_process(
+    seconds: float = Query(5, gt=0, le=profiling.PROFILE_MAX_SECONDS),
+    admin: models.User = Depends(require_admin),
+):
+    """Sample every busy thread for ``seconds``; collapsed stacks."""
+    if not profiling.PROFILING_ENABLED:
+        raise HTTPException(status_code=404, detail="Profiling is disabled")
+    return await profiling.sample_process(seconds)
+
+
+@app.get("/admin/profiles/{profile_id}", response_class=PlainTextResponse)
+def read_profile(profile_id: str, admin: models.User = Depends(require_admin)):
+    stacks = profiling.profiles.get(profile_id)
+    if stacks is None:
+        raise HTTPException(status_code=404, detail="Not found")
+    return profiling.collapsed(stacks)
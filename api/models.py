@@ -2,15 +2,19 @@ from sqlalchemy.orm import declarative_base, relationship
 from sqlalchemy import (
     Column,
     Integer,
+    Boolean,
     String,
     Float,
     Text,
     DateTime,
     ForeignKey,
+    Index,
     UniqueConstraint,
 )
 from sqlalchemy.sql import func
 
+from .images import variant_urls
+
 Base = declarative_base()
 
 
@@ -61,6 +65,11 @@ class Attraction(Base):
     contact_phone = Column(String)
     website = Column(String)
     main_image_url = Column(String)
+    # Set by scripts/extract_image_metadata.py once resized copies exist.
+    main_image_has_variants = Column(Boolean)
+    # Parsed from entrance_fee / opening_hours by api/hours.py.
+    fee_min = Column(Float, index=True)
+    fee_max = Column(Float)
 
     category_obj = relationship("Category", back_populates="attractions")
     images = relationship("Image", back_populates="attraction")
@@ -68,6 +77,40 @@ class Attraction(Base):
     favorites = relationship("Favorite", back_populates="attraction")
     attraction_tags = relationship("AttractionTag", back_populates="attraction")
 
+    @property
+    def main_image_variants(self):
+        return variant_urls(self.main_image_url, self.main_image_has_variants)
+
+
+def _is_postgresql(ddl_kw):
+    return ddl_kw["dialect"].name == "postgresql"
+
+
+class AttractionHours(Base):
+    """Weekly opening interval [start_minute, end_minute) in minutes since
+    Monday 00:00 local time; maintained by api/hours.py."""
+
+    __tablename__ = "attraction_hours"
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    attraction_id = Column(
+        Integer, ForeignKey("attractions.id", ondelete="CASCADE"), nullable=False
+    )
+    start_minute = Column(Integer, nullable=False)
+    end_minute = Column(Integer, nullable=False)
+    __table_args__ = (
+        # "Open at minute m" is a range containment (api.hours.covers_minute):
+        # GiST on PostgreSQL, where a B-tree could only use start <= m.
+        Index(
+            "ix_attraction_hours_range",
+            func.int4range(start_minute, end_minute),
+            postgresql_using="gist",
+        ).ddl_if(dialect="postgresql"),
+        Index(
+            "ix_attraction_hours_open", "start_minute", "end_minute", "attraction_id"
+        ).ddl_if(callable_=lambda ddl, target, bind, **kw: not _is_postgresql(kw)),
+        Index("ix_attraction_hours_attraction", "attraction_id"),
+    )
+
 
 class Image(Base):
     __tablename__ = "Image"
@@ -75,18 +118,37 @@ class Image(Base):
     attraction_id = Column(Integer, ForeignKey("attractions.id"), nullable=False)
     image_url = Column(String, nullable=False)
     caption = Column(String)
+    # Filled in by scripts/extract_image_metadata.py; NULL until processed.
+    width = Column(Integer)
+    height = Column(Integer)
+    size_bytes = Column(Integer)
+    blurhash = Column(String)
+    has_variants = Column(Boolean)
 
     attraction = relationship("Attraction", back_populates="images")
 
+    @property
+    def variants(self):
+        return variant_urls(self.image_url, self.has_variants)
+
 
 class Review(Base):
+    # On PostgreSQL this table is range-partitioned by month on created_at
+    # (see api/partitions.py and the review partitioning migration), so the
+    # physical primary key there is (id, created_at). id stays unique through
+    # its sequence, which is all the ORM identity map needs.
     __tablename__ = "Review"
     id = Column(Integer, primary_key=True, autoincrement=True)
     attraction_id = Column(Integer, ForeignKey("attractions.id"), nullable=False)
     user_id = Column(Integer, ForeignKey("User.user_id"), nullable=False)
     rating = Column(Integer, nullable=False)
     comment = Column(Text)
-    created_at = Column(DateTime, server_default=func.now())
+    created_at = Column(DateTime, nullable=False, server_default=func.now())
+    __table_args__ = (
+        Index("ix_review_attraction_created", "attraction_id", "created_at", "id"),
+        Index("ix_review_user_created", "user_id", "created_at"),
+        Index("ix_review_created_at", "created_at"),
+    )
 
     attraction = relationship("Attraction", back_populates="reviews")
     user = relationship("User", back_populates="reviews")
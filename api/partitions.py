@@ -0,0 +1,99 @@
+"""
+Monthly range partitions for the ``Review`` table (PostgreSQL only).
+
+``Review`` is partitioned by ``created_at``; each month lives in its own
+partition named ``Review_yYYYYmMM``. Indexes are declared on the parent
+table, so PostgreSQL creates them on every partition automatically.
+
+Run ``python -m api.partitions`` from cron (or rely on the API startup hook)
+to keep ``REVIEW_PARTITION_MONTHS_AHEAD`` future partitions in place.
+"""
+
+import datetime
+import logging
+import os
+
+from sqlalchemy import text
+
+logger = logging.getLogger(__name__)
+
+REVIEW_TABLE = "Review"
+REVIEW_PARTITION_MONTHS_AHEAD = int(os.getenv("REVIEW_PARTITION_MONTHS_AHEAD", "3"))
+
+
+def month_start(value):
+    return datetime.date(value.year, value.month, 1)
+
+
+def add_months(month, n):
+    index = month.year * 12 + month.month - 1 + n
+    return datetime.date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month):
+    return f"{REVIEW_TABLE}_y{month.year:04d}m{month.month:02d}"
+
+
+def review_partition_ddl(first_month, last_month, parent=REVIEW_TABLE):
+    """``CREATE TABLE ... PARTITION OF`` statements for each month in range.
+
+    ``parent`` lets a migration fill a table that takes the name later.
+    """
+    statements = []
+    month = month_start(first_month)
+    while month <= last_month:
+        upper = add_months(month, 1)
+        statements.append(
+            f'CREATE TABLE IF NOT EXISTS "{partition_name(month)}" '
+            f'PARTITION OF "{parent}" '
+            f"FOR VALUES FROM ('{month.isoformat()}') TO ('{upper.isoformat()}')"
+        )
+        month = upper
+    return statements
+
+
+def is_partitioned(conn):
+    return bool(
+        conn.execute(
+            text(
+                "SELECT 1 FROM pg_partitioned_table p "
+                "JOIN pg_class c ON c.oid = p.partrelid WHERE c.relname = :name"
+            ),
+            {"name": REVIEW_TABLE},
+        ).scalar()
+    )
+
+
+def ensure_review_partitions(
+    conn, months_ahead=REVIEW_PARTITION_MONTHS_AHEAD, since=None, today=None
+):
+    """Create any missing monthly partitions from ``since`` to ``months_ahead``.
+
+    Does nothing on other dialects or when ``Review`` is not partitioned
+    (e.g. before the partitioning migration has run).
+    """
+    if conn.dialect.name != "postgresql" or not is_partitioned(conn):
+        return []
+    current = month_start(today or datetime.date.today())
+    statements = review_partition_ddl(
+        month_start(since) if since else current, add_months(current, months_ahead)
+    )
+    for statement in statements:
+        conn.execute(text(statement))
+    return statements
+
+
+def ensure_partitions_for_engine(engine, months_ahead=REVIEW_PARTITION_MONTHS_AHEAD):
+    try:
+        with engine.begin() as conn:
+            ensure_review_partitions(conn, months_ahead=months_ahead)
+    except Exception as e:
+        logger.warning("Could not create Review partitions: %s", e)
+
+
+if __name__ == "__main__":
+    from .deps import engine
+
+    with engine.begin() as conn:
+        for statement in ensure_review_partitions(conn):
+            print(statement)
@@ -0,0 +1,124 @@
+"""
+Password hashing with scrypt.
+
+Hashes are stored as ``scrypt$<n>$<r>$<p>$<salt>$<hash>`` (base64 salt and
+hash), so the cost parameters travel with each hash and can be raised later:
+``verify_and_update`` returns a fresh hash whenever the stored one was made
+with other parameters, or is a legacy unsalted SHA-256 hex digest written
+by older versions of ``db_script.py``.
+
+Hashing is CPU-heavy, so the API verifies in a small dedicated thread pool
+(``hashlib.scrypt`` releases the GIL) with a cap on queued logins; beyond it
+``HasherBusy`` is raised instead of letting a login storm queue up work that
+would starve everything else.
+"""
+
+import asyncio
+import base64
+import hashlib
+import hmac
+import os
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+SCRYPT_N = int(os.getenv("PASSWORD_SCRYPT_N", str(2**14)))
+SCRYPT_R = int(os.getenv("PASSWORD_SCRYPT_R", "8"))
+SCRYPT_P = int(os.getenv("PASSWORD_SCRYPT_P", "1"))
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", "2"))
+PASSWORD_HASH_MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", "64"))
+
+SALT_BYTES = 16
+KEY_BYTES = 32
+
+_LEGACY_SHA256 = re.compile(r"^[0-9a-f]{64}$")
+
+
+class HasherBusy(Exception):
+    """Too many password hashes are already queued."""
+
+
+def _b64(data):
+    return base64.b64encode(data).decode().rstrip("=")
+
+
+def _unb64(text):
+    return base64.b64decode(text + "=" * (-len(text) % 4))
+
+
+def _scrypt(password, salt, n, r, p):
+    return hashlib.scrypt(
+        password.encode(),
+        salt=salt,
+        n=n,
+        r=r,
+        p=p,
+        maxmem=256 * n * r + 1024 * 1024,
+        dklen=KEY_BYTES,
+    )
+
+
+def hash_password(password, n=None, r=None, p=None):
+    n, r, p = n or SCRYPT_N, r or SCRYPT_R, p or SCRYPT_P
+    salt = os.urandom(SALT_BYTES)
+    return f"scrypt${n}${r}${p}${_b64(salt)}${_b64(_scrypt(password, salt, n, r, p))}"
+
+
+def verify_password(password, stored):
+    if not stored:
+        return False
+    if _LEGACY_SHA256.match(stored):
+        digest = hashlib.sha256(password.encode()).hexdigest()
+        return hmac.compare_digest(digest, stored)
+    try:
+        scheme, n, r, p, salt, expected = stored.split("$")
+        if scheme != "scrypt":
+            return False
+        expected = _unb64(expected)
+        actual = _scrypt(password, _unb64(salt), int(n), int(r), int(p))
+    except ValueError:  # includes binascii.Error from a corrupt salt or hash
+        return False
+    return hmac.compare_digest(actual, expected)
+
+
+def needs_rehash(stored):
+    return not stored.startswith(f"scrypt${SCRYPT_N}${SCRYPT_R}${SCRYPT_P}$")
+
+
+def verify_and_update(password, stored):
+    """Return ``(ok, new_hash)``; ``new_hash`` is set when a rehash is due."""
+    if not verify_password(password, stored):
+        return False, None
+    return True, hash_password(password) if needs_rehash(stored) else None
+
+
+def dummy_hash():
+    """Hash to verify against when the user does not exist, so unknown
+    usernames take as long as wrong passwords.
+
+    Verifying costs the same scrypt run whatever the expected key is, so this
+    needs no hashing of its own (which would otherwise run on the caller's
+    thread, the event loop in ``/token``). Its all-zero key is not a scrypt
+    output anyone can find a password for.
+    """
+    salt, key = _b64(bytes(SALT_BYTES)), _b64(bytes(KEY_BYTES))
+    return f"scrypt${SCRYPT_N}${SCRYPT_R}${SCRYPT_P}${salt}${key}"
+
+
+_executor = ThreadPoolExecutor(
+    max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="password-hash"
+)
+_pending = threading.BoundedSemaphore(PASSWORD_HASH_MAX_PENDING)
+
+
+async def verify_and_update_async(password, stored):
+    """``verify_and_update`` in the hashing pool; raises ``HasherBusy``."""
+    if not _pending.acquire(blocking=False):
+        raise HasherBusy()
+    try:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            _executor, verify_and_update, password, stored
+        )
+    finally:
+        _pending.release()
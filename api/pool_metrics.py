@@ -0,0 +1,63 @@
+"""
+Database connection pool wait, the signal behind load shedding.
+
+``TimedQueuePool`` records how long each checkout waited in ``pool_wait``, a
+``DecayingAverage`` that ``ratelimit.RateLimitMiddleware`` compares with
+``LOAD_SHED_POOL_WAIT_MS``. Engines built with ``timed_engine`` (the primary
+and every replica) all feed it.
+"""
+
+import math
+import time
+
+from sqlalchemy import create_engine, make_url
+from sqlalchemy.pool import QueuePool
+
+
+class DecayingAverage:
+    """Exponentially weighted average that also decays toward zero over time.
+
+    Decaying on read matters for load shedding: once requests are being
+    rejected nothing new is observed, and a plain EWMA would stay high forever.
+    """
+
+    def __init__(self, tau=5.0):
+        self.tau = tau
+        self._value = 0.0
+        self._at = time.monotonic()
+
+    def _decayed(self, now):
+        return self._value * math.exp(-(now - self._at) / self.tau)
+
+    def observe(self, sample):
+        now = time.monotonic()
+        self._value = self._decayed(now) * 0.8 + sample * 0.2
+        self._at = now
+
+    @property
+    def value(self):
+        return self._decayed(time.monotonic())
+
+
+pool_wait = DecayingAverage()
+
+
+class TimedQueuePool(QueuePool):
+    """QueuePool that records how long checkouts wait in ``pool_wait``."""
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            pool_wait.observe(time.perf_counter() - start)
+
+
+def timed_engine(url, **kwargs):
+    """``create_engine`` with ``TimedQueuePool`` standing in for the dialect's
+    default pool when that is a ``QueuePool``; others (SQLite ``:memory:``'s
+    ``SingletonThreadPool``, say) are kept, so their wait is not recorded."""
+    url = make_url(url)
+    if issubclass(url.get_dialect().get_pool_class(url), QueuePool):
+        kwargs.setdefault("poolclass", TimedQueuePool)
+    return create_engine(url, **kwargs)
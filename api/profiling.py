@@ -0,0 +1,341 @@
+"""
+Opt-in request profiling.
+
+With ``PROFILING_ENABLED=true`` every response carries a ``Server-Timing``
+header splitting the request into phases:
+
+- ``deps``: resolving dependencies (``get_db``, ``get_current_user``, ...)
+- ``endpoint``: running the route function
+- ``sql``: time in the database driver (``desc`` holds the query count)
+- ``orm``: turning SELECT results into ORM objects, excluding ``sql``
+- ``serialize``: response model validation and JSON encoding
+- ``app``: everything until the response headers were sent
+
+``sql`` and ``orm`` overlap ``deps`` and ``endpoint``. Use ``phase(name)``
+to time anything else.
+
+Sending ``X-Profile: <PROFILING_TOKEN>`` also samples the request's threads
+with ``sys._current_frames()`` every ``PROFILE_INTERVAL_MS``; the response
+names the result in ``X-Profile-Id``, and admins fetch it as collapsed stacks
+(the input of flamegraph.pl and speedscope) from ``/admin/profiles/{id}``.
+``/admin/profile?seconds=N`` samples the whole process instead. The event
+loop thread is shared, so per-request profiles are cleanest under low
+concurrency.
+
+When disabled nothing is installed: no middleware, no event listeners.
+
+``deps``, ``endpoint`` and ``serialize`` come from wrapping private
+``fastapi.routing`` functions. ``install`` checks they still look the way
+this module expects and otherwise leaves them alone (with a warning), so a
+FastAPI upgrade can drop those phases but never break request handling.
+``test_routing_hooks_match_installed_fastapi`` flags such an upgrade.
+"""
+
+import asyncio
+import copy
+import functools
+import inspect
+import logging
+import os
+import sys
+import threading
+import uuid
+from collections import Counter, OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from time import perf_counter
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+from starlette.datastructures import Headers, MutableHeaders
+
+logger = logging.getLogger(__name__)
+
+PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "false").lower() == "true"
+# Required in X-Profile to sample a request; header sampling is off without it.
+PROFILING_TOKEN = os.getenv("PROFILING_TOKEN", "")
+PROFILE_INTERVAL = float(os.getenv("PROFILE_INTERVAL_MS", "2")) / 1000
+PROFILE_KEEP = int(os.getenv("PROFILE_KEEP", "50"))
+PROFILE_MAX_SECONDS = float(os.getenv("PROFILE_MAX_SECONDS", "60"))
+
+# Leaf frames in these files are threads waiting for work, not doing it.
+IDLE_FILES = ("threading.py", "selectors.py", "queue.py")
+
+_timings = ContextVar("request_timings", default=None)
+
+
+class Timings:
+    """Per-request phase totals, shared by every thread serving the request."""
+
+    __slots__ = ("phases", "threads")
+
+    def __init__(self):
+        self.phases = {}
+        self.threads = set()
+
+    def add(self, name, seconds, count=1):
+        total = self.phases.setdefault(name, [0.0, 0])
+        total[0] += seconds
+        total[1] += count
+
+    def seconds(self, name):
+        return self.phases.get(name, (0.0, 0))[0]
+
+    def header(self):
+        parts = []
+        for name, (seconds, count) in self.phases.items():
+            part = f"{name};dur={seconds * 1000:.2f}"
+            if name == "sql":
+                part += f';desc="{count} queries"'
+            parts.append(part)
+        return ", ".join(parts)
+
+
+@contextmanager
+def phase(name):
+    timings = _timings.get()
+    if timings is None:
+        yield
+        return
+    start = perf_counter()
+    try:
+        yield
+    finally:
+        timings.add(name, perf_counter() - start)
+
+
+def _label(code):
+    name = getattr(code, "co_qualname", code.co_name)
+    return f"{name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class Sampler(threading.Thread):
+    """Counts the call stacks of ``threads`` (all threads when ``None``)
+    every ``interval`` seconds until stopped."""
+
+    def __init__(self, threads=None, interval=PROFILE_INTERVAL):
+        super().__init__(name="profiler", daemon=True)
+        self.threads = threads
+        self.interval = interval
+        self.stacks = Counter()
+        self._done = threading.Event()
+
+    def run(self):
+        while not self._done.wait(self.interval):
+            self.sample()
+
+    def sample(self):
+        for ident, frame in sys._current_frames().items():
+            if ident == self.ident:
+                continue
+            if self.threads is not None and ident not in self.threads:
+                continue
+            if os.path.basename(frame.f_code.co_filename) in IDLE_FILES:
+                continue
+            stack = []
+            while frame is not None:
+                stack.append(_label(frame.f_code))
+                frame = frame.f_back
+            self.stacks[";".join(reversed(stack))] += 1
+
+    def stop(self):
+        self._done.set()
+        self.join()
+        return self.stacks
+
+
+def collapsed(stacks):
+    """Render stack counts in the collapsed ``a;b;c count`` format."""
+    return "".join(f"{stack} {count}\n" for stack, count in sorted(stacks.items()))
+
+
+class ProfileStore:
+    """The last ``keep`` request profiles, by id."""
+
+    def __init__(self, keep=PROFILE_KEEP):
+        self.keep = keep
+        self._lock = threading.Lock()
+        self._profiles = OrderedDict()
+
+    def put(self, profile_id, stacks):
+        with self._lock:
+            self._profiles[profile_id] = stacks
+            while len(self._profiles) > self.keep:
+                self._profiles.popitem(last=False)
+
+    def get(self, profile_id):
+        with self._lock:
+            return self._profiles.get(profile_id)
+
+
+profiles = ProfileStore()
+
+
+async def sample_process(seconds):
+    """Collapsed stacks of every busy thread over the next ``seconds``."""
+    sampler = Sampler()
+    sampler.start()
+    try:
+        await asyncio.sleep(min(seconds, PROFILE_MAX_SECONDS))
+    finally:
+        stacks = sampler.stop()
+    return collapsed(stacks)
+
+
+class ProfilingMiddleware:
+    def __init__(self, app, token=PROFILING_TOKEN):
+        self.app = app
+        self.token = token
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        timings = Timings()
+        timings.threads.add(threading.get_ident())
+        reset = _timings.set(timings)
+        sampler = profile_id = None
+        requested = Headers(scope=scope).get("x-profile")
+        if self.token and requested == self.token:
+            profile_id = uuid.uuid4().hex
+            sampler = Sampler(timings.threads)
+            sampler.start()
+        start = perf_counter()
+
+        async def send_with_timings(message):
+            if message["type"] == "http.response.start":
+                timings.add("app", perf_counter() - start)
+                headers = MutableHeaders(scope=message)
+                headers.append("Server-Timing", timings.header())
+                if profile_id is not None:
+                    headers["X-Profile-Id"] = profile_id
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timings)
+        finally:
+            _timings.reset(reset)
+            if sampler is not None:
+                profiles.put(profile_id, sampler.stop())
+
+
+def _timed(name, fn):
+    @functools.wraps(fn)
+    async def wrapper(*args, **kwargs):
+        timings = _timings.get()
+        if timings is None:
+            return await fn(*args, **kwargs)
+        start = perf_counter()
+        try:
+            return await fn(*args, **kwargs)
+        finally:
+            timings.add(name, perf_counter() - start)
+
+    return wrapper
+
+
+def _on_request_thread(fn, timings):
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        timings.threads.add(threading.get_ident())
+        return fn(*args, **kwargs)
+
+    return wrapper
+
+
+def _endpoint_runner(run):
+    @functools.wraps(run)
+    async def wrapper(*, dependant, values, is_coroutine):
+        timings = _timings.get()
+        if timings is not None and not is_coroutine:
+            # Sync endpoints run in the threadpool; sample that thread too.
+            dependant = copy.copy(dependant)
+            dependant.call = _on_request_thread(dependant.call, timings)
+        return await run(dependant=dependant, values=values, is_coroutine=is_coroutine)
+
+    return _timed("endpoint", wrapper)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, many):
+    if _timings.get() is not None:
+        conn.info.setdefault("profiling_start", []).append(perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, many):
+    timings = _timings.get()
+    starts = conn.info.get("profiling_start")
+    if timings is not None and starts:
+        timings.add("sql", perf_counter() - starts.pop())
+
+
+def _handle_error(context):
+    starts = (
+        context.connection.info.get("profiling_start") if context.connection else None
+    )
+    if starts:
+        starts.pop()
+
+
+def _time_orm_load(state):
+    timings = _timings.get()
+    options = state.execution_options
+    if (
+        timings is None
+        or not state.is_select
+        or options.get("yield_per")
+        or options.get("stream_results")
+    ):
+        return None
+    # Load every row now so hydration is timed here rather than wherever the
+    # caller happens to iterate; the frozen result replays the same rows.
+    sql_before = timings.seconds("sql")
+    start = perf_counter()
+    frozen = state.invoke_statement().freeze()
+    elapsed = perf_counter() - start - (timings.seconds("sql") - sql_before)
+    timings.add("orm", elapsed)
+    return frozen()
+
+
+# fastapi.routing functions wrapped for the deps, endpoint and serialize phases.
+ROUTING_HOOKS = ("solve_dependencies", "run_endpoint_function", "serialize_response")
+_ENDPOINT_RUNNER_PARAMS = {"dependant", "values", "is_coroutine"}
+
+
+def routing_hooks_supported(routing):
+    """Whether ``routing`` has the coroutine functions ``install`` wraps, with
+    the keyword arguments ``_endpoint_runner`` forwards."""
+    hooks = [getattr(routing, name, None) for name in ROUTING_HOOKS]
+    if not all(inspect.iscoroutinefunction(hook) for hook in hooks):
+        return False
+    params = inspect.signature(routing.run_endpoint_function).parameters
+    return set(params) == _ENDPOINT_RUNNER_PARAMS
+
+
+_installed = False
+
+
+def install(app, token=PROFILING_TOKEN):
+    """Add the middleware to ``app`` and hook SQLAlchemy and FastAPI's
+    request handling (process-wide, once)."""
+    global _installed
+    app.add_middleware(ProfilingMiddleware, token=token)
+    if _installed:
+        return
+    _installed = True
+    import fastapi
+    import fastapi.routing as routing
+
+    if routing_hooks_supported(routing):
+        routing.solve_dependencies = _timed("deps", routing.solve_dependencies)
+        routing.run_endpoint_function = _endpoint_runner(routing.run_endpoint_function)
+        routing.serialize_response = _timed("serialize", routing.serialize_response)
+    else:
+        logger.warning(
+            "FastAPI %s changed fastapi.routing; Server-Timing will not report "
+            "the deps, endpoint and serialize phases",
+            fastapi.__version__,
+        )
+    event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(Engine, "handle_error", _handle_error)
+    event.listen(Session, "do_orm_execute", _time_orm_load)
@@ -0,0 +1,219 @@
+"""
+Rate limiting and load shedding middleware.
+
+Three checks run before a request reaches the app, cheapest first:
+
+1. Load shedding: 503 when too many requests are in flight or the average
+   wait for a database connection (``pool_metrics.pool_wait``) is too high.
+2. Per-client token buckets keyed by JWT subject (or client IP): 429.
+3. Per-route concurrency limits: 503 when a route already has its maximum
+   number of requests running.
+
+Buckets live in process memory by default; set ``RATE_LIMIT_REDIS_URL`` to
+share them between workers through Redis.
+"""
+
+import math
+import os
+import time
+
+from jose import JWTError, jwt
+from starlette.datastructures import Headers
+from starlette.responses import JSONResponse
+from starlette.routing import compile_path
+
+from .auth import ALGORITHM, SECRET_KEY
+from .pool_metrics import pool_wait
+
+RATE_LIMIT_RATE = float(os.getenv("RATE_LIMIT_RATE", "50"))
+RATE_LIMIT_BURST = float(os.getenv("RATE_LIMIT_BURST", "100"))
+RATE_LIMIT_REDIS_URL = os.getenv("RATE_LIMIT_REDIS_URL")
+LOAD_SHED_MAX_IN_FLIGHT = int(os.getenv("LOAD_SHED_MAX_IN_FLIGHT", "256"))
+LOAD_SHED_POOL_WAIT_MS = float(os.getenv("LOAD_SHED_POOL_WAIT_MS", "200"))
+LOAD_SHED_RETRY_AFTER = int(os.getenv("LOAD_SHED_RETRY_AFTER", "1"))
+# e.g. "/recommend=16,/attractions/{attraction_id}/similar=8"
+ROUTE_CONCURRENCY = os.getenv("RATE_LIMIT_ROUTE_CONCURRENCY", "")
+
+EXEMPT_PATHS = ("/docs", "/openapi.json", "/redoc")
+
+
+class MemoryBuckets:
+    """Token buckets in a dict; only touched from the event loop thread."""
+
+    def __init__(self, rate, burst, max_keys=100_000):
+        self.rate = rate
+        self.burst = burst
+        self.max_keys = max_keys
+        self._buckets = {}
+
+    def take(self, key):
+        """Spend one token; return 0 if allowed, else seconds until one is free."""
+        now = time.monotonic()
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            if len(self._buckets) >= self.max_keys:
+                self._evict(now)
+            self._buckets[key] = [self.burst - 1, now]
+            return 0.0
+        tokens = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+        bucket[1] = now
+        if tokens >= 1:
+            bucket[0] = tokens - 1
+            return 0.0
+        bucket[0] = tokens
+        return (1 - tokens) / self.rate
+
+    def _evict(self, now):
+        # Buckets that would be full again carry no state worth keeping.
+        full_after = self.burst / self.rate
+        self._buckets = {
+            k: b for k, b in self._buckets.items() if now - b[1] < full_after
+        }
+
+
+class RedisBuckets:
+    """Token buckets shared through Redis (requires the ``redis`` package)."""
+
+    SCRIPT = """
+    local rate, burst, now = tonumber(ARGV[1]), tonumber(ARGV[2]), tonumber(ARGV[3])
+    local b = redis.call('HMGET', KEYS[1], 'tokens', 'at')
+    local tokens = tonumber(b[1]) or burst
+    local at = tonumber(b[2]) or now
+    tokens = math.min(burst, tokens + (now - at) * rate)
+    local wait = 0
+    if tokens >= 1 then tokens = tokens - 1 else wait = (1 - tokens) / rate end
+    redis.call('HSET', KEYS[1], 'tokens', tokens, 'at', now)
+    redis.call('EXPIRE', KEYS[1], math.ceil(burst / rate) + 1)
+    return tostring(wait)
+    """
+
+    def __init__(self, url, rate, burst):
+        import redis.asyncio
+
+        self.rate = rate
+        self.burst = burst
+        self._redis = redis.asyncio.from_url(url)
+        self._script = self._redis.register_script(self.SCRIPT)
+
+    async def take(self, key):
+        wait = await self._script(
+            keys=[f"ratelimit:{key}"], args=[self.rate, self.burst, time.time()]
+        )
+        return float(wait)
+
+
+class RouteConcurrency:
+    """Caps on simultaneously running requests per route path template."""
+
+    def __init__(self, limits):
+        self.routes = [
+            (compile_path(path)[0], path, limit) for path, limit in limits.items()
+        ]
+        self.running = {path: 0 for path in limits}
+
+    @classmethod
+    def parse(cls, spec):
+        limits = {}
+        for item in filter(None, (s.strip() for s in spec.split(","))):
+            path, _, limit = item.rpartition("=")
+            limits[path] = int(limit)
+        return cls(limits)
+
+    def match(self, path):
+        for regex, template, limit in self.routes:
+            if regex.match(path):
+                return template, limit
+        return None, None
+
+
+class RateLimitMiddleware:
+    def __init__(
+        self,
+        app,
+        rate=RATE_LIMIT_RATE,
+        burst=RATE_LIMIT_BURST,
+        max_in_flight=LOAD_SHED_MAX_IN_FLIGHT,
+        max_pool_wait=LOAD_SHED_POOL_WAIT_MS / 1000,
+        route_concurrency=ROUTE_CONCURRENCY,
+        redis_url=RATE_LIMIT_REDIS_URL,
+        pool_wait=pool_wait,
+    ):
+        self.app = app
+        self.buckets = (
+            RedisBuckets(redis_url, rate, burst)
+            if redis_url
+            else MemoryBuckets(rate, burst)
+        )
+        self.max_in_flight = max_in_flight
+        self.max_pool_wait = max_pool_wait
+        self.pool_wait = pool_wait
+        if isinstance(route_concurrency, dict):
+            self.routes = RouteConcurrency(route_concurrency)
+        else:
+            self.routes = RouteConcurrency.parse(route_concurrency or "")
+        self.in_flight = 0
+        self._subjects = {}
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"].startswith(EXEMPT_PATHS):
+            return await self.app(scope, receive, send)
+
+        if (
+            self.in_flight >= self.max_in_flight
+            or self.pool_wait.value > self.max_pool_wait
+        ):
+            return await self._reject(scope, receive, send, 503, LOAD_SHED_RETRY_AFTER)
+
+        wait = self.buckets.take(self.client_key(scope))
+        if not isinstance(wait, float):
+            wait = await wait
+        if wait > 0:
+            return await self._reject(scope, receive, send, 429, wait)
+
+        template, limit = self.routes.match(scope["path"])
+        if template is not None:
+            if self.routes.running[template] >= limit:
+                return await self._reject(
+                    scope, receive, send, 503, LOAD_SHED_RETRY_AFTER
+                )
+            self.routes.running[template] += 1
+
+        self.in_flight += 1
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.in_flight -= 1
+            if template is not None:
+                self.routes.running[template] -= 1
+
+    def client_key(self, scope):
+        auth = Headers(scope=scope).get("authorization", "")
+        if auth[:7].lower() == "bearer ":
+            subject = self._subject(auth[7:])
+            if subject is not None:
+                return f"sub:{subject}"
+        client = scope.get("client")
+        return f"ip:{client[0] if client else 'unknown'}"
+
+    def _subject(self, token):
+        cached = self._subjects.get(token)
+        now = time.time()
+        if cached is not None and (cached[1] is None or cached[1] > now):
+            return cached[0]
+        try:
+            payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        except JWTError:
+            return None
+        if len(self._subjects) > 10_000:
+            self._subjects.clear()
+        self._subjects[token] = (payload.get("sub"), payload.get("exp"))
+        return payload.get("sub")
+
+    async def _reject(self, scope, receive, send, status, retry_after):
+        detail = "Too many requests" if status == 429 else "Server busy"
+        response = JSONResponse(
+            {"detail": detail},
+            status_code=status,
+            headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+        )
+        await response(scope, receive, send)
@@ -1,4 +1,5 @@
-from pydantic import BaseModel
+from datetime import datetime
+from pydantic import BaseModel, Field
 from typing import Optional
 
 
@@ -13,8 +14,106 @@ class AttractionOut(BaseModel):
     longitude: Optional[float] = None
     opening_hours: Optional[str] = None
     entrance_fee: Optional[str] = None
+    fee_min: Optional[float] = None
+    fee_max: Optional[float] = None
     website: Optional[str] = None
     main_image_url: Optional[str] = None
+    main_image_variants: dict[str, str] = {}
 
     class Config:
         orm_mode = True
+
+
+ATTRACTION_FIELDS = tuple(AttractionOut.model_fields)
+
+
+class SimilarAttractionOut(AttractionOut):
+    similarity: float
+
+
+class FeedItem(AttractionOut):
+    score: float
+
+
+class FeedPage(BaseModel):
+    items: list[FeedItem]
+    next_cursor: Optional[str] = None
+
+
+class ImageOut(BaseModel):
+    id: int
+    image_url: str
+    caption: Optional[str] = None
+    width: Optional[int] = None
+    height: Optional[int] = None
+    size_bytes: Optional[int] = None
+    blurhash: Optional[str] = None
+    variants: dict[str, str] = {}
+
+    class Config:
+        orm_mode = True
+
+
+class ReviewOut(BaseModel):
+    id: int
+    attraction_id: int
+    user_id: int
+    rating: int
+    comment: Optional[str] = None
+    created_at: datetime
+
+    class Config:
+        orm_mode = True
+
+
+class ReviewCreate(BaseModel):
+    rating: int = Field(..., ge=1, le=5)
+    comment: Optional[str] = None
+
+
+class ReviewPage(BaseModel):
+    items: list[ReviewOut]
+    next_cursor: Optional[str] = None
+
+
+class Token(BaseModel):
+    access_token: str
+    token_type: str
+
+
+class FavoriteCreate(BaseModel):
+    attraction_id: int
+
+
+class FavoriteOut(BaseModel):
+    id: int
+    user_id: int
+    attraction_id: int
+
+    class Config:
+        orm_mode = True
+
+
+class ItineraryStop(BaseModel):
+    attraction_id: int
+    name: str
+    distance_km: float
+    visit_at: Optional[datetime] = None
+
+
+class ItineraryOut(BaseModel):
+    stops: list[ItineraryStop]
+    total_km: float
+    distance_matrix: list[list[float]]
+    skipped: list[int] = []
+
+
+class StatsRow(BaseModel):
+    province: Optional[str] = None
+    district: Optional[str] = None
+    category: Optional[str] = None
+    tag: Optional[str] = None
+    attractions: int
+    reviews: int
+    favorites: int
+    avg_rating: Optional[float] = None
@@ -0,0 +1,343 @@
+"""
+Pre-aggregated attraction statistics.
+
+Two cubes hold additive measures (``attractions``, ``reviews``,
+``rating_sum``, ``favorites``) at their finest grain:
+
+- the base cube, one cell per (province, district, category);
+- the tag cube, one cell per (tag, province, district, category), because
+  an attraction has several tags and tag totals cannot be derived from the
+  base cube.
+
+Every coarser grouping is a roll-up: the cells are summed over the dropped
+dimensions, never re-read from the base tables. Averages are derived from the
+sums (``avg_rating = rating_sum / reviews``) so they roll up correctly.
+
+Cubes are built from ``attractions``, ``Review``, ``Favorite``,
+``attraction_tags`` and ``Category`` on first use. Committed Review and
+Favorite inserts and deletes are applied to the cells as deltas; changes to
+attractions, categories or tags (rare) mark the cubes for a rebuild, as does
+``STATS_TTL``, which bounds staleness across worker processes.
+
+Builds scan the base tables without holding the store's lock; the new cubes
+are swapped in under it. ``CommitGate`` numbers local commits before they
+reach the database, and a build fixes its read snapshot at a moment when no
+commit is half-way through: commits numbered up to that point are in the
+snapshot, later ones are not. Deltas committed while a build runs are
+buffered and those after the snapshot are replayed onto the new cubes. The
+snapshot is a REPEATABLE READ transaction on PostgreSQL; elsewhere (SQLite in
+development) statements cannot share one, so commits wait for the build.
+"""
+
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import event, func, inspect, text
+from sqlalchemy.orm import Session
+
+from .models import Attraction, AttractionTag, Category, Favorite, Review, Tag
+
+STATS_TTL = float(os.getenv("STATS_TTL", "900"))
+
+DIMENSIONS = ("province", "district", "category")
+MEASURES = ("attractions", "reviews", "rating_sum", "favorites")
+
+
+class Cube:
+    """Additive measures per cell, keyed by a tuple of dimension values."""
+
+    def __init__(self, dims, frame=None):
+        self.dims = dims
+        self._row_of = {}
+        self.values = np.zeros((0, len(MEASURES)), dtype=np.int64)
+        if frame is not None and len(frame):
+            keys = frame[list(dims)].astype(object)
+            keys = keys.where(keys.notna(), None)
+            keys = list(keys.itertuples(index=False, name=None))
+            self._row_of = {key: row for row, key in enumerate(keys)}
+            self.values = frame[list(MEASURES)].to_numpy(dtype=np.int64)
+
+    def add(self, key, delta):
+        row = self._row_of.get(key)
+        if row is None:
+            row = self._row_of[key] = len(self.values)
+            self.values = np.vstack([self.values, np.zeros(len(MEASURES), np.int64)])
+        self.values[row] += delta
+
+    def frame(self):
+        keys = pd.DataFrame(list(self._row_of), columns=list(self.dims))
+        measures = pd.DataFrame(self.values, columns=list(MEASURES))
+        return pd.concat([keys, measures], axis=1)
+
+
+def _counts(db, column, value):
+    rows = db.query(column, value).group_by(column).all()
+    return pd.DataFrame(rows, columns=["id", "n"]).set_index("id")["n"]
+
+
+class CommitGate:
+    """Numbers this process's commits and lets a build wait for a moment when
+    none of them is between its number and its end."""
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self.last = 0  # most recent sequence number handed out
+        self._in_flight = 0
+        self._closed = False
+
+    def enter(self):
+        """Sequence number for a commit about to be sent to the database."""
+        with self._cond:
+            while self._closed:
+                self._cond.wait()
+            self.last += 1
+            self._in_flight += 1
+            return self.last
+
+    def leave(self):
+        """The commit from ``enter`` has finished, or failed."""
+        with self._cond:
+            self._in_flight -= 1
+            self._cond.notify_all()
+
+    @contextmanager
+    def quiesced(self):
+        """Hold new commits back and wait out the ones in flight; yields the
+        last sequence number, every commit up to which has finished."""
+        with self._cond:
+            while self._closed:
+                self._cond.wait()
+            self._closed = True
+            while self._in_flight:
+                self._cond.wait()
+            last = self.last
+        try:
+            yield last
+        finally:
+            with self._cond:
+                self._closed = False
+                self._cond.notify_all()
+
+
+class StatsStore:
+    def __init__(self, ttl=STATS_TTL):
+        self.ttl = ttl
+        self.gate = CommitGate()
+        self._lock = threading.Lock()
+        self._build_lock = threading.Lock()
+        self._dirty = True
+        self._loaded_at = 0.0
+        self.base = Cube(DIMENSIONS)
+        self.tags = Cube(("tag",) + DIMENSIONS)
+        self._cell_of = {}
+        self._tags_of = {}
+        self._pending = None  # (seq, deltas) committed during a build
+
+    def invalidate(self):
+        self._dirty = True
+
+    def _stale(self):
+        return self._dirty or time.monotonic() - self._loaded_at > self.ttl
+
+    def ensure_loaded(self, db):
+        if not self._stale():
+            return self
+        with self._build_lock:
+            if self._stale():
+                self._build(db)
+        return self
+
+    def _build(self, db):
+        with self._lock:
+            self._dirty = False
+            self._pending = []
+        try:
+            # Read the primary: a replica may not have this process's commits.
+            with db.bind.connect() as conn:
+                if conn.dialect.name == "postgresql":
+                    conn = conn.execution_options(isolation_level="REPEATABLE READ")
+                    with self.gate.quiesced() as snapshot:
+                        conn.execute(text("SELECT 1"))  # fixes the snapshot
+                    cubes = self._read(Session(bind=conn))
+                else:
+                    with self.gate.quiesced() as snapshot:
+                        cubes = self._read(Session(bind=conn))
+        except BaseException:
+            with self._lock:
+                self._pending = None
+                self._dirty = True
+            raise
+        with self._lock:
+            self.base, self.tags, self._cell_of, self._tags_of = cubes
+            pending, self._pending = self._pending, None
+            self._loaded_at = time.monotonic()
+            for seq, deltas in pending:
+                if seq > snapshot:
+                    self._add(deltas)
+
+    def _read(self, db):
+        """Cubes and attraction lookups from the base tables."""
+        attractions = pd.DataFrame(
+            db.query(
+                Attraction.id,
+                Attraction.province,
+                Attraction.district,
+                Category.name,
+            )
+            .outerjoin(Category, Attraction.category_id == Category.category_id)
+            .all(),
+            columns=["id", *DIMENSIONS],
+        ).set_index("id")
+        attractions = attractions.astype(object).where(attractions.notna(), None)
+        measures = pd.DataFrame(
+            {
+                "attractions": 1,
+                "reviews": _counts(db, Review.attraction_id, func.count()),
+                "rating_sum": _counts(
+                    db, Review.attraction_id, func.sum(Review.rating)
+                ),
+                "favorites": _counts(db, Favorite.attraction_id, func.count()),
+            },
+            index=attractions.index,
+        )
+        per_attraction = attractions.join(measures.fillna(0))
+        tagged = pd.DataFrame(
+            db.query(AttractionTag.attraction_id, Tag.name)
+            .join(Tag, AttractionTag.tag_id == Tag.tag_id)
+            .all(),
+            columns=["id", "tag"],
+        ).join(per_attraction, on="id", how="inner")
+
+        def roll_up(frame, dims):
+            return (
+                frame.groupby(list(dims), dropna=False)[list(MEASURES)]
+                .sum()
+                .reset_index()
+            )
+
+        tag_dims = ("tag",) + DIMENSIONS
+        return (
+            Cube(DIMENSIONS, roll_up(per_attraction, DIMENSIONS)),
+            Cube(tag_dims, roll_up(tagged, tag_dims)),
+            dict(
+                zip(attractions.index, attractions.itertuples(index=False, name=None))
+            ),
+            tagged.groupby("id")["tag"].agg(list).to_dict(),
+        )
+
+    def apply(self, deltas, seq):
+        """Add ``(attraction_id, measure deltas)`` pairs from commit ``seq``
+        (see ``CommitGate.enter``) to both cubes."""
+        with self._lock:
+            if self._pending is not None:
+                self._pending.append((seq, deltas))  # replayed after the build
+            elif not self._dirty:  # otherwise the rebuild will count these
+                self._add(deltas)
+
+    def _add(self, deltas):
+        for attraction_id, delta in deltas:
+            cell = self._cell_of.get(attraction_id)
+            if cell is None:
+                self._dirty = True
+                return
+            self.base.add(cell, delta)
+            for tag in self._tags_of.get(attraction_id, ()):
+                self.tags.add((tag,) + cell, delta)
+
+    def query(self, group_by=(), filters=None):
+        """Roll the cube up to ``group_by`` after keeping cells matching
+        ``filters`` (``{dimension: value}``); one dict per group."""
+        filters = {k: v for k, v in (filters or {}).items() if v is not None}
+        cube = self.tags if "tag" in group_by or "tag" in filters else self.base
+        with self._lock:
+            frame = cube.frame()
+        for dim, value in filters.items():
+            frame = frame[frame[dim] == value]
+        group_by = list(dict.fromkeys(group_by))
+        if group_by:
+            frame = frame.groupby(group_by, dropna=False)[list(MEASURES)].sum()
+            frame = frame.reset_index()
+        else:
+            frame = frame[list(MEASURES)].sum().to_frame().T
+        frame = frame.astype(object).where(frame.notna(), None)
+        out = []
+        for row in frame.to_dict("records"):
+            reviews = int(row.pop("reviews"))
+            rating_sum = int(row.pop("rating_sum"))
+            row["attractions"] = int(row["attractions"])
+            row["favorites"] = int(row["favorites"])
+            row["reviews"] = reviews
+            row["avg_rating"] = rating_sum / reviews if reviews else None
+            out.append(row)
+        return out
+
+
+stats_store = StatsStore()
+
+_REBUILD_ON = (Attraction, AttractionTag, Category, Tag)
+_ATTRACTION_DIMENSIONS = ("province", "district", "category_id")
+
+
+def _changed(obj, attribute):
+    return inspect(obj).attrs[attribute].history.has_changes()
+
+
+@event.listens_for(Session, "after_flush")
+def _track_stats_writes(session, flush_context):
+    deltas = session.info.setdefault("stats_deltas", [])
+    for sign, objects in ((1, session.new), (-1, session.deleted)):
+        for obj in objects:
+            if isinstance(obj, Review):
+                deltas.append(
+                    (obj.attraction_id, sign * np.array([0, 1, obj.rating, 0]))
+                )
+            elif isinstance(obj, Favorite):
+                deltas.append((obj.attraction_id, sign * np.array([0, 0, 0, 1])))
+            elif isinstance(obj, _REBUILD_ON):
+                session.info["stats_rebuild"] = True
+    for obj in session.dirty:
+        if isinstance(obj, Attraction):
+            changed = any(_changed(obj, name) for name in _ATTRACTION_DIMENSIONS)
+        else:
+            changed = isinstance(obj, _REBUILD_ON + (Review, Favorite))
+        if changed and session.is_modified(obj):
+            session.info["stats_rebuild"] = True
+
+
+@event.listens_for(Session, "before_commit")
+def _number_commit(session):
+    if "stats_seq" not in session.info:
+        session.info["stats_seq"] = stats_store.gate.enter()
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_stats_writes(session):
+    deltas = session.info.pop("stats_deltas", [])
+    if session.info.pop("stats_rebuild", False):
+        stats_store.invalidate()
+    elif deltas:
+        stats_store.apply(deltas, session.info["stats_seq"])
+
+
+def _release_commit(session):
+    if session.info.pop("stats_seq", None) is not None:
+        stats_store.gate.leave()
+
+
+@event.listens_for(Session, "after_transaction_end")
+def _end_commit(session, transaction):
+    if transaction.parent is None:
+        _release_commit(session)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_stats_writes(session):
+    session.info.pop("stats_deltas", None)
+    session.info.pop("stats_rebuild", None)
+    # A failed commit rolls the database back here, possibly long before the
+    # caller ends the session's transaction.
+    _release_commit(session)
@@ -0,0 +1,176 @@
+"""
+Denormalized tag bitsets for fast tag queries.
+
+Every attraction's tag set is packed into a row of ``uint64`` words (one bit
+per tag), so "has all/any of these tags" and Jaccard similarity become
+vectorized bitwise operations over a single NumPy matrix instead of
+multi-joins on ``attraction_tags``.
+"""
+
+import os
+import threading
+import time
+
+import numpy as np
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from .models import AttractionTag
+
+TAG_INDEX_TTL = float(os.getenv("TAG_INDEX_TTL", "300"))
+
+_POPCOUNT8 = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+def popcount(words):
+    """Count set bits per row of a ``(n, w)`` uint64 matrix."""
+    if hasattr(np, "bitwise_count"):
+        return np.bitwise_count(words).sum(axis=1, dtype=np.int64)
+    as_bytes = np.ascontiguousarray(words).view(np.uint8)
+    return _POPCOUNT8[as_bytes].reshape(len(words), -1).sum(axis=1, dtype=np.int64)
+
+
+class TagIndex:
+    """In-process bitset index of attraction tags.
+
+    The index is rebuilt lazily from ``attraction_tags`` on the next query
+    after it has been invalidated (by a committed ``AttractionTag`` write in
+    this process) or after ``ttl`` seconds, which bounds staleness across
+    worker processes and for bulk writes that bypass the ORM.
+    """
+
+    def __init__(self, ttl=TAG_INDEX_TTL):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._dirty = True
+        self._loaded_at = 0.0
+        self.attraction_ids = np.empty(0, dtype=np.int64)
+        self.bits = np.zeros((0, 1), dtype=np.uint64)
+        self._row_of = {}
+        self._bit_of = {}
+
+    def invalidate(self):
+        self._dirty = True
+
+    def _stale(self):
+        return self._dirty or time.monotonic() - self._loaded_at > self.ttl
+
+    def ensure_loaded(self, db):
+        if not self._stale():
+            return self
+        with self._lock:
+            if self._stale():
+                self._dirty = False
+                pairs = db.query(
+                    AttractionTag.attraction_id, AttractionTag.tag_id
+                ).all()
+                self._build(pairs)
+        return self
+
+    def _build(self, pairs):
+        attraction_ids = np.array(sorted({a for a, _ in pairs}), dtype=np.int64)
+        tag_ids = sorted({t for _, t in pairs})
+        bit_of = {tag_id: pos for pos, tag_id in enumerate(tag_ids)}
+        row_of = {int(a): row for row, a in enumerate(attraction_ids)}
+
+        n_words = max(1, (len(tag_ids) + 63) // 64)
+        bits = np.zeros((len(attraction_ids), n_words), dtype=np.uint64)
+        if pairs:
+            rows = np.fromiter((row_of[a] for a, _ in pairs), dtype=np.int64)
+            pos = np.fromiter((bit_of[t] for _, t in pairs), dtype=np.int64)
+            masks = np.left_shift(np.uint64(1), (pos % 64).astype(np.uint64))
+            np.bitwise_or.at(bits, (rows, pos // 64), masks)
+
+        self.attraction_ids, self.bits = attraction_ids, bits
+        self._row_of, self._bit_of = row_of, bit_of
+        self._loaded_at = time.monotonic()
+
+    def mask_for(self, tag_ids):
+        """Bitset for ``tag_ids``, or ``None`` if any tag is unknown."""
+        mask = np.zeros(self.bits.shape[1], dtype=np.uint64)
+        for tag_id in tag_ids:
+            pos = self._bit_of.get(tag_id)
+            if pos is None:
+                return None
+            mask[pos // 64] |= np.uint64(1) << np.uint64(pos % 64)
+        return mask
+
+    def match(self, tag_ids, mode="all"):
+        """Attraction ids having all (``mode="all"``) or any of ``tag_ids``."""
+        tag_ids = set(tag_ids)
+        if mode == "any":
+            tag_ids &= set(self._bit_of)
+            if not tag_ids:
+                return []
+        mask = self.mask_for(tag_ids)
+        if mask is None:
+            return []
+        hits = self.bits & mask
+        if mode == "all":
+            selected = (hits == mask).all(axis=1)
+        else:
+            selected = hits.any(axis=1)
+        return self.attraction_ids[selected].tolist()
+
+    def affinity(self, weights):
+        """Score every indexed attraction against a weighted set of others.
+
+        ``weights`` maps attraction ids to (possibly negative) weights; their
+        tags form a profile, and each attraction scores the profile weight of
+        its tags over the square root of its tag count. Returns scores in
+        [0, 1] aligned with ``attraction_ids``.
+        """
+        scores = np.zeros(len(self.attraction_ids))
+        known = [(self._row_of[a], w) for a, w in weights.items() if a in self._row_of]
+        if not known:
+            return scores
+        rows, w = map(np.array, zip(*known))
+        seen = np.unpackbits(self.bits[rows].view(np.uint8), axis=1, bitorder="little")
+        profile = w @ seen / np.abs(w).sum()
+        for pos in np.flatnonzero(profile):
+            column = (self.bits[:, pos // 64] >> np.uint64(pos % 64)) & np.uint64(1)
+            scores += profile[pos] * column
+        scores /= np.sqrt(np.maximum(popcount(self.bits), 1))
+        return np.clip(scores, 0.0, 1.0)
+
+    def similar(self, attraction_id, limit=10):
+        """``(attraction_id, jaccard)`` pairs most similar to ``attraction_id``."""
+        row = self._row_of.get(attraction_id)
+        if row is None:
+            return []
+        target = self.bits[row]
+        inter = popcount(self.bits & target)
+        union = popcount(self.bits | target)
+        scores = np.divide(
+            inter, union, out=np.zeros(len(inter), dtype=np.float64), where=union > 0
+        )
+        scores[row] = -1.0
+        candidates = np.flatnonzero(scores > 0)
+        if len(candidates) > limit:
+            top = np.argpartition(-scores[candidates], limit - 1)[:limit]
+            candidates = candidates[top]
+        order = candidates[
+            np.lexsort((self.attraction_ids[candidates], -scores[candidates]))
+        ]
+        return [(int(self.attraction_ids[i]), float(scores[i])) for i in order]
+
+
+tag_index = TagIndex()
+
+
+@event.listens_for(Session, "after_flush")
+def _track_tag_writes(session, flush_context):
+    changed = (*session.new, *session.dirty, *session.deleted)
+    if any(isinstance(obj, AttractionTag) for obj in changed):
+        session.info["tag_index_dirty"] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_tag_index(session):
+    if session.info.pop("tag_index_dirty", False):
+        tag_index.invalidate()
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_tag_writes(session):
+    session.info.pop("tag_index_dirty", None)
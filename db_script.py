@@ -1,6 +1,7 @@
-import requests
+import pandas as pd
 from sqlalchemy import (
     create_engine,
+    insert,
     Column,
     Integer,
     String,
@@ -14,9 +15,14 @@ from sqlalchemy import (
 # แก้ไข: เปลี่ยนการ import declarative_base ให้ถูกต้องสำหรับ SQLAlchemy 2.0+
 from sqlalchemy.orm import sessionmaker, relationship, declarative_base
 from sqlalchemy.sql import func  # สำหรับ TIMESTAMP
+import os
 import random
+import sys
 import datetime  # สำหรับสร้างวันที่/เวลาจำลอง
-import hashlib  # สำหรับ hash รหัสผ่านจำลอง
+from api.cleaning import clean_attractions, write_rejections
+from api.hours import week_intervals
+from api.models import AttractionHours
+from api.passwords import hash_password  # สำหรับ hash รหัสผ่านจำลอง (scrypt)
 
 # กำหนดค่าการเชื่อมต่อฐานข้อมูล PostgreSQL
 DB_USER = "postgres"
@@ -25,8 +31,14 @@ DB_HOST = "localhost"  # หรือ "db" ถ้าใช้ใน Docker
 DB_PORT = "5432"
 DB_NAME = "painaidee_db"
 
-# สร้าง URL การเชื่อมต่อฐานข้อมูล
-DATABASE_URL = f"postgresql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
+# ไฟล์รายงานแถวที่ไม่ผ่านการตรวจสอบ (แทนการ print ทีละแถว)
+REJECTION_REPORT = os.getenv("INGEST_REJECTION_REPORT", "rejected_attractions.csv")
+
+# สร้าง URL การเชื่อมต่อฐานข้อมูล (กำหนดเองได้ด้วย DATABASE_URL)
+DATABASE_URL = os.getenv(
+    "DATABASE_URL",
+    f"postgresql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}",
+)
 
 # สร้าง Engine สำหรับเชื่อมต่อฐานข้อมูล
 engine = create_engine(DATABASE_URL)
@@ -95,6 +107,8 @@ class Attraction(Base):
     contact_phone = Column(String)
     website = Column(String)
     main_image_url = Column(String)
+    fee_min = Column(Float)  # ค่าเข้าขั้นต่ำ/สูงสุด (บาท) ที่แยกจาก entrance_fee
+    fee_max = Column(Float)
 
     category_obj = relationship("Category", back_populates="attractions")
     images = relationship("Image", back_populates="attraction")
@@ -173,36 +187,17 @@ class AttractionTag(Base):
     tag = relationship("Tag", back_populates="attraction_tags")
 
 
-# สร้างตารางทั้งหมดในฐานข้อมูล (ถ้ายังไม่มี)
-# หมายเหตุ: หากตารางมีอยู่แล้วและมีข้อมูลอยู่แล้ว การรัน create_all() จะไม่สร้างตารางซ้ำ
-# และจะไม่เพิ่มคอลัมน์ใหม่ที่เพิ่มเข้ามาในโมเดล SQLAlchemy
-# หากคุณพบข้อผิดพลาด "UndefinedColumn" หลังจากรันสคริปต์
-# อาจจำเป็นต้องลบตารางที่มีปัญหาในฐานข้อมูลของคุณก่อน (เช่น DROP TABLE "User" CASCADE;)
-# เพื่อให้ SQLAlchemy สร้างตารางขึ้นมาใหม่พร้อม schema ที่ถูกต้อง
-Base.metadata.create_all(bind=engine)
-
-# --- ฟังก์ชันสำหรับดึงข้อมูลจาก API ---
-
+def init_db():
+    """สร้างตารางทั้งหมดในฐานข้อมูล (ถ้ายังไม่มี) สำหรับฐานข้อมูลทดลองเท่านั้น
 
-def fetch_data_from_api(api_url):
+    ฐานข้อมูลจริงควรใช้ ``alembic upgrade head`` แทน เพราะ create_all()
+    จะไม่เพิ่มคอลัมน์ใหม่หรือ index ให้ตารางที่มีอยู่แล้ว
+    (ฐานข้อมูลที่เคยสร้างด้วย create_all ให้รัน ``alembic stamp 0001_baseline`` ก่อน)
+    ไม่เรียกตอน import อีกต่อไป เพื่อไม่ให้แตะ schema โดยไม่ตั้งใจ
+    ตาราง attraction_hours นิยามไว้ใน api.models จึงต้องสร้างแยกหลังตาราง attractions
     """
-    ดึงข้อมูล JSON จาก URL API ที่ระบุ
-
-    Args:
-        api_url (str): URL ของ API ที่ต้องการดึงข้อมูล
-
-    Returns:
-        list: รายการของข้อมูล JSON ที่ได้จาก API หรือลิสต์ว่างถ้ามีข้อผิดพลาด
-    """
-    try:
-        print(f"กำลังดึงข้อมูลจาก: {api_url}")
-        response = requests.get(api_url)
-        response.raise_for_status()
-        print(f"ดึงข้อมูลสำเร็จจาก: {api_url}")
-        return response.json()
-    except requests.exceptions.RequestException as e:
-        print(f"ข้อผิดพลาดในการดึงข้อมูลจาก API ({api_url}): {e}")
-        return []
+    Base.metadata.create_all(bind=engine)
+    AttractionHours.__table__.create(bind=engine, checkfirst=True)
 
 
 # --- ฟังก์ชันสำหรับบันทึกข้อมูลลงฐานข้อมูล ---
@@ -230,14 +225,16 @@ def save_users_to_db(users_data):
                 .first()
             )
             if existing_user:
-                print(f"ข้ามผู้ใช้ '{username}' หรือ '{email}' เนื่องจากมีอยู่ในฐานข้อมูลแล้ว")
+                print(
+                    f"ข้ามผู้ใช้ '{username}' หรือ '{email}' เนื่องจากมีอยู่ในฐานข้อมูลแล้ว"
+                )
                 skipped_count += 1
                 user_ids.append(existing_user.user_id)  # แก้ไข: ใช้ user_id
                 continue
 
             # สร้างรหัสผ่านจำลองและ hash
             mock_password = f"password_{username}"
-            password_hash = hashlib.sha256(mock_password.encode()).hexdigest()
+            password_hash = hash_password(mock_password)
 
             user = User(
                 username=username,
@@ -319,47 +316,53 @@ def save_attractions_and_related_data(
     """บันทึกข้อมูลสถานที่และข้อมูลที่เกี่ยวข้อง (Image, Review, AttractionTag, Favorite)"""
     session = SessionLocal()
     saved_attractions_count = 0
-    skipped_attractions_count = 0
     try:
-        for attr_item in attractions_data:
-            name = attr_item.get("name")
-            if not name:
-                print(f"ข้ามสถานที่เนื่องจากไม่มีชื่อ: {attr_item}")
-                skipped_attractions_count += 1
-                continue
-
-            existing_attraction = session.query(Attraction).filter_by(name=name).first()
-            if existing_attraction:
-                print(f"ข้ามสถานที่ '{name}' เนื่องจากมีอยู่ในฐานข้อมูลแล้ว")
-                skipped_attractions_count += 1
-                continue
-
-            # ค้นหา category_id จากชื่อหมวดหมู่
-            category_id = all_category_ids.get(attr_item.get("category_name"))
-            if not category_id:
-                print(
-                    f"ข้ามสถานที่ '{name}' เนื่องจากไม่พบหมวดหมู่ '{attr_item.get('category_name')}'"
-                )
-                skipped_attractions_count += 1
-                continue
-
-            attraction = Attraction(
-                name=name,
-                description=attr_item.get("description"),
-                address=attr_item.get("address"),
-                province=attr_item.get("province"),
-                district=attr_item.get("district"),
-                latitude=attr_item.get("latitude"),
-                longitude=attr_item.get("longitude"),
-                category_id=category_id,
-                opening_hours=attr_item.get("opening_hours"),
-                entrance_fee=attr_item.get("entrance_fee"),
-                contact_phone=attr_item.get("contact_phone"),
-                website=attr_item.get("website"),
-                main_image_url=attr_item.get("main_image_url"),
+        # ตรวจสอบและปรับข้อมูลทั้งชุดแบบ columnar ก่อนบันทึก (ดู api/cleaning.py):
+        # พิกัดต้องอยู่ในประเทศไทย, ชื่อจังหวัด/อำเภอเป็นชื่อมาตรฐาน, ตัดชื่อซ้ำ
+        existing_names = [name for (name,) in session.query(Attraction.name)]
+        cleaned, rejected = clean_attractions(attractions_data, existing_names)
+        category_ids = cleaned["category_name"].map(all_category_ids)
+        unknown_category = category_ids.isna()
+        rejected = pd.concat(
+            [rejected, cleaned[unknown_category].assign(reason="unknown_category")]
+        )
+        cleaned = cleaned[~unknown_category].assign(
+            category_id=category_ids[~unknown_category].astype(int)
+        )
+        skipped_attractions_count = len(rejected)
+        if skipped_attractions_count:
+            counts = write_rejections(rejected, REJECTION_REPORT)
+            print(
+                f"ข้ามสถานที่ {skipped_attractions_count} รายการ "
+                f"(รายละเอียดใน {REJECTION_REPORT}): {counts}"
             )
+
+        columns = [
+            "name",
+            "description",
+            "address",
+            "province",
+            "district",
+            "latitude",
+            "longitude",
+            "category_id",
+            "opening_hours",
+            "entrance_fee",
+            "contact_phone",
+            "website",
+            "main_image_url",
+            "fee_min",
+            "fee_max",
+        ]
+        # เวลาเปิด-ปิดที่แยกไว้แล้ว ใช้สร้างแถว attraction_hours หลังได้ ID
+        hours = cleaned[["open_days", "open_minute", "close_minute"]]
+        attraction_ids = []
+        cleaned = cleaned.reindex(columns=columns).astype(object)
+        for attr_item in cleaned.where(cleaned.notna(), None).to_dict("records"):
+            attraction = Attraction(**attr_item)
             session.add(attraction)
             session.flush()  # เพื่อให้ได้ ID ของ attraction ก่อน commit
+            attraction_ids.append(attraction.id)
 
             # --- บันทึก Images สำหรับสถานที่นี้ ---
             for i in range(random.randint(1, 3)):  # สร้าง 1-3 รูปภาพต่อสถานที่
@@ -420,6 +423,11 @@ def save_attractions_and_related_data(
                     )
 
             saved_attractions_count += 1
+        intervals = week_intervals(attraction_ids, hours)
+        if len(intervals):
+            session.execute(
+                insert(AttractionHours.__table__), intervals.to_dict("records")
+            )
         session.commit()
         print(
             f"บันทึกสถานที่และข้อมูลที่เกี่ยวข้องสำเร็จ! บันทึกไป {saved_attractions_count} รายการ, ข้ามไป {skipped_attractions_count} รายการ"
@@ -523,103 +531,8 @@ def get_and_display_data():
 
 # --- Main Execution Logic ---
 if __name__ == "__main__":
-    # URL ตัวอย่างที่ใช้งานได้จริง
-    API_URL_USERS = "https://jsonplaceholder.typicode.com/users"
-    API_URL_POSTS = "https://jsonplaceholder.typicode.com/posts"
-
-    # 1. บันทึก Categories และ Tags ล่วงหน้า
-    predefined_categories = [
-        "สถานที่ท่องเที่ยว",
-        "ร้านอาหาร",
-        "ที่พัก",
-        "แหล่งช้อปปิ้ง",
-        "ธรรมชาติ",
-        "ประวัติศาสตร์",
-        "วัฒนธรรม",
-        "กิจกรรม",
-    ]
-    predefined_tags = [
-        "สวยงาม",
-        "สงบ",
-        "น่าสนใจ",
-        "อร่อย",
-        "สะดวกสบาย",
-        "ประวัติศาสตร์",
-        "วัฒนธรรม",
-        "ผจญภัย",
-        "ครอบครัว",
-        "ถ่ายรูปสวย",
-        "เดินป่า",
-        "วิวดี",
-    ]
-
-    category_name_to_id, tag_name_to_id = save_categories_and_tags_to_db(
-        predefined_categories, predefined_tags
-    )
-
-    # 2. ดึงและบันทึก Users
-    users_data_raw = fetch_data_from_api(API_URL_USERS)
-    all_user_ids = save_users_to_db(users_data_raw)
-
-    # 3. ดึง Posts และแปลงเป็นข้อมูล Attraction พร้อมสร้างข้อมูลจำลอง
-    posts_data_raw = fetch_data_from_api(API_URL_POSTS)
-    mock_attractions_data = []
-
-    provinces = ["กรุงเทพมหานคร", "เชียงใหม่", "ภูเก็ต", "ชลบุรี", "กาญจนบุรี", "อยุธยา"]
-    districts = [
-        "เมือง",
-        "บางรัก",
-        "จอมทอง",
-        "แม่ริม",
-        "ถลาง",
-        "บางละมุง",
-        "ไทรโยค",
-        "พระนครศรีอยุธยา",
-    ]
-    opening_hours_options = [
-        "เปิด 24 ชั่วโมง",
-        "จ-ศ 9:00-17:00",
-        "ทุกวัน 10:00-20:00",
-        "ปิดวันอังคาร",
-    ]
-    fees_options = ["ฟรี", "50 บาท", "100 บาท", "200 บาท", "ขึ้นอยู่กับกิจกรรม"]
-
-    for post in posts_data_raw:
-        if post.get("title"):
-            # สุ่มเลือกหมวดหมู่และแท็กสำหรับสถานที่นี้
-            random_category_name = random.choice(predefined_categories)
-
-            mock_attractions_data.append(
-                {
-                    "name": post["title"],
-                    "description": post.get("body", "ไม่มีคำอธิบายสำหรับสถานที่นี้"),
-                    "address": f"{random.randint(1, 100)} ถ.{random.choice(['สุขุมวิท', 'สีลม', 'รัชดา'])}",
-                    "province": random.choice(provinces),
-                    "district": random.choice(districts),
-                    "latitude": round(random.uniform(-90.0, 90.0), 6),
-                    "longitude": round(random.uniform(-180.0, 180.0), 6),
-                    "category_name": random_category_name,  # ใช้ชื่อหมวดหมู่เพื่อค้นหา ID
-                    "opening_hours": random.choice(opening_hours_options),
-                    "entrance_fee": random.choice(fees_options),
-                    "contact_phone": f"+66{random.randint(80, 99)}{random.randint(1000000, 9999999)}",
-                    "website": f"https://www.example.com/attraction/{post['id']}",
-                    "main_image_url": f"https://picsum.photos/seed/{post['id']}/1200/800",
-                }
-            )
-    print(f"สร้างข้อมูลสถานที่จำลองได้ {len(mock_attractions_data)} รายการ")
-
-    # 4. บันทึก Attractions และข้อมูลที่เกี่ยวข้อง
-    if (
-        mock_attractions_data
-        and all_user_ids
-        and category_name_to_id
-        and tag_name_to_id
-    ):
-        save_attractions_and_related_data(
-            mock_attractions_data, all_user_ids, category_name_to_id, tag_name_to_id
-        )
-    else:
-        print("ไม่สามารถบันทึกข้อมูลสถานที่ได้: ข้อมูลไม่ครบถ้วน (สถานที่, ผู้ใช้, หมวดหมู่, แท็ก)")
+    # ข้อมูลจำลองสร้างแบบ offline กำหนด seed ได้ และโหลดแบบ bulk ด้วย
+    # scripts/generate_dataset.py (แทนการดึงจาก jsonplaceholder แล้วบันทึกทีละแถว)
+    from scripts.generate_dataset import main
 
-    # 5. ดึงและแสดงข้อมูลทั้งหมดจากฐานข้อมูลเพื่อตรวจสอบ
-    get_and_display_data()
+    main(["--url", DATABASE_URL, *sys.argv[1:]])
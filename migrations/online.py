@@ -0,0 +1,377 @@
+"""
+Helpers for schema changes on large, busy tables without downtime.
+
+Plain Alembic operations run inside the migration's transaction and hold
+their locks until it commits: ``op.create_index`` blocks writes for the whole
+index build, and a ``CHECK``/``FOREIGN KEY`` scans the table under an
+exclusive lock. On PostgreSQL these helpers avoid that:
+
+* ``create_index_concurrently`` / ``drop_index_concurrently`` build and drop
+  indexes with ``CONCURRENTLY`` outside the transaction (partitioned tables
+  get one concurrent build per partition, then ``ATTACH``).
+* ``add_check_not_valid`` / ``add_foreign_key_not_valid`` add constraints
+  without checking existing rows; ``validate_constraint`` checks them later
+  under a lock that does not block reads or writes. ``set_not_null`` uses
+  the same trick so ``SET NOT NULL`` does not scan the table.
+* ``batched_backfill`` (SQL) and ``batched_apply`` (Python) update rows in
+  small committed batches, pausing between them, and record progress so an
+  interrupted run resumes where it stopped.
+* ``run_with_lock_timeout`` caps how long DDL waits for its lock (a waiting
+  ``ALTER TABLE`` queues every later query on the table behind it) and
+  retries with backoff instead.
+
+On other databases (SQLite in development and tests) each helper falls back
+to the plain operation.
+"""
+
+import logging
+import os
+import random
+import time
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.exc import OperationalError
+
+MIGRATION_LOCK_TIMEOUT = os.getenv("MIGRATION_LOCK_TIMEOUT", "3s")
+MIGRATION_LOCK_RETRIES = int(os.getenv("MIGRATION_LOCK_RETRIES", "5"))
+BACKFILL_BATCH_SIZE = int(os.getenv("MIGRATION_BACKFILL_BATCH_SIZE", "5000"))
+BACKFILL_PAUSE = float(os.getenv("MIGRATION_BACKFILL_PAUSE", "0.1"))
+
+LOCK_NOT_AVAILABLE = "55P03"
+
+log = logging.getLogger("alembic.online")
+
+backfill_progress = sa.Table(
+    "alembic_backfill_progress",
+    sa.MetaData(),
+    sa.Column("job", sa.String(200), primary_key=True),
+    sa.Column("last_key", sa.BigInteger, nullable=False),
+)
+
+
+def is_postgresql():
+    return op.get_bind().dialect.name == "postgresql"
+
+
+def quote(name):
+    return op.get_bind().dialect.identifier_preparer.quote(name)
+
+
+def _is_lock_timeout(exc):
+    orig = getattr(exc, "orig", None)
+    code = getattr(orig, "sqlstate", None) or getattr(orig, "pgcode", None)
+    return code == LOCK_NOT_AVAILABLE
+
+
+def run_with_lock_timeout(
+    fn, timeout=MIGRATION_LOCK_TIMEOUT, retries=MIGRATION_LOCK_RETRIES, backoff=1.0
+):
+    """Call ``fn()`` (which issues DDL) with ``lock_timeout`` set.
+
+    Each attempt runs in a savepoint (or, inside an autocommit block, as its
+    own statement); when the lock cannot be had in time the attempt is
+    rolled back and retried after a jittered exponential backoff, so the
+    migration never sits in the lock queue blocking traffic.
+    """
+    bind = op.get_bind()
+    if bind.dialect.name != "postgresql":
+        return fn()
+    autocommit = bind.get_execution_options().get("isolation_level") == "AUTOCOMMIT"
+    previous = bind.exec_driver_sql("SHOW lock_timeout").scalar()
+    for attempt in range(retries + 1):
+        try:
+            if autocommit:
+                bind.exec_driver_sql(f"SET lock_timeout = '{timeout}'")
+                try:
+                    return fn()
+                finally:
+                    bind.exec_driver_sql(f"SET lock_timeout = '{previous}'")
+            with bind.begin_nested():
+                bind.exec_driver_sql(f"SET LOCAL lock_timeout = '{timeout}'")
+                result = fn()
+                bind.exec_driver_sql(f"SET LOCAL lock_timeout = '{previous}'")
+            return result
+        except OperationalError as exc:
+            if not _is_lock_timeout(exc) or attempt == retries:
+                raise
+            delay = backoff * 2**attempt * random.uniform(0.5, 1.0)
+            log.warning(
+                "lock not acquired within %s, retrying in %.1fs", timeout, delay
+            )
+            time.sleep(delay)
+
+
+def _relkind(table):
+    return (
+        op.get_bind()
+        .execute(
+            sa.text("SELECT relkind FROM pg_class WHERE oid = to_regclass(:t)"),
+            {"t": quote(table)},
+        )
+        .scalar()
+    )
+
+
+def _partitions(table):
+    return (
+        op.get_bind()
+        .execute(
+            sa.text(
+                "SELECT c.relname FROM pg_inherits i "
+                "JOIN pg_class c ON c.oid = i.inhrelid "
+                "WHERE i.inhparent = to_regclass(:t) ORDER BY c.relname"
+            ),
+            {"t": quote(table)},
+        )
+        .scalars()
+        .all()
+    )
+
+
+def _drop_if_invalid(name):
+    # A failed CREATE INDEX CONCURRENTLY leaves an INVALID index behind that
+    # IF NOT EXISTS would happily keep; drop it so the build starts over.
+    valid = (
+        op.get_bind()
+        .execute(
+            sa.text(
+                "SELECT i.indisvalid FROM pg_index i "
+                "WHERE i.indexrelid = to_regclass(:name)"
+            ),
+            {"name": quote(name)},
+        )
+        .scalar()
+    )
+    if valid is False:
+        op.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {quote(name)}")
+
+
+def create_index_concurrently(name, table, columns, unique=False, **kw):
+    """Build an index without blocking writes to ``table``."""
+    if not is_postgresql():
+        op.create_index(name, table, columns, unique=unique, **kw)
+        return
+    if _relkind(table) != "p":
+        with op.get_context().autocommit_block():
+            _drop_if_invalid(name)
+            op.create_index(
+                name,
+                table,
+                columns,
+                unique=unique,
+                postgresql_concurrently=True,
+                if_not_exists=True,
+                **kw,
+            )
+        return
+
+    # Partitioned tables cannot be indexed concurrently as a whole: create
+    # the (invalid) parent index ON ONLY the parent, build each partition's
+    # index concurrently and attach it; the parent becomes valid once every
+    # partition is attached.
+    cols = ", ".join(quote(c) for c in columns)
+    unique_sql = "UNIQUE " if unique else ""
+    run_with_lock_timeout(
+        lambda: op.execute(
+            f"CREATE {unique_sql}INDEX IF NOT EXISTS {quote(name)} "
+            f"ON ONLY {quote(table)} ({cols})"
+        )
+    )
+    for partition in _partitions(table):
+        child = f"{partition}_{name}"[:63]
+        with op.get_context().autocommit_block():
+            _drop_if_invalid(child)
+            op.execute(
+                f"CREATE {unique_sql}INDEX CONCURRENTLY IF NOT EXISTS {quote(child)} "
+                f"ON {quote(partition)} ({cols})"
+            )
+        attached = (
+            op.get_bind()
+            .execute(
+                sa.text(
+                    "SELECT 1 FROM pg_inherits "
+                    "WHERE inhrelid = to_regclass(:c) AND inhparent = to_regclass(:p)"
+                ),
+                {"c": quote(child), "p": quote(name)},
+            )
+            .scalar()
+        )
+        if not attached:
+            run_with_lock_timeout(
+                lambda: op.execute(
+                    f"ALTER INDEX {quote(name)} ATTACH PARTITION {quote(child)}"
+                )
+            )
+
+
+def drop_index_concurrently(name, table):
+    if not is_postgresql():
+        op.drop_index(name, table_name=table)
+        return
+    if _relkind(table) == "p":
+        # Not supported on partitioned tables; dropping is quick once locked.
+        run_with_lock_timeout(lambda: op.drop_index(name, table_name=table))
+        return
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            name, table_name=table, postgresql_concurrently=True, if_exists=True
+        )
+
+
+def add_check_not_valid(name, table, condition):
+    """Add a CHECK constraint enforced for new rows only; call
+    ``validate_constraint`` afterwards to check existing rows."""
+    if not is_postgresql():
+        with op.batch_alter_table(table) as batch:
+            batch.create_check_constraint(name, condition)
+        return
+    run_with_lock_timeout(
+        lambda: op.execute(
+            f"ALTER TABLE {quote(table)} ADD CONSTRAINT {quote(name)} "
+            f"CHECK ({condition}) NOT VALID"
+        )
+    )
+
+
+def add_foreign_key_not_valid(name, source, referent, local_cols, remote_cols):
+    """Add a FOREIGN KEY enforced for new rows only; call
+    ``validate_constraint`` afterwards to check existing rows."""
+    if not is_postgresql():
+        with op.batch_alter_table(source) as batch:
+            batch.create_foreign_key(name, referent, local_cols, remote_cols)
+        return
+    local = ", ".join(quote(c) for c in local_cols)
+    remote = ", ".join(quote(c) for c in remote_cols)
+    run_with_lock_timeout(
+        lambda: op.execute(
+            f"ALTER TABLE {quote(source)} ADD CONSTRAINT {quote(name)} "
+            f"FOREIGN KEY ({local}) REFERENCES {quote(referent)} ({remote}) NOT VALID"
+        )
+    )
+
+
+def validate_constraint(table, name):
+    """Check existing rows against a ``NOT VALID`` constraint.
+
+    Runs in its own transaction so the scan holds only SHARE UPDATE
+    EXCLUSIVE on the table, not the stronger locks taken earlier in the
+    migration.
+    """
+    if not is_postgresql():
+        return
+    with op.get_context().autocommit_block():
+        run_with_lock_timeout(
+            lambda: op.execute(
+                f"ALTER TABLE {quote(table)} VALIDATE CONSTRAINT {quote(name)}"
+            )
+        )
+
+
+def set_not_null(table, column, existing_type):
+    """``SET NOT NULL`` without a full-table scan under an exclusive lock.
+
+    PostgreSQL skips the scan when a validated ``CHECK (col IS NOT NULL)``
+    already proves it, so add one ``NOT VALID``, validate it, then drop it.
+    """
+    if not is_postgresql():
+        with op.batch_alter_table(table) as batch:
+            batch.alter_column(column, existing_type=existing_type, nullable=False)
+        return
+    check = f"{table}_{column}_not_null"[:63]
+    add_check_not_valid(check, table, f"{quote(column)} IS NOT NULL")
+    validate_constraint(table, check)
+    run_with_lock_timeout(
+        lambda: op.alter_column(
+            table, column, existing_type=existing_type, nullable=False
+        )
+    )
+    op.drop_constraint(check, table, type_="check")
+
+
+def batched_backfill(
+    table,
+    set_clause,
+    where=None,
+    key="id",
+    job=None,
+    batch_size=BACKFILL_BATCH_SIZE,
+    pause=BACKFILL_PAUSE,
+    params=None,
+):
+    """``UPDATE table SET <set_clause> [WHERE <where>]`` in committed batches
+    (see ``batched_apply``); ``set_clause`` must be idempotent. Returns the
+    number of rows updated.
+    """
+    condition = f" AND ({where})" if where else ""
+    update = sa.text(
+        f"UPDATE {quote(table)} SET {set_clause} "
+        f"WHERE {quote(key)} > :lo AND {quote(key)} <= :hi{condition}"
+    )
+    return batched_apply(
+        table,
+        lambda bind, lo, hi: bind.execute(
+            update, {**(params or {}), "lo": lo, "hi": hi}
+        ).rowcount,
+        key=key,
+        job=job or f"{table}:{set_clause}"[:200],
+        batch_size=batch_size,
+        pause=pause,
+    )
+
+
+def batched_apply(
+    table, fn, key="id", job=None, batch_size=BACKFILL_BATCH_SIZE, pause=BACKFILL_PAUSE
+):
+    """Call ``fn(bind, lo, hi)`` for successive key ranges ``lo < key <= hi``.
+
+    Rows are walked in ``key`` order (an integer, indexed column) ``batch_size``
+    at a time, sleeping ``pause`` seconds between batches so replicas and
+    other traffic keep up. Each batch commits on its own. The last finished
+    key is stored under ``job`` in ``alembic_backfill_progress``, and a rerun
+    after a failure continues from there; since a batch can be repeated,
+    ``fn`` must be idempotent. Returns the sum of what ``fn`` returned.
+    """
+    bind = op.get_bind()
+    job = job or f"{table}:{getattr(fn, '__name__', 'apply')}"[:200]
+    t, k = quote(table), quote(key)
+    next_upper = sa.text(
+        f"SELECT max({k}) FROM (SELECT {k} FROM {t} "
+        f"WHERE {k} > :lo ORDER BY {k} LIMIT :n) AS batch"
+    )
+
+    done = 0
+    with op.get_context().autocommit_block():
+        backfill_progress.create(bind, checkfirst=True)
+        lo = bind.execute(
+            sa.select(backfill_progress.c.last_key).where(
+                backfill_progress.c.job == job
+            )
+        ).scalar()
+        if lo is None:
+            lo = bind.execute(sa.text(f"SELECT min({k}) - 1 FROM {t}")).scalar()
+            if lo is None:
+                return 0
+            bind.execute(backfill_progress.insert().values(job=job, last_key=lo))
+        else:
+            log.info("resuming backfill %s after %s=%s", job, key, lo)
+
+        while True:
+            hi = bind.execute(next_upper, {"lo": lo, "n": batch_size}).scalar()
+            if hi is None:
+                break
+            # Autocommit: the batch commits before its progress is recorded,
+            # so a crash in between only means this batch runs again.
+            done += fn(bind, lo, hi) or 0
+            bind.execute(
+                backfill_progress.update()
+                .where(backfill_progress.c.job == job)
+                .values(last_key=hi)
+            )
+            lo = hi
+            if pause:
+                time.sleep(pause)
+
+        bind.execute(backfill_progress.delete().where(backfill_progress.c.job == job))
+    log.info("backfill %s processed %d rows", job, done)
+    return done
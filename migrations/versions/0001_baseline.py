@@ -0,0 +1,130 @@
+"""Baseline schema as created by Base.metadata.create_all
+
+Revision ID: 0001_baseline
+Revises:
+Create Date: 2026-10-18 12:00:00.000000
+
+Databases that were created with ``create_all`` before migrations existed
+already have this schema: run ``alembic stamp 0001_baseline`` on them once,
+then ``alembic upgrade head``.
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "0001_baseline"
+down_revision: Union[str, Sequence[str], None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "User",
+        sa.Column("user_id", sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column("username", sa.String(), nullable=False),
+        sa.Column("email", sa.String(), nullable=False),
+        sa.Column("password_hash", sa.String(), nullable=False),
+        sa.Column("avatar_url", sa.String(), nullable=True),
+        sa.Column("role", sa.String(), nullable=True),
+        sa.PrimaryKeyConstraint("user_id"),
+        sa.UniqueConstraint("email"),
+        sa.UniqueConstraint("username"),
+    )
+    op.create_table(
+        "Category",
+        sa.Column("category_id", sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column("name", sa.String(), nullable=False),
+        sa.Column("description", sa.Text(), nullable=True),
+        sa.Column("icon_url", sa.String(), nullable=True),
+        sa.PrimaryKeyConstraint("category_id"),
+        sa.UniqueConstraint("name"),
+    )
+    op.create_table(
+        "Tag",
+        sa.Column("tag_id", sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column("name", sa.String(), nullable=False),
+        sa.PrimaryKeyConstraint("tag_id"),
+        sa.UniqueConstraint("name"),
+    )
+    op.create_table(
+        "attractions",
+        sa.Column("id", sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column("name", sa.String(), nullable=False),
+        sa.Column("description", sa.Text(), nullable=True),
+        sa.Column("address", sa.String(), nullable=True),
+        sa.Column("province", sa.String(), nullable=True),
+        sa.Column("district", sa.String(), nullable=True),
+        sa.Column("latitude", sa.Float(), nullable=True),
+        sa.Column("longitude", sa.Float(), nullable=True),
+        sa.Column("category_id", sa.Integer(), nullable=True),
+        sa.Column("opening_hours", sa.String(), nullable=True),
+        sa.Column("entrance_fee", sa.String(), nullable=True),
+        sa.Column("contact_phone", sa.String(), nullable=True),
+        sa.Column("website", sa.String(), nullable=True),
+        sa.Column("main_image_url", sa.String(), nullable=True),
+        sa.ForeignKeyConstraint(["category_id"], ["Category.category_id"]),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("name"),
+    )
+    op.create_table(
+        "Image",
+        sa.Column("id", sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column("attraction_id", sa.Integer(), nullable=False),
+        sa.Column("image_url", sa.String(), nullable=False),
+        sa.Column("caption", sa.String(), nullable=True),
+        sa.ForeignKeyConstraint(["attraction_id"], ["attractions.id"]),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_table(
+        "Review",
+        sa.Column("id", sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column("attraction_id", sa.Integer(), nullable=False),
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("rating", sa.Integer(), nullable=False),
+        sa.Column("comment", sa.Text(), nullable=True),
+        sa.Column(
+            "created_at",
+            sa.DateTime(),
+            server_default=sa.text("(CURRENT_TIMESTAMP)"),
+            nullable=True,
+        ),
+        sa.ForeignKeyConstraint(["attraction_id"], ["attractions.id"]),
+        sa.ForeignKeyConstraint(["user_id"], ["User.user_id"]),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_table(
+        "Favorite",
+        sa.Column("id", sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("attraction_id", sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(["attraction_id"], ["attractions.id"]),
+        sa.ForeignKeyConstraint(["user_id"], ["User.user_id"]),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("user_id", "attraction_id", name="_user_attraction_uc"),
+    )
+    op.create_table(
+        "attraction_tags",
+        sa.Column("attraction_id", sa.Integer(), nullable=False),
+        sa.Column("tag_id", sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(["attraction_id"], ["attractions.id"]),
+        sa.ForeignKeyConstraint(["tag_id"], ["Tag.tag_id"]),
+        sa.PrimaryKeyConstraint("attraction_id", "tag_id"),
+        sa.UniqueConstraint("attraction_id", "tag_id", name="_attraction_tag_uc"),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table("attraction_tags")
+    op.drop_table("Favorite")
+    op.drop_table("Review")
+    op.drop_table("Image")
+    op.drop_table("attractions")
+    op.drop_table("Tag")
+    op.drop_table("Category")
+    op.drop_table("User")
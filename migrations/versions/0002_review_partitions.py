@@ -0,0 +1,176 @@
+"""Range-partition Review by month on created_at
+
+Revision ID: 0002_review_partitions
+Revises: 0001_baseline
+Create Date: 2026-10-18 10:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from api.partitions import (
+    REVIEW_PARTITION_MONTHS_AHEAD,
+    add_months,
+    month_start,
+    review_partition_ddl,
+)
+from migrations.online import (
+    batched_apply,
+    batched_backfill,
+    run_with_lock_timeout,
+    set_not_null,
+)
+
+# revision identifiers, used by Alembic.
+revision: str = "0002_review_partitions"
+down_revision: Union[str, Sequence[str], None] = "0001_baseline"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+REVIEW_INDEXES = {
+    "ix_review_attraction_created": ["attraction_id", "created_at", "id"],
+    "ix_review_user_created": ["user_id", "created_at"],
+    "ix_review_created_at": ["created_at"],
+}
+REVIEW_COLUMNS = "id, attraction_id, user_id, rating, comment, created_at"
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    bind = op.get_bind()
+    if bind.dialect.name != "postgresql":
+        # Declarative partitioning is PostgreSQL-only; elsewhere just index.
+        batched_backfill(
+            "Review", "created_at = CURRENT_TIMESTAMP", where="created_at IS NULL"
+        )
+        set_not_null("Review", "created_at", sa.DateTime())
+        for name, columns in REVIEW_INDEXES.items():
+            op.create_index(name, "Review", columns)
+        return
+
+    # Build the partitioned table next to the live one, copy the rows over in
+    # small batches while a trigger mirrors new reviews, then swap the names
+    # in one short transaction.
+    op.execute("""
+        CREATE TABLE IF NOT EXISTS "Review_partitioned" (
+            id INTEGER NOT NULL DEFAULT nextval('"Review_id_seq"'::regclass),
+            attraction_id INTEGER NOT NULL REFERENCES attractions (id),
+            user_id INTEGER NOT NULL REFERENCES "User" (user_id),
+            rating INTEGER NOT NULL,
+            comment TEXT,
+            created_at TIMESTAMP WITHOUT TIME ZONE NOT NULL DEFAULT now(),
+            PRIMARY KEY (id, created_at)
+        ) PARTITION BY RANGE (created_at)
+        """)
+    # Every month holding a review gets its own partition, so the default
+    # partition stays empty and range scans prune down to the months asked for.
+    oldest, newest = bind.execute(
+        sa.text('SELECT min(created_at), max(created_at) FROM "Review"')
+    ).one()
+    current = month_start(_today(bind))
+    last = add_months(current, REVIEW_PARTITION_MONTHS_AHEAD)
+    for statement in review_partition_ddl(
+        month_start(oldest) if oldest else current,
+        max(last, month_start(newest)) if newest else last,
+        parent="Review_partitioned",
+    ):
+        op.execute(statement)
+    # Catches rows outside the pre-created months instead of failing inserts.
+    op.execute(
+        'CREATE TABLE IF NOT EXISTS "Review_default" '
+        'PARTITION OF "Review_partitioned" DEFAULT'
+    )
+    # Still empty, so plain index builds are instant.
+    for name, columns in REVIEW_INDEXES.items():
+        op.create_index(name, "Review_partitioned", columns, if_not_exists=True)
+
+    op.execute(f"""
+        CREATE OR REPLACE FUNCTION "Review_mirror"() RETURNS trigger
+        LANGUAGE plpgsql AS $$
+        BEGIN
+            INSERT INTO "Review_partitioned" ({REVIEW_COLUMNS})
+            VALUES (NEW.id, NEW.attraction_id, NEW.user_id, NEW.rating,
+                    NEW.comment, COALESCE(NEW.created_at, now()));
+            RETURN NULL;
+        END $$
+        """)
+    # Creating the trigger waits for in-flight inserts, so every review is
+    # either committed before the copy reads its batch or mirrored.
+    run_with_lock_timeout(_add_mirror_trigger)
+    # Skips ids already present, whether mirrored or copied by an
+    # interrupted earlier run.
+    copy = sa.text(f"""
+        INSERT INTO "Review_partitioned" ({REVIEW_COLUMNS})
+        SELECT id, attraction_id, user_id, rating, comment,
+               COALESCE(created_at, now())
+        FROM "Review" r
+        WHERE r.id > :lo AND r.id <= :hi
+          AND NOT EXISTS (SELECT 1 FROM "Review_partitioned" p WHERE p.id = r.id)
+        """)
+    batched_apply(
+        "Review",
+        lambda conn, lo, hi: conn.execute(copy, {"lo": lo, "hi": hi}).rowcount,
+        job="0002_review_partitions:copy",
+    )
+
+    run_with_lock_timeout(_swap_review_tables)
+
+
+def _add_mirror_trigger():
+    op.execute('DROP TRIGGER IF EXISTS "Review_mirror" ON "Review"')
+    op.execute(
+        'CREATE TRIGGER "Review_mirror" AFTER INSERT ON "Review" '
+        'FOR EACH ROW EXECUTE FUNCTION "Review_mirror"()'
+    )
+
+
+def _swap_review_tables():
+    op.execute('DROP TRIGGER "Review_mirror" ON "Review"')
+    op.execute('DROP FUNCTION "Review_mirror"()')
+    op.execute('ALTER TABLE "Review" RENAME TO "Review_unpartitioned"')
+    op.execute('ALTER TABLE "Review_partitioned" RENAME TO "Review"')
+    op.execute('ALTER SEQUENCE "Review_id_seq" OWNED BY "Review".id')
+    op.execute('DROP TABLE "Review_unpartitioned"')
+    op.execute('ALTER INDEX "Review_partitioned_pkey" RENAME TO "Review_pkey"')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    bind = op.get_bind()
+    if bind.dialect.name != "postgresql":
+        for name in REVIEW_INDEXES:
+            op.drop_index(name, table_name="Review")
+        with op.batch_alter_table("Review") as batch:
+            batch.alter_column("created_at", existing_type=sa.DateTime(), nullable=True)
+        return
+
+    op.execute('ALTER TABLE "Review" RENAME TO "Review_partitioned"')
+    op.execute('ALTER INDEX "Review_pkey" RENAME TO "Review_partitioned_pkey"')
+    for name in REVIEW_INDEXES:
+        op.execute(f'ALTER INDEX "{name}" RENAME TO "{name}_partitioned"')
+    op.execute("""
+        CREATE TABLE "Review" (
+            id INTEGER NOT NULL DEFAULT nextval('"Review_id_seq"'::regclass)
+                PRIMARY KEY,
+            attraction_id INTEGER NOT NULL REFERENCES attractions (id),
+            user_id INTEGER NOT NULL REFERENCES "User" (user_id),
+            rating INTEGER NOT NULL,
+            comment TEXT,
+            created_at TIMESTAMP WITHOUT TIME ZONE NOT NULL DEFAULT now()
+        )
+        """)
+    op.execute(
+        'INSERT INTO "Review" (id, attraction_id, user_id, rating, comment, created_at) '
+        'SELECT id, attraction_id, user_id, rating, comment, created_at FROM "Review_partitioned"'
+    )
+    op.execute('ALTER SEQUENCE "Review_id_seq" OWNED BY "Review".id')
+    op.execute('DROP TABLE "Review_partitioned" CASCADE')
+    for name, columns in REVIEW_INDEXES.items():
+        op.create_index(name, "Review", columns)
+
+
+def _today(bind):
+    return bind.execute(sa.text("SELECT current_date")).scalar()
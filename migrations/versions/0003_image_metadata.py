@@ -0,0 +1,42 @@
+"""Add image metadata columns
+
+Revision ID: 0003_image_metadata
+Revises: 0002_review_partitions
+Create Date: 2026-10-18 11:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from migrations.online import run_with_lock_timeout
+
+# revision identifiers, used by Alembic.
+revision: str = "0003_image_metadata"
+down_revision: Union[str, Sequence[str], None] = "0002_review_partitions"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+
+    # Nullable columns without defaults are a catalog-only change, but the
+    # brief ACCESS EXCLUSIVE lock still queues behind long readers.
+    def add_columns():
+        op.add_column("Image", sa.Column("width", sa.Integer(), nullable=True))
+        op.add_column("Image", sa.Column("height", sa.Integer(), nullable=True))
+        op.add_column("Image", sa.Column("size_bytes", sa.Integer(), nullable=True))
+        op.add_column("Image", sa.Column("blurhash", sa.String(), nullable=True))
+
+    run_with_lock_timeout(add_columns)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column("Image", "blurhash")
+    op.drop_column("Image", "size_bytes")
+    op.drop_column("Image", "height")
+    op.drop_column("Image", "width")
@@ -0,0 +1,197 @@
+"""Structured opening hours and fee ranges
+
+Revision ID: 0004_structured_hours
+Revises: 0003_image_metadata
+Create Date: 2026-10-18 13:00:00.000000
+
+"""
+
+import re
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from migrations.online import (
+    batched_apply,
+    create_index_concurrently,
+    run_with_lock_timeout,
+)
+
+# revision identifiers, used by Alembic.
+revision: str = "0004_structured_hours"
+down_revision: Union[str, Sequence[str], None] = "0003_image_metadata"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# The backfill below uses a frozen copy of the parsing rules and table shapes
+# as of this revision (api/cleaning.py, api/hours.py), so replaying the
+# migration later does not depend on how the application code has evolved.
+
+attractions = sa.table(
+    "attractions",
+    sa.column("id", sa.Integer),
+    sa.column("opening_hours", sa.String),
+    sa.column("entrance_fee", sa.String),
+    sa.column("fee_min", sa.Float),
+    sa.column("fee_max", sa.Float),
+)
+attraction_hours = sa.table(
+    "attraction_hours",
+    sa.column("attraction_id", sa.Integer),
+    sa.column("start_minute", sa.Integer),
+    sa.column("end_minute", sa.Integer),
+)
+
+MINUTES_PER_DAY = 24 * 60
+MINUTES_PER_WEEK = 7 * MINUTES_PER_DAY
+# Monday = 0.
+DAY_TOKENS = {
+    **dict.fromkeys(["จันทร์", "จ", "monday", "mon"], 0),
+    **dict.fromkeys(["อังคาร", "อ", "tuesday", "tues", "tue"], 1),
+    **dict.fromkeys(["พุธ", "พ", "wednesday", "wed"], 2),
+    **dict.fromkeys(["พฤหัสบดี", "พฤหัส", "พฤ", "thursday", "thurs", "thu"], 3),
+    **dict.fromkeys(["ศุกร์", "ศ", "friday", "fri"], 4),
+    **dict.fromkeys(["เสาร์", "ส", "saturday", "sat"], 5),
+    **dict.fromkeys(["อาทิตย์", "อา", "sunday", "sun"], 6),
+}
+_DAY = "|".join(sorted(DAY_TOKENS, key=len, reverse=True))
+_TO = r"\s*(?:-|–|ถึง|to)\s*"
+_TIME_RANGE = re.compile(rf"(\d{{1,2}})[:.](\d{{2}}){_TO}(\d{{1,2}})[:.](\d{{2}})")
+_DAY_RANGE = re.compile(rf"(?:วัน)?({_DAY})\.?{_TO}(?:วัน)?({_DAY})\.?")
+_CLOSED_DAY = re.compile(
+    rf"(?:ปิด(?:ทุก)?(?:วัน)?|closed\s+(?:on\s+)?(?:every\s+)?)({_DAY})"
+)
+_ALL_DAY = re.compile(r"24\s*(?:ชั่วโมง|ชม|hours?|hrs?|h\b)")
+_EVERY_DAY = re.compile(r"ทุกวัน|daily|every\s*day")
+_FREE = re.compile(r"ฟรี|free|ไม่เสียค่า|ไม่มีค่า")
+
+
+def parse_fee(text):
+    """``(fee_min, fee_max)`` in baht, ``None`` where no price is given."""
+    if text is None:
+        return None, None
+    t = re.sub(r"(?<=\d),(?=\d{3})", "", text.casefold())
+    numbers = [float(n) for n in re.findall(r"\d+(?:\.\d+)?", t)]
+    free = _FREE.search(t) is not None
+    fee_min = min(numbers) if numbers else None
+    fee_max = max(numbers) if numbers else None
+    if free:
+        fee_min = 0.0
+        fee_max = 0.0 if fee_max is None else fee_max
+    return fee_min, fee_max
+
+
+def parse_intervals(text):
+    """Weekly ``(start_minute, end_minute)`` intervals, split at Sunday
+    midnight; none unless both the days and the times are known."""
+    if text is None:
+        return []
+    t = text.casefold()
+    times = _TIME_RANGE.search(t)
+    opens = closes = None
+    if times:
+        h1, m1, h2, m2 = map(int, times.groups())
+        opens, closes = h1 * 60 + m1, h2 * 60 + m2
+        if closes <= opens:
+            closes += MINUTES_PER_DAY
+    all_day = _ALL_DAY.search(t) is not None
+    if all_day:
+        opens, closes = 0, MINUTES_PER_DAY
+
+    days = set(range(7))
+    day_range = _DAY_RANGE.search(t)
+    if day_range:
+        first, last = (DAY_TOKENS[g] for g in day_range.groups())
+        days = {d for d in range(7) if (d - first) % 7 <= (last - first) % 7}
+    closed = _CLOSED_DAY.search(t)
+    if closed:
+        days.discard(DAY_TOKENS[closed.group(1)])
+    parsed = day_range or closed or all_day or _EVERY_DAY.search(t) or opens is not None
+    if not parsed or opens is None:
+        return []
+    intervals = []
+    for day in sorted(days):
+        start, end = day * MINUTES_PER_DAY + opens, day * MINUTES_PER_DAY + closes
+        intervals.append((start, min(end, MINUTES_PER_WEEK)))
+        if end > MINUTES_PER_WEEK:
+            intervals.append((0, end - MINUTES_PER_WEEK))
+    return intervals
+
+
+def rebuild(bind, lo, hi):
+    """Fill fees and hours for attractions with ``lo < id <= hi``."""
+    in_range = sa.and_(attractions.c.id > lo, attractions.c.id <= hi)
+    rows = bind.execute(
+        sa.select(
+            attractions.c.id, attractions.c.opening_hours, attractions.c.entrance_fee
+        ).where(in_range)
+    ).all()
+    if not rows:
+        return 0
+    fees, hours = [], []
+    for id_, opening_hours, entrance_fee in rows:
+        fee_min, fee_max = parse_fee(entrance_fee)
+        fees.append({"b_id": id_, "b_min": fee_min, "b_max": fee_max})
+        hours += [
+            {"attraction_id": id_, "start_minute": start, "end_minute": end}
+            for start, end in parse_intervals(opening_hours)
+        ]
+    bind.execute(
+        attractions.update()
+        .where(attractions.c.id == sa.bindparam("b_id"))
+        .values(fee_min=sa.bindparam("b_min"), fee_max=sa.bindparam("b_max")),
+        fees,
+    )
+    bind.execute(
+        attraction_hours.delete().where(
+            attraction_hours.c.attraction_id > lo,
+            attraction_hours.c.attraction_id <= hi,
+        )
+    )
+    if hours:
+        bind.execute(attraction_hours.insert(), hours)
+    return len(rows)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+
+    def add_columns():
+        op.add_column("attractions", sa.Column("fee_min", sa.Float(), nullable=True))
+        op.add_column("attractions", sa.Column("fee_max", sa.Float(), nullable=True))
+
+    run_with_lock_timeout(add_columns)
+    op.create_table(
+        "attraction_hours",
+        sa.Column("id", sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column("attraction_id", sa.Integer(), nullable=False),
+        sa.Column("start_minute", sa.Integer(), nullable=False),
+        sa.Column("end_minute", sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(
+            ["attraction_id"], ["attractions.id"], ondelete="CASCADE"
+        ),
+        sa.PrimaryKeyConstraint("id"),
+    )
+
+    # Parse the free text in committed, resumable batches, then index: the
+    # backfill does not pay for index maintenance and the build is online.
+    batched_apply("attractions", rebuild, job="0004_structured_hours")
+    create_index_concurrently(
+        "ix_attraction_hours_open",
+        "attraction_hours",
+        ["start_minute", "end_minute", "attraction_id"],
+    )
+    create_index_concurrently(
+        "ix_attraction_hours_attraction", "attraction_hours", ["attraction_id"]
+    )
+    create_index_concurrently("ix_attractions_fee_min", "attractions", ["fee_min"])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_attractions_fee_min", table_name="attractions")
+    op.drop_table("attraction_hours")
+    op.drop_column("attractions", "fee_max")
+    op.drop_column("attractions", "fee_min")
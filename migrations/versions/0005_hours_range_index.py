@@ -0,0 +1,53 @@
+"""GiST range index for opening-hours lookups
+
+Revision ID: 0005_hours_range_index
+Revises: 0004_structured_hours
+Create Date: 2026-10-19 10:00:00.000000
+
+"Open at minute m" is ``start_minute <= m AND end_minute > m``. The B-tree on
+``(start_minute, end_minute, attraction_id)`` can only use the first bound,
+so on PostgreSQL it is replaced by a GiST index on
+``int4range(start_minute, end_minute)``, queried with ``@>``. Other databases
+keep the B-tree.
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from migrations.online import (
+    create_index_concurrently,
+    drop_index_concurrently,
+    is_postgresql,
+)
+
+# revision identifiers, used by Alembic.
+revision: str = "0005_hours_range_index"
+down_revision: Union[str, Sequence[str], None] = "0004_structured_hours"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    if not is_postgresql():
+        return
+    create_index_concurrently(
+        "ix_attraction_hours_range",
+        "attraction_hours",
+        [sa.text("int4range(start_minute, end_minute)")],
+        postgresql_using="gist",
+    )
+    drop_index_concurrently("ix_attraction_hours_open", "attraction_hours")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if not is_postgresql():
+        return
+    create_index_concurrently(
+        "ix_attraction_hours_open",
+        "attraction_hours",
+        ["start_minute", "end_minute", "attraction_id"],
+    )
+    drop_index_concurrently("ix_attraction_hours_range", "attraction_hours")
@@ -0,0 +1,42 @@
+"""Record which images have generated variants
+
+Revision ID: 0006_image_variant_flags
+Revises: 0005_hours_range_index
+Create Date: 2026-10-19 12:00:00.000000
+
+Variant URLs outside picsum.photos are only served once
+``scripts/extract_image_metadata.py`` has written the resized copies, which
+it now records in these flags.
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from migrations.online import run_with_lock_timeout
+
+# revision identifiers, used by Alembic.
+revision: str = "0006_image_variant_flags"
+down_revision: Union[str, Sequence[str], None] = "0005_hours_range_index"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+
+    def add_columns():
+        op.add_column("Image", sa.Column("has_variants", sa.Boolean(), nullable=True))
+        op.add_column(
+            "attractions",
+            sa.Column("main_image_has_variants", sa.Boolean(), nullable=True),
+        )
+
+    run_with_lock_timeout(add_columns)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column("attractions", "main_image_has_variants")
+    op.drop_column("Image", "has_variants")
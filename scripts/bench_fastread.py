@@ -0,0 +1,123 @@
+"""
+Compare ORM hydration with the Core read path in ``api.fastread``.
+
+    python -m scripts.bench_fastread --rows 20000 --page 100 --repeat 20
+
+Loads pages of attractions both ways from a scratch SQLite database (or
+``--url``, which must already have the schema and data) and reports CPU time
+per row, with and without ``AttractionOut`` serialization, and peak memory
+per page.
+"""
+
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+
+from sqlalchemy import create_engine, insert, select
+from sqlalchemy.orm import sessionmaker
+
+from api import fastread
+from api.models import Attraction, Base
+from api.schemas import AttractionOut
+
+
+def _seed(engine, n):
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        conn.execute(
+            insert(Attraction.__table__),
+            [
+                {
+                    "id": i,
+                    "name": f"Attraction {i}",
+                    "description": "ทดสอบ " * 20,
+                    "province": "เชียงใหม่",
+                    "district": "เมืองเชียงใหม่",
+                    "latitude": 18.79,
+                    "longitude": 98.98,
+                    "opening_hours": "ทุกวัน 08:00-17:00",
+                    "entrance_fee": "50 บาท",
+                    "fee_min": 50.0,
+                    "fee_max": 50.0,
+                    "main_image_url": f"images/{i}.jpg",
+                }
+                for i in range(1, n + 1)
+            ],
+        )
+
+
+def _orm(db, ids):
+    return db.query(Attraction).filter(Attraction.id.in_(ids)).all()
+
+
+def _core(db, ids):
+    return fastread.rows(db, fastread.BY_IDS, ids=ids)
+
+
+def _serialize(rows):
+    return [
+        AttractionOut.model_validate(row, from_attributes=True).model_dump()
+        for row in rows
+    ]
+
+
+def _measure(Session, pages, load, serialize):
+    start = time.process_time()
+    rows = 0
+    for ids in pages:
+        with Session() as db:
+            loaded = load(db, ids)
+            if serialize:
+                _serialize(loaded)
+            rows += len(loaded)
+    return (time.process_time() - start) / rows * 1e6
+
+
+def _peak(Session, ids, load):
+    with Session() as db:
+        load(db, ids[:1])  # warm caches outside the measurement
+        tracemalloc.start()
+        loaded = load(db, ids)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        del loaded
+    return peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ORM vs Core attraction reads")
+    parser.add_argument("--url", help="database URL (default: scratch SQLite)")
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--page", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        url = args.url or f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        engine = create_engine(url)
+        if not args.url:
+            _seed(engine, args.rows)
+        Session = sessionmaker(bind=engine)
+        with engine.connect() as conn:
+            all_ids = conn.execute(
+                select(Attraction.id).order_by(Attraction.id).limit(args.rows)
+            ).scalars()
+            all_ids = list(all_ids)
+        pages = [
+            all_ids[i : i + args.page] for i in range(0, len(all_ids), args.page)
+        ] * args.repeat
+
+        print(f"{len(all_ids)} rows, pages of {args.page}, x{args.repeat}")
+        print(f"{'':12}{'load us/row':>14}{'+serialize':>14}{'peak KiB/page':>16}")
+        for name, load in (("orm", _orm), ("fastread", _core)):
+            load_only = _measure(Session, pages, load, serialize=False)
+            with_json = _measure(Session, pages, load, serialize=True)
+            peak = _peak(Session, pages[0], load) / 1024
+            print(f"{name:12}{load_only:14.2f}{with_json:14.2f}{peak:16.1f}")
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+"""
+Measure password verifications (logins) per second per core.
+
+    python -m scripts.bench_password_hashing --seconds 5 --n 16384
+
+Runs one process per requested core so the result reflects CPU cost only,
+and reports both the per-core rate and the total.
+"""
+
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from api import passwords
+
+
+def _verify_for(seconds, stored):
+    count = 0
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        passwords.verify_password("correct horse battery staple", stored)
+        count += 1
+    return count
+
+
+def main():
+    parser = argparse.ArgumentParser(description="scrypt login throughput")
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--cores", type=int, default=os.cpu_count())
+    parser.add_argument("--n", type=int, default=passwords.SCRYPT_N)
+    parser.add_argument("--r", type=int, default=passwords.SCRYPT_R)
+    parser.add_argument("--p", type=int, default=passwords.SCRYPT_P)
+    args = parser.parse_args()
+
+    stored = passwords.hash_password(
+        "correct horse battery staple", n=args.n, r=args.r, p=args.p
+    )
+    with ProcessPoolExecutor(max_workers=args.cores) as pool:
+        counts = list(
+            pool.map(_verify_for, [args.seconds] * args.cores, [stored] * args.cores)
+        )
+
+    total = sum(counts) / args.seconds
+    print(f"scrypt n={args.n} r={args.r} p={args.p}")
+    print(
+        f"{total / args.cores:.1f} logins/sec per core, {total:.1f} total on {args.cores} cores"
+    )
+    print(f"{1000 * args.seconds * args.cores / max(1, sum(counts)):.1f} ms per login")
+
+
+if __name__ == "__main__":
+    main()
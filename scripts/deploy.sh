@@ -63,7 +63,7 @@ print('✅ Database tables created successfully!')
 populate_test_data() {
     if [ "$POPULATE_TEST_DATA" = "true" ]; then
         echo "🌱 Populating test data..."
-        python db_script.py
+        python -m scripts.generate_dataset --url "$DATABASE_URL"
         echo "✅ Test data populated successfully!"
     else
         echo "ℹ️  Skipping test data population (set POPULATE_TEST_DATA=true to enable)"
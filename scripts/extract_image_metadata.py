@@ -0,0 +1,97 @@
+"""
+Fill in width/height/size/blurhash for ``Image`` rows from local files.
+
+Images are expected under ``IMAGE_ROOT`` at ``<host>/<path>`` of their URL
+(see ``api.images.relative_path``). Work is done in batches by a process
+pool so the API is never involved. Only rows still missing what this run
+fills in are selected, so an interrupted run, or a ``--variants-dir`` run
+after a metadata-only one, picks up whatever is left.
+
+With ``--variants-dir`` the resized copies are written too, and recorded in
+``Image.has_variants`` and in ``Attraction.main_image_has_variants`` for
+attractions whose main image is one of those images; the API only advertises
+variants that are recorded.
+
+    python -m scripts.extract_image_metadata --root images --variants-dir variants
+"""
+
+import argparse
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+from sqlalchemy import or_, update
+
+from api.deps import SessionLocal
+from api.images import IMAGE_ROOT, extract_metadata, relative_path
+from api.models import Attraction, Image
+
+
+def run(root, variants_dir, batch_size, workers):
+    # Unreadable files stay pending; last_id only stops this run retrying them.
+    last_id = 0
+    done = missing = 0
+    extract = partial(extract_metadata, root=root, variants_root=variants_dir)
+    pending = Image.width.is_(None)
+    if variants_dir:
+        pending = or_(pending, Image.has_variants.is_not(True))
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        while True:
+            session = SessionLocal(use_primary=True)
+            try:
+                batch = (
+                    session.query(Image.id, Image.image_url)
+                    .filter(Image.id > last_id, pending)
+                    .order_by(Image.id)
+                    .limit(batch_size)
+                    .all()
+                )
+                if not batch:
+                    break
+                rels = [relative_path(url) for _, url in batch]
+                results = pool.map(
+                    extract, rels, chunksize=max(1, batch_size // (workers * 4))
+                )
+                updates, with_variants = [], []
+                for (image_id, url), meta in zip(batch, results):
+                    if meta is None:
+                        missing += 1
+                        continue
+                    updates.append({"id": image_id, **meta})
+                    if meta.get("has_variants"):
+                        with_variants.append(url)
+                if updates:
+                    session.bulk_update_mappings(Image, updates)
+                if with_variants:
+                    session.execute(
+                        update(Attraction)
+                        .where(Attraction.main_image_url.in_(with_variants))
+                        .values(main_image_has_variants=True)
+                    )
+                session.commit()
+            finally:
+                session.close()
+
+            done += len(updates)
+            last_id = batch[-1][0]
+            print(
+                f"processed up to Image.id={last_id}: {done} updated, {missing} missing"
+            )
+    return done, missing
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        "--root", default=IMAGE_ROOT, help="directory holding the originals"
+    )
+    parser.add_argument("--variants-dir", help="write resized variants here")
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    args = parser.parse_args(argv)
+    run(args.root, args.variants_dir, args.batch_size, args.workers)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,484 @@
+"""
+Generate a seeded synthetic dataset for load tests and benchmarks.
+
+    python -m scripts.generate_dataset --attractions 1000000 --seed 7 \\
+        --end 2026-10-01 --url postgresql://localhost/painaidee_load
+
+Works offline and at any scale from a few thousand to tens of millions of
+attractions:
+
+* attractions are spread over the 77 provinces (``api.cleaning.PROVINCES``),
+  weighted towards the main tourist provinces, with coordinates scattered
+  around each provincial capital;
+* categories and tags follow skewed (Zipf-like) popularity, with a few
+  tags favoured per category, and each attraction gets one to four tags;
+* review and favourite counts per attraction are Zipf-distributed around
+  ``--reviews``/``--favorites``, and the users writing them are drawn from a
+  Zipf activity curve, so a few attractions and users dominate as in
+  production; reviews are spread over ``--months`` months before ``--end``;
+* ``fee_min``/``fee_max`` and ``attraction_hours`` are filled in the same way
+  as ``api.hours`` does for ORM writes.
+
+Attractions are generated in chunks of ``--chunk-size`` by ``--workers``
+processes, each chunk from its own child of the ``--seed`` seed sequence, and
+written in chunk order, so the same arguments always produce the same rows
+whatever the number of workers. PostgreSQL is loaded with ``COPY`` through
+the psycopg 3 or psycopg2 driver, other databases and drivers with batched
+multi-row inserts. The target must not contain users, categories, tags or
+attractions yet; without ``--url`` a SQLite file ``dataset.db`` is created.
+``python db_script.py`` runs this against its own database.
+"""
+
+import argparse
+import datetime
+import io
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import create_engine, func, insert, select, text
+
+from api import passwords
+from api.cleaning import PROVINCES, THAILAND_LAT, THAILAND_LON
+from api.hours import structured
+from api.models import (
+    Attraction,
+    AttractionHours,
+    AttractionTag,
+    Base,
+    Category,
+    Favorite,
+    Review,
+    Tag,
+    User,
+)
+from api.partitions import ensure_review_partitions
+
+# (category, prefix used in generated attraction names)
+CATEGORIES = (
+    ("สถานที่ท่องเที่ยว", "จุดชมวิว"),
+    ("ธรรมชาติ", "น้ำตก"),
+    ("วัฒนธรรม", "วัด"),
+    ("ร้านอาหาร", "ร้านอาหาร"),
+    ("ประวัติศาสตร์", "โบราณสถาน"),
+    ("แหล่งช้อปปิ้ง", "ตลาด"),
+    ("กิจกรรม", "ลานกิจกรรม"),
+    ("ที่พัก", "รีสอร์ท"),
+)
+TAGS = (
+    "สวยงาม",
+    "ถ่ายรูปสวย",
+    "วิวดี",
+    "ครอบครัว",
+    "น่าสนใจ",
+    "สงบ",
+    "อร่อย",
+    "วัฒนธรรม",
+    "ประวัติศาสตร์",
+    "สะดวกสบาย",
+    "ผจญภัย",
+    "เดินป่า",
+)
+# Tags much more likely within a category, on top of overall popularity.
+CATEGORY_TAGS = {
+    "ธรรมชาติ": ("เดินป่า", "วิวดี", "ผจญภัย"),
+    "วัฒนธรรม": ("วัฒนธรรม", "สงบ"),
+    "ร้านอาหาร": ("อร่อย",),
+    "ประวัติศาสตร์": ("ประวัติศาสตร์", "วัฒนธรรม"),
+    "แหล่งช้อปปิ้ง": ("อร่อย", "สะดวกสบาย"),
+    "กิจกรรม": ("ผจญภัย", "ครอบครัว"),
+    "ที่พัก": ("สะดวกสบาย", "สงบ"),
+}
+# Relative share of attractions; every other province counts 1.
+PROVINCE_WEIGHTS = {
+    "กรุงเทพมหานคร": 12,
+    "เชียงใหม่": 8,
+    "ภูเก็ต": 6,
+    "ชลบุรี": 5,
+    "กระบี่": 4,
+    "สุราษฎร์ธานี": 4,
+    "ประจวบคีรีขันธ์": 3,
+    "พระนครศรีอยุธยา": 3,
+    "กาญจนบุรี": 3,
+    "เชียงราย": 3,
+    "สงขลา": 2,
+    "นครราชสีมา": 2,
+    "เพชรบุรี": 2,
+    "แม่ฮ่องสอน": 2,
+}
+OPENING_HOURS = (
+    ("ทุกวัน 08:00-17:00", 30),
+    ("ทุกวัน 10:00-20:00", 15),
+    ("จ-ศ 9:00-17:00", 10),
+    ("ส-อา 08:30-16:30", 5),
+    ("ทุกวัน 09:00-18:00 ปิดวันจันทร์", 8),
+    ("ทุกวัน 17:00-02:00", 5),
+    ("เปิด 24 ชั่วโมง", 10),
+    (None, 17),
+)
+FEES = (
+    ("ฟรี", 35),
+    ("20 บาท", 10),
+    ("50 บาท", 15),
+    ("100 บาท", 10),
+    ("200 บาท", 5),
+    ("ผู้ใหญ่ 100 บาท เด็ก 50 บาท", 5),
+    ("ขึ้นอยู่กับกิจกรรม", 5),
+    (None, 15),
+)
+ROADS = ("สุขุมวิท", "พหลโยธิน", "เพชรเกษม", "มิตรภาพ", "นิมมานเหมินท์", "ราษฎร์อุทิศ")
+COMMENTS = (
+    "สวยมาก ประทับใจ",
+    "บรรยากาศดี เหมาะกับครอบครัว",
+    "คนเยอะไปหน่อย",
+    "ที่จอดรถหายาก",
+    "คุ้มค่า จะกลับมาอีก",
+    "อาหารอร่อย ราคาไม่แพง",
+    "วิวสวย ถ่ายรูปได้ทั้งวัน",
+)
+
+ZIPF_EXPONENT = 2.0  # popularity of attractions
+USER_ZIPF_EXPONENT = 1.3  # activity of users
+# Multiplier that maps Zipf user ranks onto scattered user ids.
+USER_STRIDE = 2_654_435_761
+# Every generated user logs in as f"{USERNAME_PREFIX}{user_id}" with this
+# password; scripts/loadtest.py profiles use them through "generated_users".
+USERNAME_PREFIX = "user"
+SHARED_PASSWORD = "painaidee-load-test"
+
+
+def _choice(rng, pairs, size):
+    values, weights = zip(*pairs)
+    weights = np.asarray(weights, dtype=float)
+    return np.asarray(values, dtype=object)[
+        rng.choice(len(values), size=size, p=weights / weights.sum())
+    ]
+
+
+def _zipf_weights(n, exponent=1.0):
+    return 1.0 / np.arange(1, n + 1) ** exponent
+
+
+def _province_table():
+    names = np.array([p[0] for p in PROVINCES], dtype=object)
+    capitals = np.array([(p[2], p[3]) for p in PROVINCES])
+    weights = np.array([PROVINCE_WEIGHTS.get(name, 1) for name in names], float)
+    return names, capitals, weights / weights.sum()
+
+
+def _tag_weights():
+    """Row per category: probability weights over ``TAGS``."""
+    weights = np.tile(_zipf_weights(len(TAGS), 0.8), (len(CATEGORIES), 1))
+    for row, (category, _) in enumerate(CATEGORIES):
+        for tag in CATEGORY_TAGS.get(category, ()):
+            weights[row, TAGS.index(tag)] *= 6
+    return weights
+
+
+def _per_attraction(rng, mean, popularity):
+    """Counts with mean ``mean`` in proportion to ``popularity``."""
+    return rng.poisson(mean * popularity / popularity.mean())
+
+
+def _users(rng, n, n_users):
+    ranks = rng.zipf(USER_ZIPF_EXPONENT, size=n) - 1
+    return (ranks % n_users * USER_STRIDE) % n_users + 1
+
+
+def generate_chunk(seed, lo, hi, n_users, reviews, favorites, end, months):
+    """Rows for attractions ``lo < id <= hi``, as ``{table name: frame}``."""
+    rng = np.random.default_rng(seed)
+    n = hi - lo
+    ids = np.arange(lo + 1, hi + 1)
+
+    names, capitals, province_p = _province_table()
+    province = rng.choice(len(names), size=n, p=province_p)
+    category_p = _zipf_weights(len(CATEGORIES), 0.7)
+    category = rng.choice(len(CATEGORIES), size=n, p=category_p / category_p.sum())
+    district_no = np.minimum(rng.zipf(1.6, size=n), 15)
+    province_name = names[province]
+    district = np.where(
+        district_no == 1,
+        "เมือง" + province_name,
+        province_name + " " + district_no.astype(str).astype(object),
+    )
+    latitude = np.clip(
+        capitals[province, 0] + rng.normal(0, 0.15, n), *THAILAND_LAT
+    ).round(6)
+    longitude = np.clip(
+        capitals[province, 1] + rng.normal(0, 0.15, n), *THAILAND_LON
+    ).round(6)
+    prefix = np.array([c[1] for c in CATEGORIES], dtype=object)[category]
+    name = prefix + " " + province_name + " " + ids.astype(str).astype(object)
+    opening_hours = _choice(rng, OPENING_HOURS, n)
+    entrance_fee = _choice(rng, FEES, n)
+    fees, intervals = structured(ids, opening_hours, entrance_fee)
+    house = rng.integers(1, 500, size=n).astype(str).astype(object)
+    attractions = pd.DataFrame(
+        {
+            "id": ids,
+            "name": name,
+            "description": name + " ใน" + district + " จังหวัด" + province_name,
+            "address": house + " ถ." + _choice(rng, [(r, 1) for r in ROADS], n),
+            "province": province_name,
+            "district": district,
+            "latitude": latitude,
+            "longitude": longitude,
+            "category_id": category + 1,
+            "opening_hours": opening_hours,
+            "entrance_fee": entrance_fee,
+            "contact_phone": "+66"
+            + rng.integers(800_000_000, 999_999_999, size=n).astype(str).astype(object),
+            "website": "https://www.example.com/attraction/" + ids.astype(str),
+            "main_image_url": "https://picsum.photos/seed/"
+            + ids.astype(str)
+            + "/1200/800",
+            "fee_min": fees["fee_min"].to_numpy(),
+            "fee_max": fees["fee_max"].to_numpy(),
+        }
+    )
+
+    # Tags: one to four per attraction, drawn without replacement through
+    # Gumbel top-k over the category's tag weights.
+    n_tags = 1 + rng.binomial(3, 0.4, size=n)
+    keys = np.log(_tag_weights()[category]) + rng.gumbel(size=(n, len(TAGS)))
+    ranked = np.argsort(-keys, axis=1)
+    keep = np.arange(len(TAGS))[None, :] < n_tags[:, None]
+    rows, col = np.nonzero(keep)
+    attraction_tags = pd.DataFrame(
+        {"attraction_id": ids[rows], "tag_id": ranked[rows, col] + 1}
+    )
+
+    popularity = np.minimum(rng.zipf(ZIPF_EXPONENT, size=n), 10_000).astype(float)
+    review_counts = _per_attraction(rng, reviews, popularity)
+    review_of = np.repeat(np.arange(n), review_counts)
+    n_reviews = len(review_of)
+    quality = rng.normal(3.9, 0.6, size=n)
+    age = rng.uniform(0, months * 30 * 86400, size=n_reviews).astype(np.int64)
+    created_at = pd.Timestamp(end) - pd.to_timedelta(age, unit="s")
+    reviews_frame = pd.DataFrame(
+        {
+            "attraction_id": ids[review_of],
+            "user_id": _users(rng, n_reviews, n_users),
+            "rating": np.clip(
+                np.rint(rng.normal(quality[review_of], 0.9)), 1, 5
+            ).astype(int),
+            "comment": _choice(
+                rng, [(c, 1) for c in COMMENTS] + [(None, 5)], n_reviews
+            ),
+            "created_at": created_at,
+        }
+    )
+
+    favorite_counts = _per_attraction(rng, favorites, popularity)
+    favorite_of = np.repeat(ids, favorite_counts)
+    favorites_frame = pd.DataFrame(
+        {
+            "user_id": _users(rng, len(favorite_of), n_users),
+            "attraction_id": favorite_of,
+        }
+    ).drop_duplicates()
+
+    return {
+        Attraction.__tablename__: attractions,
+        AttractionTag.__tablename__: attraction_tags,
+        AttractionHours.__tablename__: intervals,
+        Review.__tablename__: reviews_frame,
+        Favorite.__tablename__: favorites_frame,
+    }
+
+
+def reference_rows(n_users):
+    """Categories, tags and users: ``{table name: frame}``."""
+    user_ids = np.arange(1, n_users + 1)
+    names = USERNAME_PREFIX + user_ids.astype(str).astype(object)
+    # One cheap hash shared by every user keeps generation fast; logins
+    # still verify (and get upgraded) like any other stored hash.
+    password_hash = passwords.hash_password(SHARED_PASSWORD, n=2**10)
+    return {
+        Category.__tablename__: pd.DataFrame(
+            {
+                "category_id": np.arange(1, len(CATEGORIES) + 1),
+                "name": [c[0] for c in CATEGORIES],
+            }
+        ),
+        Tag.__tablename__: pd.DataFrame(
+            {"tag_id": np.arange(1, len(TAGS) + 1), "name": TAGS}
+        ),
+        User.__tablename__: pd.DataFrame(
+            {
+                "user_id": user_ids,
+                "username": names,
+                "email": names + "@example.com",
+                "password_hash": password_hash,
+                "role": "user",
+            }
+        ),
+    }
+
+
+def _copy_sql(conn, table, columns):
+    quote = conn.dialect.identifier_preparer.quote
+    names = ", ".join(quote(c) for c in columns)
+    return f"COPY {quote(table.name)} ({names}) FROM STDIN WITH (FORMAT csv)"
+
+
+def write(conn, table, frame, batch_size=10_000):
+    """Append ``frame`` to ``table``: ``COPY`` through psycopg 3 or psycopg2,
+    multi-row inserts on other databases and drivers."""
+    if not len(frame):
+        return
+    driver = conn.dialect.driver if conn.dialect.name == "postgresql" else None
+    if driver in ("psycopg", "psycopg2"):
+        data = frame.to_csv(index=False, header=False)
+        sql = _copy_sql(conn, table, frame.columns)
+        with conn.connection.cursor() as cursor:
+            if driver == "psycopg":
+                with cursor.copy(sql) as copy:
+                    copy.write(data)
+            else:
+                cursor.copy_expert(sql, io.StringIO(data))
+        return
+    frame = frame.astype(object)
+    records = frame.where(frame.notna(), None).to_dict("records")
+    for start in range(0, len(records), batch_size):
+        conn.execute(insert(table), records[start : start + batch_size])
+
+
+def _reset_sequences(conn):
+    """Move PostgreSQL id sequences past the explicit ids we copied in."""
+    if conn.dialect.name != "postgresql":
+        return
+    for table, column in (
+        (User.__table__, "user_id"),
+        (Category.__table__, "category_id"),
+        (Tag.__table__, "tag_id"),
+        (Attraction.__table__, "id"),
+    ):
+        name = conn.dialect.identifier_preparer.format_table(table)
+        conn.execute(
+            text(
+                "SELECT setval(pg_get_serial_sequence(:table, :column), "
+                f"GREATEST((SELECT max({column}) FROM {name}), 1))"
+            ),
+            {"table": name, "column": column},
+        )
+
+
+def _chunks(n, chunk_size):
+    return [(lo, min(lo + chunk_size, n)) for lo in range(0, n, chunk_size)]
+
+
+def _ordered(pool, fn, jobs, window):
+    """``pool.map`` with at most ``window`` results waiting to be written."""
+    pending = deque()
+    jobs = iter(jobs)
+    for args in jobs:
+        pending.append(pool.submit(fn, *args))
+        if len(pending) >= window:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+
+def generate(
+    engine,
+    attractions,
+    users,
+    seed=0,
+    reviews=10.0,
+    favorites=3.0,
+    end=None,
+    months=24,
+    workers=1,
+    chunk_size=10_000,
+):
+    """Load a dataset into ``engine``; returns the row count per table."""
+    end = end or datetime.date.today()
+    Base.metadata.create_all(bind=engine)
+    tables = Base.metadata.tables
+    with engine.begin() as conn:
+        for table in (User, Category, Tag, Attraction):
+            if conn.execute(select(func.count()).select_from(table)).scalar():
+                raise RuntimeError(f"{table.__tablename__} is not empty")
+        ensure_review_partitions(
+            conn,
+            since=pd.Timestamp(end) - pd.DateOffset(months=months),
+            today=end,
+        )
+        counts = {}
+        for name, frame in reference_rows(users).items():
+            write(conn, tables[name], frame)
+            counts[name] = len(frame)
+
+    chunks = _chunks(attractions, chunk_size)
+    seeds = np.random.SeedSequence(seed).spawn(len(chunks))
+    jobs = [
+        (s, lo, hi, users, reviews, favorites, end, months)
+        for s, (lo, hi) in zip(seeds, chunks)
+    ]
+    if workers > 1:
+        pool = ProcessPoolExecutor(max_workers=workers)
+        results = _ordered(pool, generate_chunk, jobs, window=2 * workers)
+    else:
+        pool = None
+        results = (generate_chunk(*args) for args in jobs)
+    try:
+        for result in results:
+            with engine.begin() as conn:
+                for name, frame in result.items():
+                    write(conn, tables[name], frame)
+                    counts[name] = counts.get(name, 0) + len(frame)
+    finally:
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+    with engine.begin() as conn:
+        _reset_sequences(conn)
+    return counts
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="seeded synthetic dataset")
+    parser.add_argument("--url", help="database URL (default: sqlite dataset.db)")
+    parser.add_argument("--attractions", type=int, default=1000)
+    parser.add_argument("--users", type=int, help="default: attractions / 5")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--reviews", type=float, default=10.0, help="per attraction")
+    parser.add_argument("--favorites", type=float, default=3.0, help="per attraction")
+    parser.add_argument(
+        "--end",
+        type=datetime.date.fromisoformat,
+        default=datetime.date.today(),
+        help="newest review date (YYYY-MM-DD); fix it to reproduce a dataset",
+    )
+    parser.add_argument("--months", type=int, default=24)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--chunk-size", type=int, default=10_000)
+    args = parser.parse_args(argv)
+
+    engine = create_engine(args.url or "sqlite:///./dataset.db")
+    started = time.perf_counter()
+    counts = generate(
+        engine,
+        args.attractions,
+        args.users or max(args.attractions // 5, 100),
+        seed=args.seed,
+        reviews=args.reviews,
+        favorites=args.favorites,
+        end=args.end,
+        months=args.months,
+        workers=args.workers,
+        chunk_size=args.chunk_size,
+    )
+    elapsed = time.perf_counter() - started
+    for name, count in counts.items():
+        print(f"{name:20}{count:12}")
+    print(f"{sum(counts.values())} rows in {elapsed:.1f}s")
+    engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
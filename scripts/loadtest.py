@@ -0,0 +1,343 @@
+"""
+Load test harness driven by traffic profiles.
+
+Replays a weighted mix of requests at a target rate (open loop: requests are
+started on schedule whether or not earlier ones have finished) either
+in-process through ASGI or against a running server, then reports latency
+percentiles, error rates and, in-process, database pool saturation.
+
+    python -m scripts.loadtest scripts/loadtest_profiles/festival_peak.json
+    python -m scripts.loadtest profile.json --target http://localhost:8000
+    python -m scripts.loadtest profile.json --time-scale 0.1 --json report.json
+
+Profile files are JSON; see scripts/loadtest_profiles/ for the format. The
+``auth`` block lists ``users`` to log in as, and/or ``generated_users: N`` for
+the first N accounts created by ``scripts.generate_dataset``.
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import re
+import string
+import time
+from collections import Counter, defaultdict
+
+import httpx
+import numpy as np
+
+_PLACEHOLDER = re.compile(r"^\{(\w+)\}$")
+
+
+class Variables:
+    """Random values for ``{name}`` placeholders, as declared in a profile.
+
+    Each variable is one of ``{"range": [lo, hi]}`` (uniform integers,
+    inclusive), ``{"choice": [...]}`` or ``{"zipf": {"n": N, "s": S}}``
+    (integers 1..N where low numbers are hot, like popular attractions).
+    """
+
+    def __init__(self, spec, rng):
+        self.rng = rng
+        self.spec = spec
+        self._zipf = {}
+        for name, definition in spec.items():
+            if "zipf" in definition:
+                n, s = definition["zipf"]["n"], definition["zipf"].get("s", 1.1)
+                weights = 1.0 / np.arange(1, n + 1) ** s
+                self._zipf[name] = np.cumsum(weights / weights.sum())
+
+    def draw(self):
+        values = {}
+        for name, definition in self.spec.items():
+            if "range" in definition:
+                lo, hi = definition["range"]
+                values[name] = self.rng.randint(lo, hi)
+            elif "choice" in definition:
+                values[name] = self.rng.choice(definition["choice"])
+            else:
+                cdf = self._zipf[name]
+                values[name] = int(np.searchsorted(cdf, self.rng.random())) + 1
+        return values
+
+
+def render(template, values):
+    """Fill placeholders in strings, lists and dicts; a string that is just
+    ``{name}`` takes the raw value so JSON bodies keep numeric types."""
+    if isinstance(template, str):
+        whole = _PLACEHOLDER.match(template)
+        if whole and whole.group(1) in values:
+            return values[whole.group(1)]
+        return string.Formatter().vformat(template, (), values)
+    if isinstance(template, list):
+        return [render(item, values) for item in template]
+    if isinstance(template, dict):
+        return {key: render(item, values) for key, item in template.items()}
+    return template
+
+
+class Stats:
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.statuses = defaultdict(Counter)
+        self.dropped = 0
+        self.pool_samples = []
+
+    def record(self, name, status, elapsed):
+        self.latencies[name].append(elapsed)
+        self.statuses[name][status] += 1
+
+    def report(self, wall_time):
+        rows = {}
+        all_latencies = []
+        totals = Counter()
+        for name, latencies in sorted(self.latencies.items()):
+            statuses = self.statuses[name]
+            rows[name] = summarize(latencies, statuses)
+            all_latencies += latencies
+            totals.update(statuses)
+        report = {
+            "requests": rows,
+            "total": summarize(all_latencies, totals),
+            "achieved_rps": (
+                round(len(all_latencies) / wall_time, 1) if wall_time else 0
+            ),
+            "dropped": self.dropped,
+        }
+        if self.pool_samples:
+            checked_out = np.array([s[0] for s in self.pool_samples])
+            capacity = self.pool_samples[0][1]
+            waits = np.array([s[2] for s in self.pool_samples])
+            report["db_pool"] = {
+                "capacity": capacity,
+                "max_checked_out": int(checked_out.max()),
+                "mean_checked_out": round(float(checked_out.mean()), 2),
+                "saturated_pct": round(
+                    float((checked_out >= capacity).mean() * 100), 1
+                ),
+                "max_wait_ms": round(float(waits.max() * 1000), 2),
+            }
+        return report
+
+
+def summarize(latencies, statuses):
+    count = sum(statuses.values())
+    errors = sum(
+        n for status, n in statuses.items() if status == "error" or status >= 500
+    )
+    shed = statuses.get(429, 0) + statuses.get(503, 0)
+    out = {
+        "count": count,
+        "error_rate": round(errors / count, 4) if count else 0.0,
+        "shed": shed,
+        "statuses": {str(k): v for k, v in sorted(statuses.items(), key=str)},
+    }
+    if latencies:
+        p50, p95, p99 = np.percentile(np.array(latencies) * 1000, [50, 95, 99])
+        out.update(p50_ms=round(p50, 2), p95_ms=round(p95, 2), p99_ms=round(p99, 2))
+    return out
+
+
+def login_users(auth):
+    """Credentials for a profile's ``auth`` block."""
+    users = list(auth.get("users", []))
+    count = auth.get("generated_users", 0)
+    if count:
+        from scripts.generate_dataset import SHARED_PASSWORD, USERNAME_PREFIX
+
+        users += [
+            {"username": f"{USERNAME_PREFIX}{i}", "password": SHARED_PASSWORD}
+            for i in range(1, count + 1)
+        ]
+    return users
+
+
+class LoadTest:
+    def __init__(
+        self, profile, target="inprocess", time_scale=1.0, rps_scale=1.0, seed=None
+    ):
+        self.profile = profile
+        self.target = target
+        self.time_scale = time_scale
+        self.rps_scale = rps_scale
+        self.rng = random.Random(profile.get("seed", 0) if seed is None else seed)
+        self.variables = Variables(profile.get("variables", {}), self.rng)
+        self.requests = profile["requests"]
+        self.weights = [r.get("weight", 1) for r in self.requests]
+        self.max_in_flight = profile.get("max_in_flight", 1000)
+        self.stats = Stats()
+        self.tokens = []
+        self.clients = []
+
+    def _make_clients(self):
+        n = self.profile.get("clients", 1)
+        if self.target == "inprocess":
+            from api.main import app
+
+            # Distinct client addresses so per-IP rate limits behave as they
+            # would with real users instead of one client hammering the API.
+            # Unhandled app exceptions come back as 500s, as behind a server,
+            # instead of being re-raised into the request task.
+            return [
+                httpx.AsyncClient(
+                    transport=httpx.ASGITransport(
+                        app=app,
+                        raise_app_exceptions=False,
+                        client=(
+                            f"10.{i // 65536 % 256}.{i // 256 % 256}.{i % 256}",
+                            5000,
+                        ),
+                    ),
+                    base_url="http://loadtest",
+                )
+                for i in range(n)
+            ]
+        limits = httpx.Limits(max_connections=self.max_in_flight)
+        return [httpx.AsyncClient(base_url=self.target, limits=limits, timeout=30)]
+
+    async def _login(self):
+        auth = self.profile.get("auth")
+        if not auth:
+            return
+        client = self.clients[0]
+        for user in login_users(auth):
+            r = await client.post("/token", data=user)
+            if r.status_code == 200:
+                self.tokens.append(r.json()["access_token"])
+        if not self.tokens:
+            print(
+                "warning: no test users could log in; authenticated requests will fail"
+            )
+
+    async def _one(self, spec):
+        values = self.variables.draw()
+        kwargs = {}
+        if "json" in spec:
+            kwargs["json"] = render(spec["json"], values)
+        if spec.get("auth"):
+            if self.tokens:
+                kwargs["headers"] = {
+                    "Authorization": f"Bearer {self.rng.choice(self.tokens)}"
+                }
+        client = self.rng.choice(self.clients)
+        start = time.perf_counter()
+        try:
+            r = await client.request(
+                spec.get("method", "GET"), render(spec["path"], values), **kwargs
+            )
+            status = r.status_code
+        except httpx.HTTPError:
+            status = "error"
+        self.stats.record(spec["name"], status, time.perf_counter() - start)
+
+    async def _sample_pool(self, stop):
+        from api.pool_metrics import pool_wait
+        from api.deps import engine
+
+        pool = engine.pool
+        if not hasattr(pool, "checkedout"):
+            return
+        capacity = pool.size() + max(0, getattr(pool, "_max_overflow", 0))
+        while not stop.is_set():
+            self.stats.pool_samples.append(
+                (pool.checkedout(), capacity, pool_wait.value)
+            )
+            await asyncio.sleep(0.05)
+
+    async def run(self):
+        self.clients = self._make_clients()
+        await self._login()
+        stop = asyncio.Event()
+        sampler = (
+            asyncio.create_task(self._sample_pool(stop))
+            if self.target == "inprocess"
+            else None
+        )
+
+        in_flight = set()
+        start = time.perf_counter()
+        for stage in self.profile["stages"]:
+            rps = stage["rps"] * self.rps_scale
+            duration = stage["duration"] * self.time_scale
+            if rps <= 0:
+                # A pause between bursts: hold the stage without sending.
+                await asyncio.sleep(duration)
+                continue
+            stage_start = time.perf_counter()
+            sent = 0
+            while (now := time.perf_counter()) - stage_start < duration:
+                due = int((now - stage_start) * rps) + 1 - sent
+                for _ in range(due):
+                    if len(in_flight) >= self.max_in_flight:
+                        self.stats.dropped += 1
+                    else:
+                        spec = self.rng.choices(self.requests, self.weights)[0]
+                        task = asyncio.create_task(self._one(spec))
+                        in_flight.add(task)
+                        task.add_done_callback(in_flight.discard)
+                    sent += 1
+                await asyncio.sleep(min(0.005, 1 / rps))
+        if in_flight:
+            await asyncio.wait(in_flight)
+        wall_time = time.perf_counter() - start
+
+        stop.set()
+        if sampler:
+            await sampler
+        for client in self.clients:
+            await client.aclose()
+        return self.stats.report(wall_time)
+
+
+def print_report(report):
+    header = f"{'request':<16}{'count':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'err %':>8}{'shed':>7}"
+    print(header)
+    print("-" * len(header))
+    for name, row in [*report["requests"].items(), ("TOTAL", report["total"])]:
+        print(
+            f"{name:<16}{row['count']:>8}{row.get('p50_ms', 0):>10}{row.get('p95_ms', 0):>10}"
+            f"{row.get('p99_ms', 0):>10}{row['error_rate'] * 100:>8.2f}{row['shed']:>7}"
+        )
+    print(
+        f"\nachieved {report['achieved_rps']} req/s, {report['dropped']} dropped (too many in flight)"
+    )
+    if "db_pool" in report:
+        pool = report["db_pool"]
+        print(
+            f"db pool: {pool['max_checked_out']}/{pool['capacity']} max checked out, "
+            f"{pool['saturated_pct']}% of samples saturated, max wait {pool['max_wait_ms']} ms"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Replay a traffic profile against the API"
+    )
+    parser.add_argument("profile", help="path to a JSON traffic profile")
+    parser.add_argument(
+        "--target", default="inprocess", help="'inprocess' or a base URL"
+    )
+    parser.add_argument(
+        "--time-scale", type=float, default=1.0, help="multiply stage durations"
+    )
+    parser.add_argument(
+        "--rps-scale", type=float, default=1.0, help="multiply stage rates"
+    )
+    parser.add_argument("--seed", type=int)
+    parser.add_argument("--json", help="also write the report to this file")
+    args = parser.parse_args()
+
+    with open(args.profile, encoding="utf-8") as f:
+        profile = json.load(f)
+    report = asyncio.run(
+        LoadTest(profile, args.target, args.time_scale, args.rps_scale, args.seed).run()
+    )
+    print_report(report)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
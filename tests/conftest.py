@@ -0,0 +1,77 @@
+"""
+Shared fixtures for tests that run the app against a throwaway database.
+
+A module supplies its rows by overriding ``seed``, a fixture returning a
+function that adds them to a session. ``session_factory`` creates the tables,
+seeds them and resets the process-wide caches built from them; ``app_db``
+points the app's session dependencies at that database and ``client`` wraps
+the app in a ``TestClient``.
+"""
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from api.deps import get_db, get_primary_db
+from api.feed import feed_store
+from api.main import app
+from api.models import Base
+from api.stats import stats_store
+from api.tag_index import tag_index
+
+
+def reset_caches():
+    tag_index.invalidate()
+    feed_store.clear()
+    stats_store.invalidate()
+
+
+@pytest.fixture
+def seed():
+    """Rows each test in a module starts with; modules override this."""
+
+    def add_rows(db):
+        pass
+
+    return add_rows
+
+
+@pytest.fixture
+def session_factory(tmp_path, seed):
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'test.db'}", connect_args={"check_same_thread": False}
+    )
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    with Session() as db:
+        seed(db)
+        db.commit()
+    reset_caches()
+    yield Session
+    reset_caches()
+    engine.dispose()
+
+
+@pytest.fixture
+def app_db(session_factory):
+    """Serve ``get_db`` and ``get_primary_db`` from ``session_factory``."""
+
+    def override_get_db():
+        db = session_factory()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    previous = dict(app.dependency_overrides)
+    app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_primary_db] = override_get_db
+    yield session_factory
+    app.dependency_overrides.clear()
+    app.dependency_overrides.update(previous)
+
+
+@pytest.fixture
+def client(app_db):
+    return TestClient(app)
@@ -0,0 +1,124 @@
+import hashlib
+
+import pytest
+from jose import jwt
+
+from api import auth, passwords
+from api.models import User
+
+
+@pytest.fixture(autouse=True)
+def cheap_hashing(monkeypatch):
+    monkeypatch.setattr(passwords, "SCRYPT_N", 2**10)
+
+
+def test_hash_and_verify():
+    stored = passwords.hash_password("secret")
+    assert stored.startswith("scrypt$1024$8$1$")
+    assert passwords.verify_password("secret", stored)
+    assert not passwords.verify_password("wrong", stored)
+    assert not passwords.verify_password("secret", "garbage")
+    assert stored != passwords.hash_password("secret")
+
+
+def test_rehash_when_parameters_change(monkeypatch):
+    stored = passwords.hash_password("secret")
+    assert passwords.verify_and_update("secret", stored) == (True, None)
+    monkeypatch.setattr(passwords, "SCRYPT_N", 2**11)
+    ok, new_hash = passwords.verify_and_update("secret", stored)
+    assert ok and new_hash.startswith("scrypt$2048$")
+    assert passwords.verify_and_update("wrong", stored) == (False, None)
+
+
+@pytest.mark.parametrize(
+    "stored",
+    [
+        "scrypt$1024$8$1$c2FsdA$not*base64",
+        "scrypt$1024$8$1$c2FsdA$a",
+        "scrypt$1024$8$1$!!$c2FsdA",
+        "scrypt$x$8$1$c2FsdA$c2FsdA",
+        "scrypt$1024$8",
+    ],
+)
+def test_corrupt_hash_fails_verification(stored):
+    assert passwords.verify_and_update("secret", stored) == (False, None)
+
+
+def test_dummy_hash_costs_a_real_verification(monkeypatch):
+    calls = []
+    scrypt = passwords._scrypt
+    monkeypatch.setattr(
+        passwords, "_scrypt", lambda *args: calls.append(args) or scrypt(*args)
+    )
+    stored = passwords.dummy_hash()
+    assert not calls  # nothing hashed until a login verifies against it
+    assert not passwords.verify_password("dummy-password", stored)
+    assert len(calls) == 1 and calls[0][2] == passwords.SCRYPT_N
+
+
+def test_legacy_sha256_is_upgraded():
+    legacy = hashlib.sha256(b"password_bret").hexdigest()
+    ok, new_hash = passwords.verify_and_update("password_bret", legacy)
+    assert ok and new_hash.startswith("scrypt$")
+
+
+@pytest.fixture
+def seed():
+    def add_rows(db):
+        legacy = hashlib.sha256(b"password_bret").hexdigest()
+        db.add(User(user_id=1, username="bret", email="b@x.com", password_hash=legacy))
+
+    return add_rows
+
+
+def test_login_issues_token_and_rehashes(client, session_factory):
+    r = client.post("/token", data={"username": "bret", "password": "password_bret"})
+    assert r.status_code == 200
+    assert r.json()["token_type"] == "bearer"
+    with session_factory() as db:
+        assert db.get(User, 1).password_hash.startswith("scrypt$1024$")
+
+    # The rehashed password still works.
+    r = client.post("/token", data={"username": "bret", "password": "password_bret"})
+    assert r.status_code == 200
+
+
+def test_login_rejects_bad_credentials(client):
+    r = client.post("/token", data={"username": "bret", "password": "nope"})
+    assert r.status_code == 401
+    r = client.post("/token", data={"username": "ghost", "password": "nope"})
+    assert r.status_code == 401
+
+
+def test_login_sheds_when_hasher_busy(client, monkeypatch):
+
+    async def busy(password, stored):
+        raise passwords.HasherBusy()
+
+    monkeypatch.setattr(passwords, "verify_and_update_async", busy)
+    r = client.post("/token", data={"username": "bret", "password": "password_bret"})
+    assert r.status_code == 503
+    assert r.headers["retry-after"] == "1"
+
+
+@pytest.mark.parametrize(
+    "claims", [{"sub": "bret"}, {"sub": None}, {}, {"sub": "999"}, {"sub": "1.5"}]
+)
+def test_bad_subject_is_unauthorized(client, claims):
+    token = jwt.encode(claims, auth.SECRET_KEY, auth.ALGORITHM)
+    r = client.post(
+        "/favorites",
+        json={"attraction_id": 1},
+        headers={"Authorization": f"Bearer {token}"},
+    )
+    assert r.status_code == 401
+
+
+def test_valid_token_reaches_the_route(client):
+    token = auth.create_access_token(1)
+    r = client.post(
+        "/favorites",
+        json={"attraction_id": 1},
+        headers={"Authorization": f"Bearer {token}"},
+    )
+    assert r.status_code == 404  # authenticated; the attraction does not exist
@@ -0,0 +1,202 @@
+import pandas as pd
+import pytest
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import sessionmaker
+
+from api.cleaning import (
+    PROVINCES,
+    clean_attractions,
+    nearest_province,
+    normalize_districts,
+    normalize_provinces,
+    parse_fees,
+    parse_opening_hours,
+    write_rejections,
+)
+from api.models import Attraction, AttractionHours, Base
+
+
+def series(*values):
+    return pd.Series(values, dtype="string")
+
+
+def test_all_provinces_and_aliases_normalize():
+    assert len(PROVINCES) == 77
+    assert normalize_provinces(series(*(p[0] for p in PROVINCES))).tolist() == [
+        p[0] for p in PROVINCES
+    ]
+    assert normalize_provinces(
+        series(
+            "จ.เชียงใหม่", "Chiang Mai province", "chiangmai", "กทม.", "อยุธยา", "Korat"
+        )
+    ).tolist() == [
+        "เชียงใหม่",
+        "เชียงใหม่",
+        "เชียงใหม่",
+        "กรุงเทพมหานคร",
+        "พระนครศรีอยุธยา",
+        "นครราชสีมา",
+    ]
+    assert normalize_provinces(series("Atlantis", None)).isna().all()
+
+
+def test_districts_lose_prefixes():
+    districts = normalize_districts(
+        series("อ.แม่ริม", "อำเภอ ถลาง", "เขตบางรัก", "เมือง", None),
+        series("เชียงใหม่", "ภูเก็ต", "กรุงเทพมหานคร", "ภูเก็ต", "ภูเก็ต"),
+    )
+    assert districts.tolist()[:4] == ["แม่ริม", "ถลาง", "บางรัก", "เมืองภูเก็ต"]
+    assert pd.isna(districts.iloc[4])
+
+
+def test_nearest_province():
+    assert list(nearest_province([18.8, 7.9], [99.0, 98.4])) == ["เชียงใหม่", "ภูเก็ต"]
+
+
+def test_parse_fees():
+    fees = parse_fees(
+        series(
+            "ฟรี", "50 บาท", "ไทย 40 / ต่างชาติ 1,200 บาท", "ขึ้นอยู่กับกิจกรรม", None
+        )
+    )
+    assert fees["fee_min"].tolist()[:3] == [0, 50, 40]
+    assert fees["fee_max"].tolist()[:3] == [0, 50, 1200]
+    assert fees.iloc[3:].isna().all().all()
+
+
+@pytest.mark.parametrize(
+    "text, days, opens, closes",
+    [
+        ("เปิด 24 ชั่วโมง", 0b1111111, 0, 1440),
+        ("จ-ศ 9:00-17:00", 0b0011111, 540, 1020),
+        ("ทุกวัน 10:00-20:00", 0b1111111, 600, 1200),
+        ("Sat-Sun 08.30-16.30", 0b1100000, 510, 990),
+        ("Fri-Mon 18:00-02:00", 0b1110001, 1080, 1560),
+    ],
+)
+def test_parse_opening_hours(text, days, opens, closes):
+    row = parse_opening_hours(series(text)).iloc[0]
+    assert (row["open_days"], row["open_minute"], row["close_minute"]) == (
+        days,
+        opens,
+        closes,
+    )
+
+
+def test_closed_day_without_hours():
+    row = parse_opening_hours(series("ปิดวันอังคาร", "สอบถามก่อน")).iloc
+    assert row[0]["open_days"] == 0b1111101
+    assert pd.isna(row[0]["open_minute"])
+    assert pd.isna(row[1]["open_days"])
+
+
+def test_clean_attractions_rejects_and_dedupes(tmp_path):
+    base = {"province": "Bangkok", "latitude": 13.75, "longitude": 100.5}
+    clean, rejected = clean_attractions(
+        [
+            {**base, "name": "Wat Arun"},
+            {**base, "name": " wat arun!", "website": "https://example.com"},
+            {**base, "name": "Swapped", "latitude": 100.5, "longitude": 13.75},
+            {**base, "name": "Abroad", "latitude": 48.85, "longitude": 2.35},
+            {**base, "name": "Nowhere", "province": "Atlantis"},
+            {**base, "name": "Old", "province": None},
+            {**base, "name": ""},
+        ],
+        existing_names=["OLD"],
+    )
+    assert clean["name"].tolist() == ["wat arun!", "Swapped"]
+    assert clean["province"].tolist() == ["กรุงเทพมหานคร"] * 2
+    assert clean.loc[2, ["latitude", "longitude"]].tolist() == [13.75, 100.5]
+    assert dict(zip(rejected.index, rejected["reason"])) == {
+        0: "duplicate",
+        3: "out_of_bounds",
+        4: "unknown_province",
+        5: "exists",
+        6: "missing_name",
+    }
+
+    path = tmp_path / "rejected.csv"
+    counts = write_rejections(rejected, path)
+    assert counts["duplicate"] == 1
+    report = pd.read_csv(path)
+    assert report.columns[:2].tolist() == ["row", "reason"]
+    assert len(report) == 5
+
+
+def test_batch_without_usable_names_checks_existing_names():
+    clean, rejected = clean_attractions(
+        [{"name": None}, {"latitude": 13.75}], existing_names=["Wat Arun"]
+    )
+    assert clean.empty
+    assert rejected["reason"].tolist() == ["missing_name"] * 2
+
+
+def test_missing_province_is_inferred_from_coordinates():
+    clean, _ = clean_attractions([{"name": "x", "latitude": 7.88, "longitude": 98.39}])
+    assert clean["province"].tolist() == ["ภูเก็ต"]
+
+
+def test_ingest_runs_on_a_fresh_init_db(tmp_path, monkeypatch):
+    import db_script
+
+    engine = create_engine(f"sqlite:///{tmp_path / 'fresh.db'}")
+    monkeypatch.setattr(db_script, "engine", engine)
+    monkeypatch.setattr(db_script, "SessionLocal", sessionmaker(bind=engine))
+    monkeypatch.setattr(db_script, "REJECTION_REPORT", str(tmp_path / "rejected.csv"))
+    db_script.init_db()
+    db_script.save_attractions_and_related_data(
+        [
+            {
+                "name": "หาดกะตะ",
+                "province": "ภูเก็ต",
+                "latitude": 7.9,
+                "longitude": 98.3,
+                "category_name": "ธรรมชาติ",
+                "opening_hours": "ทุกวัน 8:00-18:00",
+            }
+        ],
+        [],
+        {"ธรรมชาติ": 1},
+        {},
+    )
+    with engine.connect() as conn:
+        assert conn.execute(select(AttractionHours.attraction_id)).all()
+
+
+def test_ingest_keeps_parsed_fees_and_hours(tmp_path, monkeypatch):
+    import db_script
+
+    engine = create_engine(f"sqlite:///{tmp_path / 'ingest.db'}")
+    Base.metadata.create_all(bind=engine)
+    monkeypatch.setattr(db_script, "SessionLocal", sessionmaker(bind=engine))
+    monkeypatch.setattr(db_script, "REJECTION_REPORT", str(tmp_path / "rejected.csv"))
+    row = {"province": "ภูเก็ต", "latitude": 7.9, "longitude": 98.3}
+    db_script.save_attractions_and_related_data(
+        [
+            {
+                **row,
+                "name": "หาดกะตะ",
+                "category_name": "ธรรมชาติ",
+                "entrance_fee": "ผู้ใหญ่ 100 บาท เด็ก 50 บาท",
+                "opening_hours": "จ-ศ 9:00-17:00",
+            },
+            {**row, "name": "ตลาดเก่า", "category_name": "ธรรมชาติ"},
+        ],
+        [],
+        {"ธรรมชาติ": 1},
+        {},
+    )
+    with engine.connect() as conn:
+        fees = conn.execute(
+            select(Attraction.name, Attraction.fee_min, Attraction.fee_max)
+        ).all()
+        hours = conn.execute(
+            select(AttractionHours.start_minute, AttractionHours.end_minute)
+            .join(Attraction, Attraction.id == AttractionHours.attraction_id)
+            .where(Attraction.name == "หาดกะตะ")
+            .order_by(AttractionHours.start_minute)
+        ).all()
+    assert sorted(fees) == [("ตลาดเก่า", None, None), ("หาดกะตะ", 50.0, 100.0)]
+    assert [tuple(h) for h in hours] == [
+        (day * 1440 + 540, day * 1440 + 1020) for day in range(5)
+    ]
@@ -0,0 +1,126 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from api.coalesce import CallInterrupted, SingleFlight
+
+
+def slow_lookup(calls, release, value="row"):
+    def fn():
+        calls.append(1)
+        release.wait(2)
+        return value
+
+    return fn
+
+
+def test_concurrent_calls_share_one_lookup():
+    flight = SingleFlight()
+    calls, release = [], threading.Event()
+    fn = slow_lookup(calls, release)
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        futures = [pool.submit(flight.do, "key", fn) for _ in range(8)]
+        time.sleep(0.1)
+        release.set()
+        results = [f.result() for f in futures]
+
+    assert results == ["row"] * 8
+    assert len(calls) == 1
+    # Once finished, the next call runs again instead of reusing the result.
+    assert flight.do("key", lambda: "fresh") == "fresh"
+
+
+def test_errors_propagate_to_followers():
+    flight = SingleFlight()
+    release = threading.Event()
+
+    def failing():
+        release.wait(2)
+        raise ValueError("db down")
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        futures = [pool.submit(flight.do, "key", failing) for _ in range(4)]
+        time.sleep(0.1)
+        release.set()
+        for f in futures:
+            with pytest.raises(ValueError, match="db down"):
+                f.result()
+
+
+def test_follower_timeout():
+    flight = SingleFlight(timeout=0.05)
+    release = threading.Event()
+    leader = threading.Thread(target=flight.do, args=("key", slow_lookup([], release)))
+    leader.start()
+    time.sleep(0.02)
+    with pytest.raises(TimeoutError):
+        flight.do("key", lambda: "unused")
+    release.set()
+    leader.join()
+
+
+def test_async_callers_coalesce_with_threads():
+    flight = SingleFlight()
+    calls, release = [], threading.Event()
+    fn = slow_lookup(calls, release)
+
+    async def main():
+        thread_result = []
+        leader = threading.Thread(
+            target=lambda: thread_result.append(flight.do("key", fn))
+        )
+        leader.start()
+        await asyncio.sleep(0.05)
+        waiters = [asyncio.create_task(flight.do_async("key", fn)) for _ in range(5)]
+        await asyncio.sleep(0.05)
+        release.set()
+        results = await asyncio.gather(*waiters)
+        leader.join()
+        return thread_result + results
+
+    assert asyncio.run(main()) == ["row"] * 6
+    assert len(calls) == 1
+
+
+def test_async_leader_runs_coroutines():
+    flight = SingleFlight()
+    calls = []
+
+    async def lookup():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return 42
+
+    async def main():
+        return await asyncio.gather(*(flight.do_async("k", lookup) for _ in range(10)))
+
+    assert asyncio.run(main()) == [42] * 10
+    assert len(calls) == 1
+
+
+def test_cancelled_leader_releases_key():
+    flight = SingleFlight()
+    started = asyncio.Event()
+
+    async def hang():
+        started.set()
+        await asyncio.sleep(10)
+
+    async def main():
+        leader = asyncio.create_task(flight.do_async("key", hang))
+        await started.wait()
+        follower = asyncio.create_task(flight.do_async("key", hang))
+        await asyncio.sleep(0)
+        leader.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        with pytest.raises(CallInterrupted):
+            await follower
+        return await flight.do_async("key", lambda: "fresh")
+
+    assert asyncio.run(main()) == "fresh"
+    assert flight.do("key", lambda: "again") == "again"
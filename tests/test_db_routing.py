@@ -0,0 +1,116 @@
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from api import db_routing
+from api.db_routing import ReplicaSet, RoutingSession
+from api.models import Base, Attraction
+
+
+def make_engine(path):
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(bind=engine)
+    return engine
+
+
+@pytest.fixture
+def databases(tmp_path):
+    primary = make_engine(tmp_path / "primary.db")
+    replica = make_engine(tmp_path / "replica.db")
+    # Give each database a distinguishable row so we can tell who answered.
+    with sessionmaker(bind=primary)() as db:
+        db.add(Attraction(id=1, name="from-primary"))
+        db.commit()
+    with sessionmaker(bind=replica)() as db:
+        db.add(Attraction(id=1, name="from-replica"))
+        db.commit()
+    return primary, replica
+
+
+def session_factory(primary, replicas):
+    return sessionmaker(
+        class_=RoutingSession, bind=primary, autoflush=False, replicas=replicas
+    )
+
+
+def first_name(db):
+    return db.query(Attraction).get(1).name
+
+
+def test_reads_go_to_replica_and_writes_to_primary(databases):
+    primary, replica = databases
+    Session = session_factory(primary, ReplicaSet([replica]))
+
+    with Session() as db:
+        assert first_name(db) == "from-replica"
+        db.add(Attraction(id=2, name="new"))
+        db.commit()
+        # Once the session has written it stays on the primary.
+        assert db.query(Attraction).filter_by(id=2).one().name == "new"
+
+    with sessionmaker(bind=primary)() as db:
+        assert db.query(Attraction).filter_by(id=2).count() == 1
+    with sessionmaker(bind=replica)() as db:
+        assert db.query(Attraction).filter_by(id=2).count() == 0
+
+
+def test_read_your_writes_window(databases):
+    primary, replica = databases
+    Session = session_factory(primary, ReplicaSet([replica], read_your_writes=60))
+
+    with Session(client_key="alice") as db:
+        db.add(Attraction(id=2, name="new"))
+        db.commit()
+    with Session(client_key="alice") as db:
+        assert first_name(db) == "from-primary"
+    with Session(client_key="bob") as db:
+        assert first_name(db) == "from-replica"
+
+
+def test_use_primary_override_and_no_replicas(databases):
+    primary, replica = databases
+    with session_factory(primary, ReplicaSet([replica]))(use_primary=True) as db:
+        assert first_name(db) == "from-primary"
+    with session_factory(primary, ReplicaSet([]))() as db:
+        assert first_name(db) == "from-primary"
+
+
+def test_unhealthy_replica_is_ejected(databases, tmp_path):
+    primary, replica = databases
+    broken = create_engine(f"sqlite:///{tmp_path / 'missing' / 'replica.db'}")
+    replicas = ReplicaSet([broken, replica], check_interval=0)
+    Session = session_factory(primary, replicas)
+
+    for _ in range(3):
+        with Session() as db:
+            assert first_name(db) == "from-replica"
+    assert [r.healthy for r in replicas.replicas] == [False, True]
+
+
+def test_lagging_replica_falls_back_to_primary(databases, monkeypatch):
+    primary, replica = databases
+    lag = {"seconds": 30.0}
+    monkeypatch.setattr(db_routing, "replica_lag", lambda conn: lag["seconds"])
+    replicas = ReplicaSet([replica], max_lag=1, check_interval=0)
+    Session = session_factory(primary, replicas)
+
+    with Session() as db:
+        assert first_name(db) == "from-primary"
+    assert replicas.replicas[0].lag == 30.0
+    assert not replicas.replicas[0].healthy
+
+    # Once it catches up the next check puts it back in rotation.
+    lag["seconds"] = 0.5
+    with Session() as db:
+        assert first_name(db) == "from-replica"
+
+
+def test_least_loaded_strategy(databases, tmp_path):
+    primary, replica = databases
+    other = make_engine(tmp_path / "replica2.db")
+    replicas = ReplicaSet([replica, other], strategy="least_loaded")
+    first = replicas.acquire()
+    second = replicas.acquire()
+    assert first is not second
+    replicas.release(first)
+    assert replicas.acquire() is first
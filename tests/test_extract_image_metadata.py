@@ -0,0 +1,63 @@
+import pytest
+
+from api.images import relative_path, variant_path
+from api.models import Attraction, Image
+from scripts import extract_image_metadata
+
+URLS = [f"https://cdn.example.com/photos/{i}.png" for i in (1, 2, 3)]
+
+
+@pytest.fixture
+def seed():
+    def add_rows(db):
+        db.add(Attraction(id=1, name="A1", main_image_url=URLS[0]))
+        db.add_all(
+            [
+                Image(id=i, attraction_id=1, image_url=url)
+                for i, url in enumerate(URLS, 1)
+            ]
+        )
+
+    return add_rows
+
+
+@pytest.fixture
+def originals(tmp_path, session_factory, monkeypatch):
+    PILImage = pytest.importorskip("PIL.Image")
+    root = tmp_path / "originals"
+    for url in URLS[:2]:  # the third image's file is missing
+        path = root / relative_path(url)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        PILImage.new("RGB", (800, 400), (10, 120, 200)).save(path)
+    monkeypatch.setattr(
+        extract_image_metadata,
+        "SessionLocal",
+        lambda use_primary=False: session_factory(),
+    )
+    return root
+
+
+def images(session_factory):
+    with session_factory() as db:
+        return {
+            image.id: (image.width, image.has_variants)
+            for image in db.query(Image).order_by(Image.id)
+        }
+
+
+def test_variants_run_after_a_metadata_run_backfills(
+    tmp_path, originals, session_factory
+):
+    assert extract_image_metadata.run(originals, None, 1, 1) == (2, 1)
+    assert images(session_factory) == {1: (800, None), 2: (800, None), 3: (None, None)}
+
+    variants = tmp_path / "variants"
+    assert extract_image_metadata.run(originals, variants, 1, 1) == (2, 1)
+    assert images(session_factory) == {1: (800, True), 2: (800, True), 3: (None, None)}
+    for url in URLS[:2]:
+        assert (variants / "320" / variant_path(relative_path(url))).exists()
+    with session_factory() as db:
+        assert db.get(Attraction, 1).main_image_has_variants is True
+
+    # Nothing left to do until the missing file turns up.
+    assert extract_image_metadata.run(originals, variants, 10, 1) == (0, 1)
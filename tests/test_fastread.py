@@ -0,0 +1,109 @@
+import datetime
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from api import crud, fastread
+from api.recommender import recommend_for_user
+from api.models import Attraction, AttractionTag, Base, Review, Tag, User
+from api.schemas import AttractionOut
+from api.tag_index import tag_index
+
+
+def dump(rows):
+    return [
+        AttractionOut.model_validate(r, from_attributes=True).model_dump() for r in rows
+    ]
+
+
+@pytest.fixture
+def db(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'fast.db'}")
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(bind=engine)
+    with Session() as session:
+        session.add(User(user_id=1, username="u", email="u@x", password_hash="x"))
+        session.add_all([Tag(tag_id=1, name="temple"), Tag(tag_id=2, name="view")])
+        session.add_all(
+            [
+                Attraction(
+                    id=i,
+                    name=f"A{i}",
+                    province="ภูเก็ต",
+                    opening_hours="ทุกวัน 08:00-17:00" if i % 2 else None,
+                    entrance_fee=f"{i * 10} บาท",
+                    main_image_url=f"images/{i}.jpg",
+                )
+                for i in range(1, 11)
+            ]
+        )
+        session.add_all(
+            [AttractionTag(attraction_id=i, tag_id=1) for i in (2, 3, 5)]
+            + [AttractionTag(attraction_id=i, tag_id=2) for i in (3, 4)]
+        )
+        session.add(
+            Review(
+                attraction_id=1, user_id=1, rating=5, created_at=datetime.datetime.now()
+            )
+        )
+        session.commit()
+    tag_index.invalidate()
+    with Session() as session:
+        yield session
+    tag_index.invalidate()
+
+
+def test_row_matches_orm_serialization(db):
+    row = fastread.get_attraction(db, 3)
+    assert isinstance(row, fastread.AttractionRow)
+    assert row.main_image_variants == db.get(Attraction, 3).main_image_variants
+    assert dump([row]) == dump([crud.get_attraction(db, 3)])
+    assert fastread.get_attraction(db, 99) is None
+
+
+@pytest.mark.parametrize(
+    "kwargs",
+    [
+        {},
+        {"skip": 3, "limit": 4},
+        {"max_fee": 50},
+        {"open_at": datetime.datetime(2026, 10, 19, 9, 0), "limit": 3},
+        {"tag_ids": [1]},
+        {"tag_ids": [1], "skip": 1, "limit": 1},
+        {"tag_ids": [1], "max_fee": 40},
+        {"tag_ids": [99], "max_fee": 40},
+        {"tag_ids": [1, 2, 1], "max_fee": 100},
+        {"tag_ids": [1, 2], "tag_mode": "any", "max_fee": 40, "skip": 1},
+        {
+            "tag_ids": [2, 99],
+            "tag_mode": "any",
+            "open_at": datetime.datetime(2026, 10, 19, 9),
+        },
+    ],
+)
+def test_list_matches_crud(db, kwargs):
+    assert dump(fastread.get_attractions(db, **kwargs)) == dump(
+        crud.get_attractions(db, **kwargs)
+    )
+    sparse = crud.get_attractions(db, fields=["id", "name"], **kwargs)
+    assert sparse == [
+        {"id": row.id, "name": row.name}
+        for row in fastread.get_attractions(db, **kwargs)
+    ]
+
+
+def test_statements_are_reused(db):
+    assert fastread.list_statement(True, False, "all") is fastread.list_statement(
+        True, False, "all"
+    )
+    # Tags and filters are intersected in SQL with a fixed number of binds.
+    params = fastread.list_statement(False, True, "any").compile().params
+    assert "ids" not in params and "tag_ids" in params
+    ids = [row.id for row in fastread.get_attractions_by_ids(db, [5, 2, 42, 1])]
+    assert ids == [5, 2, 1]
+
+
+def test_recommend_skips_reviewed(db):
+    recs = recommend_for_user(db, 1)
+    assert len(recs) == 5 and 1 not in [r.id for r in recs]
@@ -0,0 +1,143 @@
+import datetime
+
+import numpy as np
+import pytest
+from sqlalchemy import delete, insert
+
+from api.feed import Feed, active_users, decode_cursor, feed_store, page
+from api.models import Attraction, AttractionTag, Favorite, Review, Tag, User
+from api.tag_index import TagIndex
+
+
+def test_tag_affinity():
+    index = TagIndex()
+    index._build([(1, 1), (2, 1), (2, 2), (3, 2), (4, 3)])
+    scores = dict(zip(index.attraction_ids.tolist(), index.affinity({1: 1.0})))
+    assert scores[1] == 1.0
+    assert scores[2] == pytest.approx(1 / np.sqrt(2))
+    assert scores[3] == scores[4] == 0
+    # A disliked attraction's tags push scores down, never below zero.
+    assert index.affinity({3: -1.0}).min() == 0
+    assert not index.affinity({99: 1.0}).any()
+
+
+def test_page_follows_the_last_id_across_rebuilds():
+    feed = Feed(np.array([5, 4, 3, 2, 1]), np.linspace(1, 0, 5, dtype=np.float32))
+    ids, _, cursor = page(feed, 2)
+    assert ids == [5, 4] and decode_cursor(cursor) == (2, 4)
+    rebuilt = Feed(np.array([9, 4, 3, 2, 1]), np.zeros(5, dtype=np.float32))
+    assert page(rebuilt.without(3), 2, cursor)[0] == [2, 1]
+    assert page(rebuilt, 10, cursor)[2] is None
+
+
+@pytest.fixture
+def seed():
+    def add_rows(db):
+        db.add_all(
+            [
+                User(user_id=i, username=f"u{i}", email=f"u{i}@x", password_hash="x")
+                for i in (1, 2)
+            ]
+        )
+        db.add_all([Tag(tag_id=1, name="temple"), Tag(tag_id=2, name="beach")])
+        db.add_all([Attraction(id=i, name=f"A{i}") for i in range(1, 7)])
+        # 1-3 are temples, 4-5 beaches, 6 is untagged but popular.
+        db.add_all(
+            [AttractionTag(attraction_id=i, tag_id=1) for i in (1, 2, 3)]
+            + [AttractionTag(attraction_id=i, tag_id=2) for i in (4, 5)]
+        )
+        db.add(Favorite(user_id=1, attraction_id=1))
+        db.add_all([Favorite(user_id=2, attraction_id=i) for i in (6, 5)])
+        now = datetime.datetime.now()
+        db.add(Review(attraction_id=4, user_id=1, rating=1, created_at=now))
+        db.add(
+            Review(
+                attraction_id=6,
+                user_id=2,
+                rating=5,
+                created_at=now - datetime.timedelta(days=30),
+            )
+        )
+
+    return add_rows
+
+
+def feed_ids(client, user_id, **params):
+    r = client.get("/feed", params={"user_id": user_id, **params})
+    assert r.status_code == 200
+    return r.json()
+
+
+def test_feed_ranks_by_affinity_and_skips_history(client):
+    body = feed_ids(client, 1)
+    ids = [item["id"] for item in body["items"]]
+    # Temples first; the disliked beach's tag sinks 5; 1 and 4 are history.
+    assert ids[:2] == [2, 3]
+    assert set(ids) == {2, 3, 5, 6}
+    assert ids.index(6) < ids.index(5)
+    assert body["items"][0]["score"] > body["items"][-1]["score"]
+    assert body["next_cursor"] is None
+
+
+def test_feed_pages_with_cursor(client):
+    first = feed_ids(client, 2, limit=2)
+    second = feed_ids(client, 2, limit=2, cursor=first["next_cursor"])
+    ids = [i["id"] for i in first["items"] + second["items"]]
+    assert len(ids) == len(set(ids)) == 4
+    assert client.get("/feed", params={"user_id": 2, "cursor": "!"}).status_code == 400
+
+
+def test_scores_stay_with_their_ids_after_a_delete(client, session_factory):
+    with session_factory() as db:
+        user_feed = feed_store.get(db, 1)
+        expected = dict(zip(user_feed.ids.tolist(), user_feed.scores.tolist()))
+        db.execute(delete(AttractionTag).where(AttractionTag.attraction_id == 2))
+        db.execute(delete(Attraction).where(Attraction.id == 2))
+        db.commit()
+    items = feed_ids(client, 1)["items"]
+    assert 2 not in [item["id"] for item in items]
+    for item in items:
+        assert item["score"] == pytest.approx(expected[item["id"]])
+
+
+def test_writes_update_the_feed(client, session_factory):
+    assert 2 in [i["id"] for i in feed_ids(client, 1)["items"]]
+    with session_factory() as db:
+        db.add(Favorite(user_id=1, attraction_id=2))
+        db.commit()
+        assert 2 not in feed_store.get(db, 1).ids
+        assert feed_store.due() == [1]
+        assert feed_store.refresh(db) == 1
+        assert feed_store.due() == []
+        assert 2 not in feed_store.get(db, 1).ids
+
+    with session_factory() as db:
+        db.add(Favorite(user_id=1, attraction_id=3))
+        db.flush()
+        db.rollback()
+    assert feed_store.due() == []
+
+
+def test_refresh_applies_writes_from_other_processes(session_factory):
+    with session_factory() as db:
+        assert 2 in feed_store.get(db, 1).ids
+        # Core inserts skip this process's session hooks, like another
+        # worker's commit would.
+        db.execute(insert(Favorite).values(user_id=1, attraction_id=2))
+        db.execute(insert(Review).values(user_id=1, attraction_id=3, rating=5))
+        db.commit()
+        assert 2 in feed_store.get(db, 1).ids
+        assert feed_store.sync_writes(db) >= 2
+        assert not np.isin([2, 3], feed_store.get(db, 1).ids).any()
+        assert feed_store.due() == [1]
+        feed_store.refresh(db)
+        # Rows seen again on the next pass leave the rebuilt feed alone.
+        assert feed_store.sync_writes(db) >= 2
+        assert feed_store.due() == []
+
+
+def test_refresh_warms_recent_reviewers(session_factory):
+    with session_factory() as db:
+        assert active_users(db) == [1]
+        assert feed_store.refresh(db, active_users(db)) == 1
+        assert 1 in feed_store._feeds
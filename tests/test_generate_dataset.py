@@ -0,0 +1,91 @@
+import datetime
+from types import SimpleNamespace
+
+import pandas as pd
+import pytest
+from sqlalchemy import create_engine, select
+from sqlalchemy.dialects import postgresql
+
+from api import passwords
+from api.cleaning import PROVINCES
+from api.models import Attraction, AttractionHours, Favorite, Review, User
+from scripts.generate_dataset import generate, write
+
+END = datetime.date(2026, 10, 1)
+
+
+def load(tmp_path, name, **kwargs):
+    engine = create_engine(f"sqlite:///{tmp_path / name}")
+    counts = generate(engine, 300, 50, seed=3, end=END, chunk_size=100, **kwargs)
+    with engine.connect() as conn:
+        tables = {
+            model.__tablename__: conn.execute(
+                select(model.__table__).order_by(*model.__table__.primary_key)
+            ).all()
+            for model in (Attraction, AttractionHours, Review, Favorite)
+        }
+        stored_hash = conn.execute(select(User.password_hash)).scalars().first()
+    engine.dispose()
+    return counts, tables, stored_hash
+
+
+def test_same_seed_same_rows_with_any_worker_count(tmp_path):
+    counts, tables, stored_hash = load(tmp_path, "one.db")
+    assert load(tmp_path, "two.db", workers=2)[:2] == (counts, tables)
+    assert counts["attractions"] == 300 and counts["User"] == 50
+    assert counts["Review"] == len(tables["Review"]) > 300
+    assert passwords.verify_password("painaidee-load-test", stored_hash)
+
+    provinces = {p[0] for p in PROVINCES}
+    assert {row.province for row in tables["attractions"]} <= provinces
+    assert all(1 <= row.rating <= 5 for row in tables["Review"])
+    assert all(row.created_at.date() <= END for row in tables["Review"])
+    pairs = [(row.user_id, row.attraction_id) for row in tables["Favorite"]]
+    assert len(pairs) == len(set(pairs))
+
+
+def test_refuses_a_loaded_database(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'd.db'}")
+    generate(engine, 10, 5, end=END)
+    with pytest.raises(RuntimeError):
+        generate(engine, 10, 5, end=END)
+
+
+class FakeCursor:
+    def __init__(self):
+        self.copied = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def copy(self, sql):  # psycopg 3
+        cursor = self
+
+        class Copy(FakeCursor):
+            def write(self, data):
+                cursor.copied.append((sql, data))
+
+        return Copy()
+
+    def copy_expert(self, sql, file):  # psycopg2
+        self.copied.append((sql, file.read()))
+
+
+@pytest.mark.parametrize("driver", ["psycopg", "psycopg2"])
+def test_postgresql_loads_with_the_drivers_copy(driver):
+    cursor = FakeCursor()
+    dialect = postgresql.dialect()
+    dialect.driver = driver
+    conn = SimpleNamespace(
+        dialect=dialect, connection=SimpleNamespace(cursor=lambda: cursor)
+    )
+    write(conn, User.__table__, pd.DataFrame({"user_id": [1], "username": ["a"]}))
+    assert cursor.copied == [
+        (
+            'COPY "User" (user_id, username) FROM STDIN WITH (FORMAT csv)',
+            "1,a\n",
+        )
+    ]
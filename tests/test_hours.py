@@ -0,0 +1,146 @@
+from datetime import datetime, timezone
+
+import pandas as pd
+import pytest
+from sqlalchemy import select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.schema import CreateIndex
+
+from api.cleaning import parse_opening_hours
+from api.hours import covers_minute, minute_of_week, rebuild, week_intervals
+from api.models import Attraction, AttractionHours, AttractionTag, Tag
+from api.tag_index import tag_index
+
+
+def test_minute_of_week_uses_bangkok_time():
+    # Monday 09:30 in Bangkok is Monday 02:30 UTC.
+    assert minute_of_week(datetime(2026, 10, 19, 9, 30)) == 570
+    assert minute_of_week(datetime(2026, 10, 19, 2, 30, tzinfo=timezone.utc)) == 570
+    assert minute_of_week(datetime(2026, 10, 25, 23, 59)) == 7 * 1440 - 1
+
+
+def test_week_intervals_wrap_past_sunday():
+    hours = parse_opening_hours(
+        pd.Series(["Sun-Mon 22:00-02:00", "ปิดวันอังคาร"], dtype="string")
+    )
+    intervals = week_intervals([7, 8], hours)
+    assert sorted(map(tuple, intervals.to_numpy().tolist())) == [
+        (7, 0, 120),
+        (7, 1320, 1560),
+        (7, 9960, 10080),
+    ]
+
+
+def test_open_at_is_a_range_lookup_on_postgresql():
+    condition = covers_minute(570)
+    assert str(condition.compile(dialect=postgresql.dialect())).startswith(
+        "int4range(attraction_hours.start_minute, attraction_hours.end_minute) @> "
+    )
+    assert str(condition.compile(dialect=sqlite.dialect())) == (
+        "(attraction_hours.start_minute <= ? AND attraction_hours.end_minute > ?)"
+    )
+    index = next(
+        i for i in AttractionHours.__table__.indexes if i.name.endswith("_range")
+    )
+    assert "USING gist (int4range(start_minute, end_minute))" in str(
+        CreateIndex(index).compile(dialect=postgresql.dialect())
+    )
+
+
+def test_orm_writes_keep_structured_fields_in_sync(session_factory):
+    with session_factory() as db:
+        attraction = Attraction(
+            name="Wat", opening_hours="จ-ศ 9:00-17:00", entrance_fee="50 บาท"
+        )
+        db.add(attraction)
+        db.commit()
+        assert (attraction.fee_min, attraction.fee_max) == (50, 50)
+        spans = db.scalars(select(AttractionHours.start_minute)).all()
+        assert sorted(spans) == [540 + day * 1440 for day in range(5)]
+
+        attraction.opening_hours = "เปิด 24 ชั่วโมง"
+        attraction.entrance_fee = "ฟรี"
+        db.commit()
+        assert (attraction.fee_min, attraction.fee_max) == (0, 0)
+        assert db.query(AttractionHours).count() == 7
+
+        attraction.opening_hours = None
+        db.commit()
+        assert db.query(AttractionHours).count() == 0
+
+
+def test_rebuild_fills_rows_written_without_the_orm(session_factory):
+    with session_factory() as db:
+        db.execute(
+            Attraction.__table__.insert(),
+            [
+                {"id": 1, "name": "a", "opening_hours": "ทุกวัน 8:00-16:00"},
+                {"id": 2, "name": "b", "opening_hours": None},
+            ],
+        )
+        assert rebuild(db.connection()) == 2
+        assert db.query(AttractionHours).filter_by(attraction_id=1).count() == 7
+        assert db.query(AttractionHours).filter_by(attraction_id=2).count() == 0
+
+
+@pytest.fixture
+def client(client, session_factory):
+    # Seeded here rather than through ``seed`` so the sync and rebuild tests
+    # start from an empty hours table.
+    with session_factory() as db:
+        db.add(Tag(tag_id=1, name="temple"))
+        db.add_all(
+            [
+                Attraction(
+                    id=1,
+                    name="office",
+                    opening_hours="จ-ศ 9:00-17:00",
+                    entrance_fee="ฟรี",
+                ),
+                Attraction(
+                    id=2, name="night market", opening_hours="ทุกวัน 18:00-02:00"
+                ),
+                Attraction(
+                    id=3,
+                    name="museum",
+                    opening_hours="ทุกวัน 10:00-20:00",
+                    entrance_fee="200 บาท",
+                ),
+                Attraction(id=4, name="unknown"),
+            ]
+        )
+        db.add_all([AttractionTag(attraction_id=i, tag_id=1) for i in (1, 3)])
+        db.commit()
+    tag_index.invalidate()
+    return client
+
+
+def names(response):
+    assert response.status_code == 200
+    return sorted(a["name"] for a in response.json())
+
+
+def test_open_at_and_max_fee_filters(client):
+    monday_noon = "2026-10-19T12:00:00"
+    saturday_1am = "2026-10-24T01:00:00+07:00"
+    assert names(client.get("/attractions", params={"open_at": monday_noon})) == [
+        "museum",
+        "office",
+    ]
+    # Friday's market is still open after midnight.
+    assert names(client.get("/attractions", params={"open_at": saturday_1am})) == [
+        "night market"
+    ]
+    assert names(client.get("/attractions", params={"max_fee": 0})) == ["office"]
+    assert names(
+        client.get("/attractions", params={"open_at": monday_noon, "max_fee": 500})
+    ) == ["museum", "office"]
+
+
+def test_filters_combine_with_tags_and_fields(client):
+    r = client.get(
+        "/attractions",
+        params={"tags": 1, "max_fee": 100, "fields": "name,fee_min"},
+    )
+    assert r.json() == [{"name": "office", "fee_min": 0.0}]
+    assert client.get("/attractions", params={"max_fee": -1}).status_code == 422
@@ -0,0 +1,65 @@
+import numpy as np
+import pytest
+
+from api.images import (
+    blurhash,
+    extract_metadata,
+    relative_path,
+    variant_path,
+    variant_urls,
+)
+
+
+def test_picsum_variants_keep_aspect_ratio():
+    variants = variant_urls("https://picsum.photos/seed/7/1200/800")
+    assert variants == {
+        "thumb": "https://picsum.photos/seed/7/320/213",
+        "small": "https://picsum.photos/seed/7/640/427",
+        "medium": "https://picsum.photos/seed/7/1024/683",
+    }
+    # Never offer a "variant" larger than the original.
+    assert set(variant_urls("https://picsum.photos/seed/1-0/800/600")) == {
+        "thumb",
+        "small",
+    }
+
+
+def test_other_urls_use_variant_base_once_generated():
+    url = "https://cdn.example.com/a/b.png"
+    base = "https://img.example.com"
+    assert variant_urls(url, True, base_url="") == {}
+    assert variant_urls(url, False, base_url=base) == {}
+    assert variant_urls(url, None, base_url=base) == {}
+    assert variant_urls(url, True, base_url=base)["thumb"] == (
+        "https://img.example.com/320/cdn.example.com/a/b.jpg"
+    )
+    assert variant_urls(None, True, base_url=base) == {}
+
+
+def test_blurhash_matches_reference_encoder():
+    y, x = np.mgrid[0:16, 0:24]
+    gradient = np.stack([x * 10, y * 15, np.full_like(x, 128)], -1).astype(np.uint8)
+    assert blurhash(gradient) == "LoF=?e2swxbbqSWEjte=gJfjfQfj"
+
+
+def test_extract_metadata_writes_variants(tmp_path):
+    PILImage = pytest.importorskip("PIL.Image")
+    rel = relative_path("https://cdn.example.com/photos/a.png")
+    original = tmp_path / "originals" / rel
+    original.parent.mkdir(parents=True)
+    PILImage.new("RGB", (800, 400), (10, 120, 200)).save(original)
+
+    meta = extract_metadata(
+        rel, root=tmp_path / "originals", variants_root=tmp_path / "variants"
+    )
+    assert meta["width"] == 800 and meta["height"] == 400
+    assert meta["size_bytes"] == original.stat().st_size
+    assert len(meta["blurhash"]) == 28
+    assert meta["has_variants"] is True
+    assert not (tmp_path / "variants" / "320" / rel).exists()
+    with PILImage.open(tmp_path / "variants" / "320" / variant_path(rel)) as thumb:
+        assert thumb.format == "JPEG" and thumb.size == (320, 160)
+
+    assert "has_variants" not in extract_metadata(rel, root=tmp_path / "originals")
+
+    assert extract_metadata("missing.jpg", root=tmp_path) is None
@@ -0,0 +1,127 @@
+import time
+
+import numpy as np
+import pytest
+
+from api.itinerary import (
+    DistanceCache,
+    Schedule,
+    haversine_matrix,
+    nearest_neighbour,
+    two_opt,
+)
+from api.models import Attraction, Favorite, User
+
+
+def route_km(route, dist):
+    return sum(dist[a, b] for a, b in zip(route, route[1:]))
+
+
+def test_haversine_matrix():
+    # Bangkok to Chiang Mai is about 580 km as the crow flies.
+    dist = haversine_matrix(np.array([13.7563, 18.7883]), np.array([100.5018, 98.9853]))
+    assert dist[0, 0] == 0
+    assert dist[0, 1] == dist[1, 0]
+    assert 575 < dist[0, 1] < 590
+
+
+def test_two_opt_untangles_a_route():
+    rng = np.random.default_rng(0)
+    lon = rng.permutation(np.linspace(100.0, 101.0, 12))
+    lat = np.full(12, 13.0)
+    dist = haversine_matrix(lat, lon)
+    route = two_opt(list(range(12)), dist, np.zeros(12))
+    assert lon[route].tolist() in (sorted(lon), sorted(lon)[::-1])
+
+
+def test_random_stops_are_fast_and_near_optimal():
+    rng = np.random.default_rng(1)
+    lat, lon = rng.uniform(13, 14, 60), rng.uniform(100, 101, 60)
+    dist = haversine_matrix(lat, lon)
+    started = time.perf_counter()
+    greedy, _ = nearest_neighbour(dist, np.zeros(60))
+    route = two_opt(greedy, dist, np.zeros(60))
+    assert time.perf_counter() - started < 0.5
+    assert sorted(route) == list(range(60))
+    assert route_km(route, dist) <= route_km(greedy, dist)
+
+
+def test_schedule_visits_the_early_closer_first():
+    # Stop 1 is nearer but stop 0 closes after an hour.
+    dist = np.array([[0.0, 30.0], [30.0, 0.0]])
+    windows = [np.array([[0, 60]]), None]
+    schedule = Schedule(windows, dist, np.array([30.0, 0.0]), dwell=20)
+    route, unreachable = nearest_neighbour(dist, np.array([30.0, 0.0]), schedule)
+    assert (route, unreachable) == ([0, 1], [])
+    assert schedule.times(route) == [30.0, 80.0]
+    assert schedule.times([1, 0]) is None
+
+
+def test_distance_cache_reorders_and_evicts():
+    cache = DistanceCache(maxsize=1)
+    ids, lat, lon = np.array([2, 1]), np.array([13.0, 14.0]), np.array([100.0, 100.0])
+    first = cache.matrix(ids, lat, lon)
+    again = cache.matrix(ids[::-1], lat[::-1], lon[::-1])
+    assert np.array_equal(first, again[::-1, ::-1])
+    cache.matrix(np.array([3]), np.array([1.0]), np.array([1.0]))
+    assert len(cache._entries) == 1
+
+
+@pytest.fixture
+def seed():
+    def add_rows(db):
+        db.add(User(user_id=1, username="u", email="u@example.com", password_hash="x"))
+        db.add_all(
+            [
+                Attraction(id=1, name="west", latitude=13.75, longitude=100.40),
+                Attraction(id=2, name="east", latitude=13.75, longitude=100.60),
+                Attraction(
+                    id=3,
+                    name="middle",
+                    latitude=13.75,
+                    longitude=100.50,
+                    opening_hours="ทุกวัน 08:00-10:00",
+                ),
+                Attraction(id=4, name="nowhere"),
+            ]
+        )
+        db.add_all([Favorite(user_id=1, attraction_id=i) for i in (2, 1, 3, 4)])
+
+    return add_rows
+
+
+def test_itinerary_orders_favorites(client):
+    r = client.get("/itinerary", params={"user_id": 1})
+    assert r.status_code == 200
+    body = r.json()
+    names = [s["name"] for s in body["stops"]]
+    assert names in (["west", "middle", "east"], ["east", "middle", "west"])
+    assert body["skipped"] == [4]
+    assert body["stops"][0]["distance_km"] == 0
+    assert body["total_km"] == pytest.approx(21.6, abs=0.1)
+    assert len(body["distance_matrix"]) == 3
+
+
+def test_itinerary_respects_opening_hours(client):
+    params = {"ids": [1, 2, 3], "lat": 13.75, "lon": 100.61, "speed": 60}
+    r = client.get("/itinerary", params=params)
+    assert [s["name"] for s in r.json()["stops"]] == ["east", "middle", "west"]
+
+    # "middle" closes at 10:00, so it goes first even though "east" is nearer.
+    r = client.get(
+        "/itinerary", params={**params, "start": "2026-10-19T09:00:00", "dwell": 30}
+    )
+    stops = r.json()["stops"]
+    assert [s["name"] for s in stops] == ["middle", "east", "west"]
+    assert stops[0]["visit_at"] == "2026-10-19T09:12:00"
+
+    # Closed for the rest of the day, so the visit moves to tomorrow morning.
+    r = client.get("/itinerary", params={"ids": [1, 3], "start": "2026-10-19T11:00:00"})
+    visits = {s["attraction_id"]: s["visit_at"] for s in r.json()["stops"]}
+    assert visits[3] == "2026-10-20T08:00:00"
+
+
+def test_itinerary_validation(client):
+    assert client.get("/itinerary").status_code == 400
+    assert client.get("/itinerary", params={"ids": 1, "lat": 13}).status_code == 400
+    assert client.get("/itinerary", params={"ids": 1, "speed": 0}).status_code == 422
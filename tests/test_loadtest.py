@@ -0,0 +1,117 @@
+import asyncio
+import json
+import random
+from pathlib import Path
+
+import pytest
+
+from api import fastread, passwords
+from api.models import Attraction, User
+from scripts.generate_dataset import SHARED_PASSWORD, reference_rows
+from scripts.loadtest import LoadTest, Variables, login_users, render
+
+PROFILES = sorted(
+    (Path(__file__).parents[1] / "scripts" / "loadtest_profiles").glob("*.json")
+)
+
+PROFILE = {
+    "seed": 1,
+    "clients": 5,
+    "stages": [{"duration": 0.5, "rps": 40}],
+    "auth": {"users": [{"username": "bret", "password": "pw"}]},
+    "variables": {
+        "attraction_id": {"zipf": {"n": 3, "s": 1.2}},
+        "rating": {"range": [1, 5]},
+    },
+    "requests": [
+        {"name": "detail", "weight": 3, "path": "/attractions/{attraction_id}"},
+        {
+            "name": "write_review",
+            "weight": 1,
+            "method": "POST",
+            "auth": True,
+            "path": "/attractions/{attraction_id}/reviews",
+            "json": {"rating": "{rating}", "comment": "id {attraction_id}"},
+        },
+    ],
+}
+
+
+def test_render_keeps_types():
+    values = {"id": 3, "name": "x"}
+    assert render("/a/{id}?q={name}", values) == "/a/3?q=x"
+    assert render({"rating": "{id}", "tags": ["{name}"]}, values) == {
+        "rating": 3,
+        "tags": ["x"],
+    }
+
+
+def test_zipf_variables_favour_low_ids():
+    variables = Variables({"a": {"zipf": {"n": 50, "s": 1.2}}}, random.Random(0))
+    draws = [variables.draw()["a"] for _ in range(2000)]
+    assert all(1 <= d <= 50 for d in draws)
+    assert draws.count(1) > draws.count(50) * 5
+
+
+@pytest.fixture
+def seed(monkeypatch):
+    monkeypatch.setattr(passwords, "SCRYPT_N", 2**10)
+
+    def add_rows(db):
+        db.add(
+            User(
+                user_id=1,
+                username="bret",
+                email="b@x.com",
+                password_hash=passwords.hash_password("pw"),
+            )
+        )
+        db.add_all([Attraction(id=i, name=f"A{i}") for i in (1, 2, 3)])
+        generated = reference_rows(3)[User.__tablename__]
+        generated["user_id"] += 1
+        db.execute(User.__table__.insert(), generated.to_dict("records"))
+
+    return add_rows
+
+
+def test_inprocess_run_reports_percentiles(app_db):
+    report = asyncio.run(LoadTest(PROFILE).run())
+    total = report["total"]
+    assert total["count"] == 20
+    assert total["error_rate"] == 0
+    assert total["p50_ms"] <= total["p95_ms"] <= total["p99_ms"]
+    assert set(report["requests"]) == {"detail", "write_review"}
+    assert set(report["requests"]["write_review"]["statuses"]) == {"201"}
+
+
+def test_idle_stages_send_nothing(app_db):
+    idle = {"duration": 0.2, "rps": 0}
+    report = asyncio.run(LoadTest({**PROFILE, "stages": [idle]}).run())
+    assert report["total"]["count"] == 0
+    profile = {**PROFILE, "stages": [idle, *PROFILE["stages"], idle]}
+    assert asyncio.run(LoadTest(profile).run())["total"]["count"] == 20
+
+
+def test_app_exceptions_count_as_server_errors(app_db, monkeypatch):
+    def broken(db, attraction_id):
+        raise RuntimeError("boom")
+
+    monkeypatch.setattr(fastread, "get_attraction", broken)
+    profile = {**PROFILE, "requests": PROFILE["requests"][:1]}
+    report = asyncio.run(LoadTest(profile).run())
+    assert report["total"]["count"] == 20
+    assert report["total"]["error_rate"] == 1
+    assert set(report["requests"]["detail"]["statuses"]) == {"500"}
+
+
+@pytest.mark.parametrize("path", PROFILES, ids=lambda p: p.stem)
+def test_shipped_profiles_log_in_as_generated_users(path):
+    profile = json.loads(path.read_text(encoding="utf-8"))
+    users = login_users(profile["auth"])
+    assert users and all(u["password"] == SHARED_PASSWORD for u in users)
+
+
+def test_generated_users_can_write(app_db):
+    profile = {**PROFILE, "auth": {"generated_users": 3}}
+    report = asyncio.run(LoadTest(profile).run())
+    assert set(report["requests"]["write_review"]["statuses"]) == {"201"}
@@ -0,0 +1,153 @@
+import os
+
+import pytest
+import sqlalchemy as sa
+from alembic import command
+from alembic.autogenerate import compare_metadata
+from alembic.config import Config
+from alembic.migration import MigrationContext
+from alembic.operations import Operations
+
+from api.hours import structured
+from api.models import Base
+from migrations import online
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture
+def alembic_config(tmp_path, monkeypatch):
+    url = f"sqlite:///{tmp_path / 'migrate.db'}"
+    monkeypatch.setenv("DATABASE_URL", url)
+    config = Config(os.path.join(ROOT, "alembic.ini"))
+    config.set_main_option("script_location", os.path.join(ROOT, "migrations"))
+    return config, url
+
+
+def test_upgrade_head_matches_models(alembic_config):
+    config, url = alembic_config
+    command.upgrade(config, "head")
+
+    engine = sa.create_engine(url)
+    with engine.connect() as conn:
+        diff = compare_metadata(MigrationContext.configure(conn), Base.metadata)
+    # The progress table belongs to the migration helpers, not the models.
+    diff = [d for d in diff if "alembic_backfill_progress" not in repr(d)]
+    assert diff == []
+
+    command.downgrade(config, "base")
+    with engine.connect() as conn:
+        assert set(sa.inspect(conn).get_table_names()) <= {
+            "alembic_version",
+            "alembic_backfill_progress",
+        }
+
+
+@pytest.fixture
+def numbers(tmp_path):
+    engine = sa.create_engine(f"sqlite:///{tmp_path / 'backfill.db'}")
+    with engine.begin() as conn:
+        conn.exec_driver_sql(
+            "CREATE TABLE numbers (id INTEGER PRIMARY KEY, sq INTEGER)"
+        )
+        # Gaps in the key must not break batching.
+        conn.execute(
+            sa.text("INSERT INTO numbers (id) VALUES (:id)"),
+            [{"id": i} for i in range(1, 60) if i % 7],
+        )
+    return engine
+
+
+def run_backfill(engine, **kw):
+    with engine.connect() as conn:
+        context = MigrationContext.configure(conn)
+        with Operations.context(context):
+            return online.batched_backfill(
+                "numbers", "sq = id * id", where="sq IS NULL", pause=0, **kw
+            )
+
+
+def test_batched_backfill_updates_every_row(numbers):
+    assert run_backfill(numbers, batch_size=10) == 51
+    with numbers.connect() as conn:
+        rows = conn.exec_driver_sql("SELECT id, sq FROM numbers").all()
+        assert all(sq == i * i for i, sq in rows)
+        # Progress is cleared once the job finishes.
+        assert (
+            conn.exec_driver_sql(
+                "SELECT count(*) FROM alembic_backfill_progress"
+            ).scalar()
+            == 0
+        )
+
+
+def test_batched_backfill_resumes_from_recorded_key(numbers):
+    with numbers.begin() as conn:
+        online.backfill_progress.create(conn)
+        conn.execute(online.backfill_progress.insert().values(job="sq", last_key=40))
+
+    assert run_backfill(numbers, job="sq", batch_size=4) == 16
+    with numbers.connect() as conn:
+        assert (
+            conn.exec_driver_sql(
+                "SELECT max(id) FROM numbers WHERE sq IS NULL"
+            ).scalar()
+            == 40
+        )
+
+
+HOURS_TEXT = [
+    "จ-ศ 9:00-17:00",
+    "ทุกวัน 18:00-02:00",
+    "Sun-Mon 22:00-02:00",
+    "เปิด 24 ชั่วโมง",
+    "ทุกวัน 09:00-18:00 ปิดวันจันทร์",
+    "ปิดวันอังคาร",
+    "10.00 ถึง 16.30",
+    None,
+]
+FEE_TEXT = ["ฟรี", "50 บาท", "ผู้ใหญ่ 1,200 บาท เด็ก 600", "Free entry, parking 20"]
+
+
+def test_structured_hours_backfill_matches_the_app_parser(alembic_config):
+    config, url = alembic_config
+    command.upgrade(config, "0003_image_metadata")
+    engine = sa.create_engine(url)
+    rows = [
+        {
+            "id": i + 1,
+            "name": f"a{i}",
+            "opening_hours": hours,
+            "entrance_fee": FEE_TEXT[i % len(FEE_TEXT)] if i % 5 else None,
+        }
+        for i, hours in enumerate(HOURS_TEXT)
+    ]
+    with engine.begin() as conn:
+        conn.execute(
+            sa.text(
+                "INSERT INTO attractions (id, name, opening_hours, entrance_fee) "
+                "VALUES (:id, :name, :opening_hours, :entrance_fee)"
+            ),
+            rows,
+        )
+    command.upgrade(config, "0004_structured_hours")
+
+    fees, intervals = structured(
+        [r["id"] for r in rows],
+        [r["opening_hours"] for r in rows],
+        [r["entrance_fee"] for r in rows],
+    )
+    fees = fees.astype(object).where(fees.notna(), None)
+    with engine.connect() as conn:
+        stored_fees = conn.execute(
+            sa.text("SELECT id, fee_min, fee_max FROM attractions ORDER BY id")
+        ).all()
+        stored_hours = conn.execute(
+            sa.text(
+                "SELECT attraction_id, start_minute, end_minute FROM attraction_hours"
+            )
+        ).all()
+    assert [tuple(r) for r in stored_fees] == list(fees.itertuples(index=False))
+    assert sorted(map(tuple, stored_hours)) == sorted(
+        map(tuple, intervals.to_numpy().tolist())
+    )
@@ -0,0 +1,29 @@
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import SingletonThreadPool
+
+from api.models import Attraction, Base
+from api.pool_metrics import TimedQueuePool, pool_wait, timed_engine
+
+
+def test_timed_engine_keeps_non_queue_pools(tmp_path):
+    engine = timed_engine(f"sqlite:///{tmp_path / 'file.db'}")
+    assert isinstance(engine.pool, TimedQueuePool)
+    with engine.connect():
+        pass
+    memory = timed_engine("sqlite://")
+    assert isinstance(memory.pool, SingletonThreadPool)
+    Base.metadata.create_all(bind=memory)
+    with sessionmaker(bind=memory)() as db:
+        db.add(Attraction(id=1, name="kept"))
+        db.commit()
+        assert db.get(Attraction, 1).name == "kept"
+
+
+def test_checkouts_feed_pool_wait(tmp_path, monkeypatch):
+    observed = []
+    monkeypatch.setattr(pool_wait, "observe", observed.append)
+    # Replica engines are built the same way, with pre-ping.
+    engine = timed_engine(f"sqlite:///{tmp_path / 'replica.db'}", pool_pre_ping=True)
+    with engine.connect():
+        pass
+    assert len(observed) == 1
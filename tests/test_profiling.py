@@ -0,0 +1,135 @@
+import time
+from types import SimpleNamespace
+
+import fastapi.routing
+import pytest
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import Session
+
+from api import profiling
+from api.auth import get_current_user, require_admin
+from api.main import app as main_app
+from api.models import Attraction, User
+from api.schemas import AttractionOut
+
+
+def busy(seconds):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+@pytest.fixture
+def seed():
+    def add_rows(db):
+        db.add_all([Attraction(id=i, name=f"A{i}") for i in range(1, 4)])
+
+    return add_rows
+
+
+@pytest.fixture
+def client(session_factory):
+    def get_session():
+        with session_factory() as db:
+            yield db
+
+    app = FastAPI()
+
+    @app.get("/attractions", response_model=list[AttractionOut])
+    def attractions(db: Session = Depends(get_session)):
+        return db.query(Attraction).all()
+
+    @app.get("/slow")
+    def slow():
+        with profiling.phase("work"):
+            busy(0.1)
+        return {}
+
+    profiling.install(app, token="secret")
+    return TestClient(app)
+
+
+def phases(response):
+    header = response.headers["server-timing"]
+    return {part.split(";")[0]: part for part in header.split(", ")}
+
+
+def test_server_timing_phases(client):
+    r = client.get("/attractions")
+    assert r.status_code == 200 and len(r.json()) == 3
+    timing = phases(r)
+    assert {"deps", "endpoint", "sql", "orm", "serialize", "app"} <= set(timing)
+    assert 'desc="1 queries"' in timing["sql"]
+    assert "x-profile-id" not in r.headers
+
+
+def test_routing_hooks_match_installed_fastapi():
+    # Fails on a FastAPI upgrade that would silently drop deps/endpoint/serialize.
+    assert profiling.routing_hooks_supported(fastapi.routing)
+
+
+def test_changed_routing_is_left_alone():
+    async def run_endpoint_function(*, dependant, values, is_coroutine, extra):
+        pass
+
+    async def hook(*args, **kwargs):
+        pass
+
+    changed = SimpleNamespace(
+        solve_dependencies=hook,
+        run_endpoint_function=run_endpoint_function,
+        serialize_response=hook,
+    )
+    assert not profiling.routing_hooks_supported(changed)
+    del changed.serialize_response
+    assert not profiling.routing_hooks_supported(changed)
+
+
+def test_custom_phase(client):
+    work = phases(client.get("/slow"))["work"]
+    assert float(work.split("dur=")[1]) >= 100
+
+
+def test_profile_header_samples_the_request(client):
+    assert (
+        "x-profile-id" not in client.get("/slow", headers={"X-Profile": "no"}).headers
+    )
+    r = client.get("/slow", headers={"X-Profile": "secret"})
+    stacks = profiling.profiles.get(r.headers["x-profile-id"])
+    assert sum(stacks.values()) > 10
+    text = profiling.collapsed(stacks)
+    assert "slow (test_profiling.py" in text and ";busy (test_profiling.py" in text
+    assert all(line.rsplit(" ", 1)[1].isdigit() for line in text.splitlines())
+
+
+def test_sampler_skips_idle_threads():
+    sampler = profiling.Sampler()
+    sampler.sample()
+    assert not any("wait (threading.py" in s.rsplit(";", 1)[-1] for s in sampler.stacks)
+
+
+@pytest.fixture
+def admin_client(monkeypatch):
+    monkeypatch.setattr(profiling, "PROFILING_ENABLED", True)
+    main_app.dependency_overrides[require_admin] = lambda: User(role="admin")
+    yield TestClient(main_app)
+    main_app.dependency_overrides.pop(require_admin, None)
+
+
+def test_admin_profile_endpoints(admin_client):
+    r = admin_client.get("/admin/profile", params={"seconds": 0.05})
+    assert r.status_code == 200
+    assert r.headers["content-type"].startswith("text/plain")
+    profiling.profiles.put("abc", {"a;b": 2})
+    assert admin_client.get("/admin/profiles/abc").text == "a;b 2\n"
+    assert admin_client.get("/admin/profiles/nope").status_code == 404
+
+
+def test_admin_profile_requires_admin():
+    main_app.dependency_overrides[get_current_user] = lambda: User(role="user")
+    try:
+        r = TestClient(main_app).get("/admin/profiles/abc")
+    finally:
+        main_app.dependency_overrides.pop(get_current_user, None)
+    assert r.status_code == 403
@@ -0,0 +1,81 @@
+import asyncio
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from jose import jwt
+
+from api.auth import ALGORITHM, SECRET_KEY
+from api.pool_metrics import DecayingAverage
+from api.ratelimit import MemoryBuckets, RateLimitMiddleware
+
+
+def make_client(**options):
+    app = FastAPI()
+
+    @app.get("/ping")
+    def ping():
+        return {"ok": True}
+
+    @app.get("/slow/{item_id}")
+    async def slow(item_id: int):
+        await asyncio.sleep(0.2)
+        return {"ok": True}
+
+    options.setdefault("pool_wait", DecayingAverage())
+    app.add_middleware(RateLimitMiddleware, **options)
+    return TestClient(app)
+
+
+def test_token_bucket_refills():
+    buckets = MemoryBuckets(rate=10, burst=2)
+    assert buckets.take("a") == 0
+    assert buckets.take("a") == 0
+    assert 0 < buckets.take("a") <= 0.1
+    assert buckets.take("b") == 0
+    buckets._buckets["a"][1] -= 0.2
+    assert buckets.take("a") == 0
+
+
+def test_rate_limited_per_client():
+    client = make_client(rate=1, burst=2)
+    assert [client.get("/ping").status_code for _ in range(3)] == [200, 200, 429]
+    r = client.get("/ping")
+    assert r.status_code == 429
+    assert r.headers["retry-after"] == "1"
+
+    # A JWT subject gets its own bucket, separate from the IP's.
+    token = jwt.encode({"sub": "7"}, SECRET_KEY, algorithm=ALGORITHM)
+    headers = {"Authorization": f"Bearer {token}"}
+    assert client.get("/ping", headers=headers).status_code == 200
+    # Invalid tokens fall back to the (exhausted) IP bucket.
+    bad = {"Authorization": "Bearer not-a-jwt"}
+    assert client.get("/ping", headers=bad).status_code == 429
+
+
+def test_docs_exempt():
+    client = make_client(rate=1, burst=1)
+    assert all(client.get("/openapi.json").status_code == 200 for _ in range(3))
+
+
+def test_sheds_load_on_pool_wait():
+    slow_pool = DecayingAverage(tau=60)
+    slow_pool.observe(5.0)
+    client = make_client(pool_wait=slow_pool, max_pool_wait=0.2)
+    r = client.get("/ping")
+    assert r.status_code == 503
+    assert r.headers["retry-after"] == "1"
+
+
+def test_route_concurrency_limit():
+    client = make_client(route_concurrency="/slow/{item_id}=1")
+
+    async def burst():
+        import httpx
+
+        transport = httpx.ASGITransport(app=client.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://t") as c:
+            return await asyncio.gather(c.get("/slow/1"), c.get("/slow/2"))
+
+    statuses = sorted(r.status_code for r in asyncio.run(burst()))
+    assert statuses == [200, 503]
+    assert client.get("/ping").status_code == 200
@@ -0,0 +1,69 @@
+import datetime
+
+import pytest
+
+from api.models import Attraction, Review, User
+from api.partitions import partition_name, review_partition_ddl
+
+NOW = datetime.datetime(2026, 10, 18, 12, 0, 0)
+
+
+def test_review_partition_ddl_spans_months():
+    statements = review_partition_ddl(
+        datetime.date(2026, 11, 5), datetime.date(2027, 1, 1)
+    )
+    assert len(statements) == 3
+    assert partition_name(datetime.date(2026, 12, 1)) == "Review_y2026m12"
+    assert "FROM ('2026-12-01') TO ('2027-01-01')" in statements[1]
+    (staged,) = review_partition_ddl(
+        datetime.date(2026, 11, 1), datetime.date(2026, 11, 1), parent="Staging"
+    )
+    assert '"Review_y2026m11" PARTITION OF "Staging"' in staged
+
+
+@pytest.fixture
+def seed():
+    def add_rows(db):
+        db.add(User(user_id=1, username="u", email="u@example.com", password_hash="x"))
+        db.add_all([Attraction(id=1, name="A1"), Attraction(id=2, name="A2")])
+        # Two reviews share a timestamp so the id tie-breaker is exercised.
+        for i, days in enumerate([0, 1, 1, 2, 40]):
+            db.add(
+                Review(
+                    id=i + 1,
+                    attraction_id=1,
+                    user_id=1,
+                    rating=5,
+                    created_at=NOW - datetime.timedelta(days=days),
+                )
+            )
+
+    return add_rows
+
+
+def test_keyset_pagination(client):
+    seen = []
+    cursor = None
+    while True:
+        params = {"limit": 2}
+        if cursor:
+            params["cursor"] = cursor
+        page = client.get("/attractions/1/reviews", params=params).json()
+        seen += [r["id"] for r in page["items"]]
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+    assert seen == [1, 3, 2, 4, 5]
+
+
+def test_since_filter_and_bad_cursor(client):
+    since = (NOW - datetime.timedelta(days=7)).isoformat()
+    page = client.get("/attractions/1/reviews", params={"since": since}).json()
+    assert [r["id"] for r in page["items"]] == [1, 3, 2, 4]
+    r = client.get("/attractions/1/reviews", params={"cursor": "not-a-cursor"})
+    assert r.status_code == 400
+
+
+def test_recommend_excludes_reviewed(client):
+    r = client.get("/recommend", params={"user_id": 1})
+    assert [a["id"] for a in r.json()] == [2]
@@ -0,0 +1,80 @@
+import pytest
+
+from api.models import Attraction, AttractionTag, Tag
+from api.compression import negotiate
+
+
+@pytest.fixture
+def seed():
+    def add_rows(db):
+        db.add(Tag(tag_id=1, name="beach"))
+        for i in range(1, 41):
+            db.add(
+                Attraction(
+                    id=i,
+                    name=f"Attraction {i}",
+                    description="long text " * 50,
+                    province="ภูเก็ต",
+                    main_image_url=f"https://picsum.photos/seed/{i}/1200/800",
+                )
+            )
+        db.add(AttractionTag(attraction_id=3, tag_id=1))
+
+    return add_rows
+
+
+def test_fields_narrow_output(client):
+    r = client.get("/attractions", params={"fields": "name,main_image_variants"})
+    assert r.status_code == 200
+    first = r.json()[0]
+    assert first == {
+        "name": "Attraction 1",
+        "main_image_variants": {
+            "thumb": "https://picsum.photos/seed/1/320/213",
+            "small": "https://picsum.photos/seed/1/640/427",
+            "medium": "https://picsum.photos/seed/1/1024/683",
+        },
+    }
+    full = client.get("/attractions").json()[0]
+    assert full["description"].startswith("long text")
+
+
+def test_fields_with_tag_filter(client):
+    r = client.get("/attractions", params={"fields": "id,province", "tags": 1})
+    assert r.json() == [{"id": 3, "province": "ภูเก็ต"}]
+
+
+def test_unknown_fields_rejected(client):
+    r = client.get("/attractions", params={"fields": "id,password_hash"})
+    assert r.status_code == 400
+    assert "password_hash" in r.json()["detail"]
+
+
+def test_gzip_above_threshold(client):
+    r = client.get("/attractions", headers={"Accept-Encoding": "gzip"})
+    assert r.headers["content-encoding"] == "gzip"
+    assert "Accept-Encoding" in r.headers["vary"]
+    assert int(r.headers["content-length"]) < len(r.content)
+
+    small = client.get(
+        "/attractions",
+        params={"fields": "id", "limit": 1},
+        headers={"Accept-Encoding": "gzip"},
+    )
+    assert "content-encoding" not in small.headers
+
+    plain = client.get("/attractions", headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in plain.headers
+
+
+def test_negotiate():
+    assert negotiate("gzip, br", supported=("br", "gzip")) == "br"
+    assert negotiate("gzip;q=1.0, br;q=0.5", supported=("br", "gzip")) == "gzip"
+    assert negotiate("br;q=0", supported=("br", "gzip")) is None
+    assert negotiate("deflate", supported=("gzip",)) is None
+
+
+def test_brotli_preferred_when_available(client):
+    pytest.importorskip("brotli")
+    r = client.get("/attractions", headers={"Accept-Encoding": "gzip, br"})
+    assert r.headers["content-encoding"] == "br"
@@ -0,0 +1,223 @@
+import datetime
+import threading
+
+import numpy as np
+import pytest
+from sqlalchemy.exc import IntegrityError
+
+from api.models import (
+    Attraction,
+    AttractionTag,
+    Category,
+    Favorite,
+    Review,
+    Tag,
+    User,
+)
+from api.stats import stats_store
+
+NOW = datetime.datetime(2026, 10, 18, 12, 0)
+
+
+@pytest.fixture
+def seed():
+    def add_rows(db):
+        db.add_all(
+            [
+                User(user_id=i, username=f"u{i}", email=f"u{i}@x", password_hash="x")
+                for i in (1, 2)
+            ]
+        )
+        db.add_all(
+            [Category(category_id=1, name="วัด"), Category(category_id=2, name="ทะเล")]
+        )
+        db.add_all([Tag(tag_id=1, name="culture"), Tag(tag_id=2, name="family")])
+        db.add_all(
+            [
+                Attraction(
+                    id=1,
+                    name="a",
+                    province="เชียงใหม่",
+                    district="เมือง",
+                    category_id=1,
+                ),
+                Attraction(
+                    id=2,
+                    name="b",
+                    province="เชียงใหม่",
+                    district="แม่ริม",
+                    category_id=1,
+                ),
+                Attraction(
+                    id=3, name="c", province="ภูเก็ต", district="ถลาง", category_id=2
+                ),
+                Attraction(id=4, name="d"),
+            ]
+        )
+        db.add_all(
+            [
+                AttractionTag(attraction_id=1, tag_id=1),
+                AttractionTag(attraction_id=1, tag_id=2),
+                AttractionTag(attraction_id=3, tag_id=2),
+            ]
+        )
+        db.add_all(
+            [
+                Review(attraction_id=a, user_id=u, rating=r, created_at=NOW)
+                for a, u, r in [(1, 1, 5), (1, 2, 3), (2, 1, 4), (3, 1, 2)]
+            ]
+        )
+        db.add_all([Favorite(user_id=1, attraction_id=a) for a in (1, 3)])
+        db.add(Favorite(user_id=2, attraction_id=1))
+
+    return add_rows
+
+
+def stats(client, **params):
+    r = client.get("/stats", params=params)
+    assert r.status_code == 200
+    return r.json()
+
+
+def test_totals_and_group_by(client):
+    assert stats(client) == [
+        {"attractions": 4, "reviews": 4, "favorites": 3, "avg_rating": 3.5}
+    ]
+    by_province = {row["province"]: row for row in stats(client, group_by="province")}
+    assert by_province["เชียงใหม่"] == {
+        "province": "เชียงใหม่",
+        "attractions": 2,
+        "reviews": 3,
+        "favorites": 2,
+        "avg_rating": 4.0,
+    }
+    assert by_province[None]["avg_rating"] is None
+    rows = stats(client, group_by=["category", "district"], province="เชียงใหม่")
+    assert [(r["category"], r["district"], r["reviews"]) for r in rows] == [
+        ("วัด", "เมือง", 2),
+        ("วัด", "แม่ริม", 1),
+    ]
+
+
+def test_tag_cube(client):
+    by_tag = {row["tag"]: row for row in stats(client, group_by="tag")}
+    assert by_tag["family"]["attractions"] == 2
+    assert by_tag["family"]["reviews"] == 3
+    assert by_tag["culture"]["favorites"] == 2
+    assert stats(client, tag="family", province="ภูเก็ต") == [
+        {"attractions": 1, "reviews": 1, "favorites": 1, "avg_rating": 2.0}
+    ]
+    assert client.get("/stats", params={"group_by": "name"}).status_code == 422
+
+
+def test_writes_apply_as_deltas(client, session_factory):
+    stats(client)
+    loaded_at = stats_store._loaded_at
+    with session_factory() as db:
+        db.add(Review(attraction_id=3, user_id=2, rating=4, created_at=NOW))
+        db.add(Favorite(user_id=2, attraction_id=3))
+        db.commit()
+        db.delete(db.get(Favorite, 1))
+        db.commit()
+    row = stats(client, province="ภูเก็ต")[0]
+    assert (row["reviews"], row["favorites"], row["avg_rating"]) == (2, 2, 3.0)
+    assert stats(client, province="เชียงใหม่")[0]["favorites"] == 1
+    assert stats(client, group_by="tag", tag="family")[0]["reviews"] == 4
+    assert stats_store._loaded_at == loaded_at
+
+    with session_factory() as db:
+        db.get(Attraction, 4).province = "ภูเก็ต"
+        db.commit()
+    assert stats(client, province="ภูเก็ต")[0]["attractions"] == 2
+    assert stats_store._loaded_at > loaded_at
+
+
+def test_deltas_committed_during_a_build_are_replayed_once(client, monkeypatch):
+    from api import stats as stats_module
+
+    counts = stats_module._counts
+    review = [(3, np.array([0, 1, 4, 0]))]
+
+    def counts_with_commits(db, column, value):
+        if column is stats_module.Review.attraction_id and value.name == "count":
+            snapshot = stats_store.gate.last
+            stats_store.apply(review, snapshot)  # already in the snapshot
+            stats_store.apply(review, snapshot + 1)  # committed after it
+        return counts(db, column, value)
+
+    monkeypatch.setattr(stats_module, "_counts", counts_with_commits)
+    stats_store.invalidate()
+    stats(client)
+    monkeypatch.undo()
+    loaded_at = stats_store._loaded_at
+    assert stats(client, province="ภูเก็ต")[0]["reviews"] == 2
+    assert stats_store._loaded_at == loaded_at
+
+
+def test_commit_racing_a_build_is_counted_once(client, session_factory, monkeypatch):
+    from api import stats as stats_module
+
+    counts = stats_module._counts
+    writers = []
+
+    def write():
+        with session_factory() as db:
+            db.add(Review(attraction_id=3, user_id=2, rating=4, created_at=NOW))
+            db.add(Favorite(user_id=2, attraction_id=3))
+            db.commit()
+
+    def counts_during_a_commit(db, column, value):
+        if not writers:
+            writers.append(threading.Thread(target=write))
+            writers[0].start()
+            writers[0].join(0.2)  # lands now or waits for the snapshot
+        return counts(db, column, value)
+
+    monkeypatch.setattr(stats_module, "_counts", counts_during_a_commit)
+    stats_store.invalidate()
+    stats(client)
+    monkeypatch.undo()
+    writers[0].join()
+    loaded_at = stats_store._loaded_at
+    row = stats(client, province="ภูเก็ต")[0]
+    assert (row["reviews"], row["favorites"]) == (2, 2)
+    assert stats_store._loaded_at == loaded_at
+
+
+def test_apply_does_not_wait_for_a_build(client, monkeypatch):
+    from api import stats as stats_module
+
+    counts = stats_module._counts
+    waited = []
+
+    def counts_with_an_apply(db, column, value):
+        if not waited:
+            applier = threading.Thread(target=stats_store.apply, args=([], 0))
+            applier.start()
+            applier.join(1)
+            waited.append(applier.is_alive())
+        return counts(db, column, value)
+
+    monkeypatch.setattr(stats_module, "_counts", counts_with_an_apply)
+    stats_store.invalidate()
+    stats(client)
+    assert waited == [False]
+
+
+def test_failed_commit_leaves_the_gate(session_factory):
+    db = session_factory()
+    db.add(Favorite(user_id=1, attraction_id=1))  # already a favorite
+    with pytest.raises(IntegrityError):
+        db.commit()
+
+    def snapshot():
+        with stats_store.gate.quiesced():
+            pass
+
+    build = threading.Thread(target=snapshot)
+    try:
+        build.start()
+        build.join(1)
+        assert not build.is_alive()
+    finally:
+        db.close()
@@ -0,0 +1,65 @@
+import pytest
+
+from api.models import Attraction, Tag, AttractionTag
+from api.tag_index import TagIndex
+
+
+def test_match_all_and_any():
+    index = TagIndex()
+    index._build([(1, 10), (1, 20), (2, 10), (3, 30)])
+    assert index.match([10, 20], mode="all") == [1]
+    assert index.match([10, 30], mode="any") == [1, 2, 3]
+    assert index.match([99], mode="all") == []
+    assert index.match([20, 99], mode="any") == [1]
+
+
+def test_similar_ranks_by_jaccard():
+    index = TagIndex()
+    index._build([(1, 1), (1, 2), (1, 3), (2, 1), (2, 2), (3, 1), (4, 9)])
+    assert index.similar(1, limit=5) == [(2, 2 / 3), (3, 1 / 3)]
+    assert index.similar(1, limit=1) == [(2, 2 / 3)]
+    assert index.similar(42) == []
+
+
+def test_more_than_64_tags():
+    index = TagIndex()
+    index._build([(1, t) for t in range(100)] + [(2, 99), (2, 0)])
+    assert index.bits.shape == (2, 2)
+    assert index.match([0, 99]) == [1, 2]
+    assert index.match(list(range(100))) == [1]
+
+
+@pytest.fixture
+def seed():
+    def add_rows(db):
+        db.add_all([Tag(tag_id=1, name="beach"), Tag(tag_id=2, name="temple")])
+        db.add_all([Attraction(id=i, name=f"A{i}") for i in (1, 2, 3)])
+        db.add_all(
+            [
+                AttractionTag(attraction_id=1, tag_id=1),
+                AttractionTag(attraction_id=1, tag_id=2),
+                AttractionTag(attraction_id=2, tag_id=1),
+            ]
+        )
+
+    return add_rows
+
+
+def test_filter_attractions_by_tags(client, session_factory):
+    r = client.get("/attractions?tags=1&tags=2")
+    assert [a["id"] for a in r.json()] == [1]
+    r = client.get("/attractions?tags=1&tags=2&tag_mode=any")
+    assert [a["id"] for a in r.json()] == [1, 2]
+
+    with session_factory() as db:
+        db.add(AttractionTag(attraction_id=3, tag_id=2))
+        db.commit()
+    r = client.get("/attractions?tags=2")
+    assert [a["id"] for a in r.json()] == [1, 3]
+
+
+def test_similar_endpoint(client):
+    r = client.get("/attractions/2/similar")
+    assert r.status_code == 200
+    assert [(a["id"], a["similarity"]) for a in r.json()] == [(1, 0.5)]
+    assert client.get("/attractions/999/similar").status_code == 404